@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Reproducible Scale Benchmark for Spell Correction
+
+Generates seeded, labelled datasets with generate_test_data.py, corrects them
+with each engine in a fresh process and reports words/sec, per-word latency,
+peak RSS, startup time and per-error-type accuracy as JSON.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import platform
+import multiprocessing
+from array import array
+from collections import defaultdict
+from typing import List, Tuple, Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from bitparallel import NUMPY_AVAILABLE
+from generate_test_data import TestDataGenerator
+from spell_corrector import SpellCorrector
+
+
+# Scale name -> (error words, dictionary words).
+SCALES = {
+    'small': (10000, 5000),
+    'medium': (100000, 50000),
+    'large': (1000000, 500000),
+}
+
+# Metrics compared against a baseline, and whether higher is better.
+REGRESSION_METRICS = {
+    'words_per_second': True,
+    'accuracy': True,
+    'latency_p99_ms': False,
+    'startup_seconds': False,
+}
+
+
+def prepare_dataset(data_dir: str, scale: str, seed: int, log=sys.stderr) -> Tuple[str, str]:
+    """Generate (or reuse) a scale's reference and labels files; return their paths."""
+    num_errors, num_words = SCALES[scale]
+    base = os.path.join(data_dir, f'{scale}-seed{seed}')
+    reference_file = base + '-reference.txt'
+    labels_file = base + '-labels.tsv'
+    
+    if os.path.exists(reference_file) and os.path.exists(labels_file):
+        return reference_file, labels_file
+    
+    os.makedirs(data_dir, exist_ok=True)
+    print(f"Generating {scale} dataset: {num_errors} errors, {num_words} words (seed {seed})...", file=log)
+    # The labels file is renamed into place last, so it marks a complete dataset.
+    TestDataGenerator(seed=seed).generate_files(
+        reference_file=reference_file,
+        errors_file=base + '-errors.txt',
+        num_reference_words=num_words,
+        num_error_words=num_errors,
+        labels_file=labels_file + '.tmp',
+        verbose=False,
+    )
+    os.replace(labels_file + '.tmp', labels_file)
+    return reference_file, labels_file
+
+
+def iter_labels(labels_file: str, limit: Optional[int] = None) -> Iterator[Tuple[str, str, str]]:
+    """Yield (error, expected word, error type) triples from a labels file."""
+    with open(labels_file, 'r', encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            if limit is not None and i >= limit:
+                return
+            error, expected, error_type = line.rstrip('\n').split('\t')
+            yield error, expected, error_type
+
+
+def percentile(sorted_values, q: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MiB, where the OS reports it."""
+    # Linux: VmHWM covers only this process image, while ru_maxrss also keeps
+    # the high-water mark of the parent the process was forked from.
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere.
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_benchmark(dictionary_file: str, labels_file: str, engine: str,
+                  limit: Optional[int] = None, compact: bool = False) -> Dict:
+    """Correct every labelled error once and measure it; runs in a fresh process."""
+    clock = time.perf_counter
+    
+    start = clock()
+    corrector = SpellCorrector(dictionary_file, engine=engine, compact=compact)
+    startup = clock() - start
+    
+    latencies = array('d')
+    totals: Dict[str, int] = defaultdict(int)
+    correct: Dict[str, int] = defaultdict(int)
+    
+    run_start = clock()
+    for error, expected, error_type in iter_labels(labels_file, limit):
+        word_start = clock()
+        corrected = corrector.correct_word(error)
+        latencies.append(clock() - word_start)
+        
+        totals[error_type] += 1
+        if corrected == expected:
+            correct[error_type] += 1
+    elapsed = clock() - run_start
+    
+    latencies = sorted(latencies)
+    words = len(latencies)
+    return {
+        'engine': engine,
+        'words': words,
+        'startup_seconds': startup,
+        'elapsed_seconds': elapsed,
+        'words_per_second': words / elapsed if elapsed else 0.0,
+        'latency_p50_ms': percentile(latencies, 0.5) * 1000,
+        'latency_p99_ms': percentile(latencies, 0.99) * 1000,
+        'latency_max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+        'peak_rss_mb': peak_rss_mb(),
+        'accuracy': sum(correct.values()) / words if words else 0.0,
+        'accuracy_by_type': {
+            error_type: correct[error_type] / totals[error_type]
+            for error_type in sorted(totals)
+        },
+        'errors_by_type': dict(sorted(totals.items())),
+        'categories': dict(corrector.stats),
+    }
+
+
+def run_isolated(dictionary_file: str, labels_file: str, engine: str,
+                 limit: Optional[int] = None, compact: bool = False) -> Dict:
+    """Run one benchmark in a freshly spawned process so startup and RSS are its own."""
+    # Ties between equally scored candidates follow set order, which follows
+    # the string hash seed; pin it so accuracy is repeatable between runs.
+    previous_seed = os.environ.get('PYTHONHASHSEED')
+    os.environ['PYTHONHASHSEED'] = '0'
+    try:
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(1) as pool:
+            return pool.apply(run_benchmark, (dictionary_file, labels_file, engine, limit, compact))
+    finally:
+        if previous_seed is None:
+            del os.environ['PYTHONHASHSEED']
+        else:
+            os.environ['PYTHONHASHSEED'] = previous_seed
+
+
+def compare_runs(baseline: Dict, current: Dict, tolerance: float) -> List[str]:
+    """List the metrics in current that regressed by more than tolerance against baseline."""
+    previous = {(run['scale'], run['engine'], run['dictionary_format']): run
+                for run in baseline.get('runs', [])}
+    regressions = []
+    
+    for run in current['runs']:
+        key = (run['scale'], run['engine'], run['dictionary_format'])
+        if key not in previous:
+            continue
+        for metric, higher_is_better in REGRESSION_METRICS.items():
+            old, new = previous[key].get(metric), run.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append(f"{'/'.join(key)} {metric}: {old:.4g} -> {new:.4g} ({change:+.1%})")
+    
+    return regressions
+
+
+def main():
+    """Main function to run the benchmark suite."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Benchmark spell correction on seeded, labelled datasets.')
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=['small'],
+                        help='dataset sizes to run (default: small)')
+    parser.add_argument('--engines', nargs='+', choices=SpellCorrector.ENGINES,
+                        default=list(SpellCorrector.ENGINES),
+                        help='engines to compare (default: all)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='dataset seed (default: 42)')
+    parser.add_argument('--data-dir', default='benchmark_data',
+                        help='where generated datasets are kept and reused')
+    parser.add_argument('--max-words', type=int,
+                        help='correct at most this many errors per run (the classic engine is slow)')
+    parser.add_argument('--compiled', action='store_true',
+                        help='also run every engine against a compiled dictionary index')
+    parser.add_argument('--compact', action='store_true',
+                        help='also run every engine with the compact in-memory dictionary store')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', help='earlier JSON report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='allowed relative regression against --baseline (default: 0.10)')
+    args = parser.parse_args()
+    
+    log = sys.stderr
+    report = {
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': NUMPY_AVAILABLE,
+        'runs': [],
+    }
+    
+    for scale in args.scales:
+        reference_file, labels_file = prepare_dataset(args.data_dir, scale, args.seed, log)
+        dictionaries = [('text', reference_file)]
+        if args.compact:
+            dictionaries.append(('compact', reference_file))
+        
+        if args.compiled:
+            index_file = os.path.splitext(reference_file)[0] + '.idx'
+            if not os.path.exists(index_file):
+                print(f"Compiling {reference_file}...", file=log)
+                SpellCorrector(reference_file).compile(index_file)
+            dictionaries.append(('compiled', index_file))
+        
+        with open(reference_file, 'r', encoding='utf-8') as f:
+            dictionary_words = sum(1 for line in f if line.strip())
+        
+        for dictionary_format, dictionary_file in dictionaries:
+            for engine in args.engines:
+                print(f"Running {scale} / {engine} / {dictionary_format}...", file=log)
+                result = run_isolated(dictionary_file, labels_file, engine, args.max_words,
+                                      compact=dictionary_format == 'compact')
+                run = {
+                    'scale': scale,
+                    'dictionary_format': dictionary_format,
+                    'dictionary_words': dictionary_words,
+                }
+                run.update(result)
+                report['runs'].append(run)
+                print(f"  {run['words_per_second']:.0f} words/s, "
+                      f"p99 {run['latency_p99_ms']:.2f} ms, "
+                      f"accuracy {run['accuracy'] * 100:.2f}%", file=log)
+    
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"Report written to {args.output}", file=log)
+    else:
+        print(text)
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_runs(json.load(f), report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=log)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+NumPy-vectorised bit-parallel edit distance (Myers / Hyyro).
+
+One query is compared against many words at once: every word is a lane in
+a uint64 array and the query's match masks are shifted through all lanes
+together, one text column per step. Words are bucketed by length so each
+bucket advances in lockstep. NumPy is optional; check NUMPY_AVAILABLE.
+"""
+
+import bisect
+import copy
+from typing import List, Dict, Iterable, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NUMPY_AVAILABLE = np is not None
+
+# Queries longer than one machine word fall back to the scalar DP.
+MAX_QUERY_LENGTH = 64
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("NumPy is required for bit-parallel edit distance (pip install numpy)")
+
+
+def _codes(words: Sequence[str], length: int):
+    """Encode equal-length words as a (length, n) matrix of code points."""
+    flat = np.frombuffer(''.join(words).encode('utf-32-le'), dtype=np.uint32)
+    return np.ascontiguousarray(flat.reshape(len(words), length).T)
+
+
+def _scalar_levenshtein(s1: str, s2: str) -> int:
+    previous = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1):
+        current = [i + 1]
+        for j, c2 in enumerate(s2):
+            current.append(min(previous[j + 1] + 1, current[j] + 1, previous[j] + (c1 != c2)))
+        previous = current
+    return previous[-1]
+
+
+class _Pattern:
+    """Match masks (Peq) for one query, indexed by code point."""
+    
+    def __init__(self, query: str, max_code: int):
+        self.length = len(query)
+        self.mask = np.uint64((1 << self.length) - 1)
+        self.high = np.uint64(1 << (self.length - 1))
+        
+        size = max(max_code, max((ord(c) for c in query), default=0)) + 1
+        self.peq = np.zeros(size, dtype=np.uint64)
+        for i, char in enumerate(query):
+            self.peq[ord(char)] |= np.uint64(1 << i)
+    
+    def distances(self, columns) -> 'np.ndarray':
+        """Levenshtein distance from the query to every lane of a code matrix."""
+        lanes = columns.shape[1]
+        one = np.uint64(1)
+        pv = np.full(lanes, self.mask, dtype=np.uint64)
+        mv = np.zeros(lanes, dtype=np.uint64)
+        score = np.full(lanes, self.length, dtype=np.int64)
+        
+        for column in columns:
+            eq = self.peq[np.minimum(column, len(self.peq) - 1)]
+            # Code points beyond the table never match the query.
+            eq[column >= len(self.peq)] = 0
+            
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | ~(xh | pv)
+            mh = pv & xh
+            
+            score += (ph & self.high) != 0
+            score -= (mh & self.high) != 0
+            
+            # Global alignment: the top boundary row grows by one per column.
+            ph = ((ph << one) | one) & self.mask
+            mh = (mh << one) & self.mask
+            pv = (mh | ~(xv | ph)) & self.mask
+            mv = ph & xv
+        
+        return score
+
+
+def batch_levenshtein(query: str, words: Sequence[str]) -> List[int]:
+    """Levenshtein distance from query to each word, computed lane-parallel."""
+    _require_numpy()
+    if not words:
+        return []
+    if not query or len(query) > MAX_QUERY_LENGTH:
+        return [_scalar_levenshtein(query, word) for word in words]
+    
+    by_length: Dict[int, List[int]] = {}
+    for i, word in enumerate(words):
+        by_length.setdefault(len(word), []).append(i)
+    
+    pattern = _Pattern(query, 0)
+    result = [0] * len(words)
+    for length, positions in by_length.items():
+        if length == 0:
+            for i in positions:
+                result[i] = len(query)
+            continue
+        columns = _codes([words[i] for i in positions], length)
+        for i, dist in zip(positions, pattern.distances(columns).tolist()):
+            result[i] = dist
+    return result
+
+
+class LengthBuckets:
+    """Dictionary words bucketed by length as code matrices for exhaustive scans."""
+    
+    def __init__(self, words: Iterable[str]):
+        _require_numpy()
+        grouped: Dict[int, List[str]] = {}
+        for word in words:
+            grouped.setdefault(len(word), []).append(word)
+        
+        self.words: Dict[int, List[str]] = {}
+        self.columns: Dict[int, 'np.ndarray'] = {}
+        self.max_code = 0
+        for length, bucket in grouped.items():
+            bucket.sort()
+            self.words[length] = bucket
+            if length:
+                self.columns[length] = _codes(bucket, length)
+                self.max_code = max(self.max_code, int(self.columns[length].max()))
+    
+    def copy(self) -> 'LengthBuckets':
+        """Copy for editing; buckets are shared, as edits replace them rather than change them."""
+        buckets = copy.copy(self)
+        buckets.words = dict(self.words)
+        buckets.columns = dict(self.columns)
+        return buckets
+    
+    def add(self, word: str):
+        """Add one word."""
+        self.update(added=(word,))
+    
+    def remove(self, word: str):
+        """Remove one word."""
+        self.update(removed=(word,))
+    
+    def update(self, added: Iterable[str] = (), removed: Iterable[str] = ()):
+        """Add and remove words, copying each affected bucket's lanes once and encoding only new words."""
+        edits: Dict[int, Tuple[List[str], List[str]]] = {}
+        for word in added:
+            edits.setdefault(len(word), ([], []))[0].append(word)
+        for word in removed:
+            edits.setdefault(len(word), ([], []))[1].append(word)
+        for length, (new, gone) in edits.items():
+            self._edit_bucket(length, new, gone)
+    
+    def _edit_bucket(self, length: int, new: List[str], gone: List[str]):
+        bucket = list(self.words.get(length, ()))
+        columns = self.columns.get(length)
+        gone = set(gone)
+        
+        drop = sorted({i for i in (bisect.bisect_left(bucket, word) for word in gone)
+                       if i < len(bucket) and bucket[i] in gone})
+        if drop:
+            for i in reversed(drop):
+                del bucket[i]
+            if columns is not None:
+                columns = np.delete(columns, drop, axis=1)
+        
+        fresh, positions = [], []
+        for word in sorted(set(new)):
+            i = bisect.bisect_left(bucket, word)
+            if i == len(bucket) or bucket[i] != word:
+                fresh.append(word)
+                positions.append(i)
+        if fresh:
+            # Words sharing a position go in before it in sorted order, as
+            # np.insert places values for equal indices in the order given.
+            bucket = sorted(bucket + fresh)
+            if length:
+                codes = _codes(fresh, length)
+                self.max_code = max(self.max_code, int(codes.max()))
+                columns = codes if columns is None else np.insert(columns, positions, codes, axis=1)
+        
+        if not bucket:
+            self.words.pop(length, None)
+            self.columns.pop(length, None)
+            return
+        self.words[length] = bucket
+        if columns is not None:
+            self.columns[length] = np.ascontiguousarray(columns)
+    
+    def scan_size(self, length: int, max_distance: int) -> int:
+        """Count the words a within() scan for a query of this length compares."""
+        return sum(len(bucket) for bucket_length, bucket in self.words.items()
+                   if abs(bucket_length - length) <= max_distance)
+    
+    def within(self, query: str, max_distance: int) -> List[Tuple[str, int]]:
+        """Scan every word whose length allows a match; return (word, distance) pairs."""
+        matches = []
+        lengths = [length for length in self.words
+                   if abs(length - len(query)) <= max_distance]
+        
+        if not query or len(query) > MAX_QUERY_LENGTH:
+            for length in lengths:
+                for word in self.words[length]:
+                    dist = _scalar_levenshtein(query, word)
+                    if dist <= max_distance:
+                        matches.append((word, dist))
+            return matches
+        
+        pattern = _Pattern(query, self.max_code)
+        for length in lengths:
+            if length == 0:
+                if len(query) <= max_distance:
+                    matches.append(('', len(query)))
+                continue
+            distances = pattern.distances(self.columns[length])
+            for i in np.flatnonzero(distances <= max_distance).tolist():
+                matches.append((self.words[length][i], int(distances[i])))
+        return matches
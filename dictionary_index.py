@@ -0,0 +1,373 @@
+"""
+Compiled, memory-mappable dictionary index for the spell corrector.
+
+The file holds flat UTF-8 blobs with offset arrays, plus sorted CRC32 hash
+tables for word lookups, the delete-neighbourhood index and phonetic keys.
+Lookups read straight from the mapped pages; nothing is rebuilt at load time.
+The same bytes can be placed in a shared-memory segment that worker processes
+attach to by name, so one copy of the index serves every worker on a host.
+"""
+
+import bisect
+import hashlib
+import mmap
+import struct
+import zlib
+from array import array
+from collections import defaultdict
+from itertools import islice
+from multiprocessing import shared_memory
+from typing import List, Tuple, Dict, Set, Iterable, Iterator, Callable
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b'SPCIDX\x00\x00'
+VERSION = 1
+
+SECTIONS = (
+    'words', 'word_offsets', 'word_hashes', 'word_ids',
+    'lower', 'lower_offsets', 'lower_hashes', 'lower_ids',
+    'lower_canonical', 'letter_flags',
+    'delete_hashes', 'delete_starts', 'delete_ids',
+    'phonetic_hashes', 'phonetic_starts', 'phonetic_ids',
+)
+
+# magic, version, word count, lowercase count, delete distance, content hash
+HEADER = struct.Struct('<8sIIII64s')
+SECTION_ENTRY = struct.Struct('<QQ')
+
+ARRAY_TYPES = {
+    'word_offsets': 'Q', 'word_hashes': 'I', 'word_ids': 'I',
+    'lower_offsets': 'Q', 'lower_hashes': 'I', 'lower_ids': 'I',
+    'lower_canonical': 'I',
+    'delete_hashes': 'I', 'delete_starts': 'I', 'delete_ids': 'I',
+    'phonetic_hashes': 'I', 'phonetic_starts': 'I', 'phonetic_ids': 'I',
+}
+
+LETTERS = set('abcdefghijklmnopqrstuvwxyz')
+
+# Keys MappedDictionary.intersection hashes and matches per NumPy pass, which
+# bounds the memory a long variant stream (e.g. distance-2 edits) takes.
+INTERSECTION_CHUNK = 4096
+
+
+# content_hash sums per-word digests modulo 2**256, so it is independent of
+# order and can be updated one word at a time as words are added or removed.
+HASH_MODULUS = 1 << 256
+
+
+def word_digest(word: str) -> int:
+    """Hash one word for its contribution to content_hash."""
+    return int.from_bytes(hashlib.sha256(word.encode('utf-8')).digest(), 'big')
+
+
+def format_hash(total: int) -> str:
+    """Render a content hash sum as 64 hex characters."""
+    return f'{total % HASH_MODULUS:064x}'
+
+
+def content_hash(words: Iterable[str]) -> str:
+    """Hash a word list's content, independent of its order."""
+    return format_hash(sum(word_digest(word) for word in set(words)))
+
+
+def is_compiled_index(path: str) -> bool:
+    """Check whether a file starts with the compiled index magic."""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class Segment(shared_memory.SharedMemory):
+    """SharedMemory segment that may still be viewed by a MappedDictionary when collected."""
+    
+    def __del__(self):
+        # At interpreter exit the segment can be collected before the index
+        # views into it; the OS unmaps it either way.
+        try:
+            self.close()
+        except (OSError, BufferError):
+            pass
+
+
+def share_index(data: bytes) -> Segment:
+    """Copy a built index into a new shared-memory segment; the caller unlinks it."""
+    segment = Segment(create=True, size=max(len(data), 1))
+    segment.buf[:len(data)] = data
+    return segment
+
+
+def attach_segment(name: str) -> Segment:
+    """Attach to a segment another process created, without taking ownership of it."""
+    try:
+        # Python 3.13+: keep the resource tracker from unlinking it at our exit.
+        return Segment(name=name, track=False)
+    except TypeError:
+        return Segment(name=name)
+
+
+def _key_hash(key: str) -> int:
+    return zlib.crc32(key.encode('utf-8'))
+
+
+def _blob(strings: List[str]) -> Tuple[bytearray, array]:
+    """Concatenate strings as UTF-8 with an offsets array (len + 1 entries)."""
+    blob = bytearray()
+    offsets = array('Q', [0])
+    for s in strings:
+        blob += s.encode('utf-8')
+        offsets.append(len(blob))
+    return blob, offsets
+
+
+def _hash_table(keys: List[str]) -> Tuple[array, array]:
+    """Build a table of (hash, id) pairs sorted by hash."""
+    hashes = array('I', map(_key_hash, keys))
+    ids = array('I', sorted(range(len(keys)), key=hashes.__getitem__))
+    return array('I', (hashes[i] for i in ids)), ids
+
+
+def _postings(groups: Dict[int, List[int]]) -> Tuple[array, array, array]:
+    """Flatten key hash -> ids groups into sorted hashes, start offsets and ids.
+    
+    Groups are keyed by _key_hash, so keys whose hashes collide share one
+    posting list and readers must treat postings as a superset and verify
+    them. Groups are consumed as they are written to keep peak memory down.
+    """
+    hashes, starts, ids = array('I'), array('I'), array('I')
+    for h in sorted(groups):
+        hashes.append(h)
+        starts.append(len(ids))
+        ids.extend(sorted(set(groups.pop(h))))
+    starts.append(len(ids))
+    return hashes, starts, ids
+
+
+def build_index(words: Iterable[str],
+                delete_variants: Callable[[str, int], Iterable[str]],
+                phonetic_key: Callable[[str], str],
+                max_distance: int = 2) -> bytes:
+    """Serialise a dictionary and its derived indexes into the index format."""
+    words = sorted(set(words))
+    lower_map = {word.lower(): i for i, word in enumerate(words)}
+    lowers = sorted(lower_map)
+    
+    # Grouped by key hash straight away; the variant strings themselves are
+    # never kept, which is most of the memory a build needs. A max_distance
+    # of 0 leaves the delete index empty, for readers that never probe it.
+    deletes: Dict[int, List[int]] = defaultdict(list)
+    phonetic: Dict[int, List[int]] = defaultdict(list)
+    for i, lower in enumerate(lowers):
+        if max_distance > 0:
+            for variant in delete_variants(lower, max_distance):
+                deletes[_key_hash(variant)].append(i)
+        phonetic[_key_hash(phonetic_key(lower))].append(i)
+    
+    sections = {}
+    sections['words'], sections['word_offsets'] = _blob(words)
+    sections['word_hashes'], sections['word_ids'] = _hash_table(words)
+    sections['lower'], sections['lower_offsets'] = _blob(lowers)
+    sections['lower_hashes'], sections['lower_ids'] = _hash_table(lowers)
+    sections['lower_canonical'] = array('I', [lower_map[lower] for lower in lowers])
+    sections['letter_flags'] = bytes(1 if set(lower) <= LETTERS else 0 for lower in lowers)
+    (sections['delete_hashes'], sections['delete_starts'],
+     sections['delete_ids']) = _postings(deletes)
+    (sections['phonetic_hashes'], sections['phonetic_starts'],
+     sections['phonetic_ids']) = _postings(phonetic)
+    
+    # words is already deduplicated, so hash it without content_hash's copy.
+    digest = format_hash(sum(word_digest(word) for word in words))
+    header = HEADER.pack(MAGIC, VERSION, len(words), len(lowers), max_distance,
+                         digest.encode('ascii'))
+    position = HEADER.size + SECTION_ENTRY.size * len(SECTIONS)
+    table, chunks = [], []
+    
+    for name in SECTIONS:
+        data = memoryview(sections[name])
+        # Keep every section 8-byte aligned so it can be cast in place.
+        padding = -position % 8
+        chunks.append(b'\x00' * padding)
+        position += padding
+        table.append(SECTION_ENTRY.pack(position, data.nbytes))
+        chunks.append(data)
+        position += data.nbytes
+    
+    # One join, straight from the section buffers, so the index is copied once.
+    return b''.join([header] + table + chunks)
+
+
+class MappedDictionary:
+    """Read-only view of a compiled index held in any buffer (mmap, bytes, ...).
+    
+    Acts as the lowercase -> canonical mapping that SpellCorrector keeps in
+    ``dictionary_lower``; ``canonical`` is the matching set of exact words.
+    """
+    
+    def __init__(self, buffer, owner=None):
+        self._owner = owner
+        self.buffer = memoryview(buffer)
+        
+        magic, version, word_count, lower_count, max_distance, digest = \
+            HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a compiled dictionary index")
+        if version != VERSION:
+            raise ValueError(f"Unsupported index version {version}, expected {VERSION}")
+        
+        self.word_count = word_count
+        self.lower_count = lower_count
+        self.max_distance = max_distance
+        self.dictionary_hash = digest.decode('ascii')
+        
+        self._views = []
+        for i, name in enumerate(SECTIONS):
+            offset, length = SECTION_ENTRY.unpack_from(
+                self.buffer, HEADER.size + i * SECTION_ENTRY.size)
+            view = self.buffer[offset:offset + length]
+            self._views.append(view)
+            if name in ARRAY_TYPES:
+                view = view.cast(ARRAY_TYPES[name])
+                self._views.append(view)
+            setattr(self, name, view)
+        
+        self.canonical = CanonicalWords(self)
+    
+    @classmethod
+    def open(cls, path: str) -> 'MappedDictionary':
+        """Memory-map a compiled index file."""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, owner=mapped)
+    
+    @classmethod
+    def attach(cls, name: str) -> 'MappedDictionary':
+        """Read an index from a shared-memory segment in place."""
+        segment = attach_segment(name)
+        return cls(segment.buf, owner=segment)
+    
+    def close(self):
+        """Release the buffer (and the mapping or segment, if this view owns it)."""
+        for view in reversed(self._views):
+            view.release()
+        self.buffer.release()
+        if isinstance(self._owner, (mmap.mmap, shared_memory.SharedMemory)):
+            self._owner.close()
+    
+    def word(self, word_id: int) -> str:
+        """Decode a canonical word by id."""
+        return bytes(self.words[self.word_offsets[word_id]:self.word_offsets[word_id + 1]]).decode('utf-8')
+    
+    def lower_word(self, lower_id: int) -> str:
+        """Decode a lowercased word by id."""
+        return bytes(self.lower[self.lower_offsets[lower_id]:self.lower_offsets[lower_id + 1]]).decode('utf-8')
+    
+    def _find(self, key: str, hashes, ids, blob, offsets) -> int:
+        """Find a key's id in one of the hash tables, or -1."""
+        data = key.encode('utf-8')
+        h = zlib.crc32(data)
+        i = bisect.bisect_left(hashes, h)
+        while i < len(hashes) and hashes[i] == h:
+            key_id = ids[i]
+            if blob[offsets[key_id]:offsets[key_id + 1]] == data:
+                return key_id
+            i += 1
+        return -1
+    
+    def lower_id(self, lower: str) -> int:
+        """Get the id of a lowercased word, or -1."""
+        return self._find(lower, self.lower_hashes, self.lower_ids,
+                          self.lower, self.lower_offsets)
+    
+    def word_id(self, word: str) -> int:
+        """Get the id of an exact canonical word, or -1."""
+        return self._find(word, self.word_hashes, self.word_ids,
+                          self.words, self.word_offsets)
+    
+    def is_letter_word(self, lower_id: int) -> bool:
+        """Check whether a lowercased word is made only of a-z."""
+        return bool(self.letter_flags[lower_id])
+    
+    def _posting_ids(self, key: str, hashes, starts, ids) -> memoryview:
+        h = _key_hash(key)
+        i = bisect.bisect_left(hashes, h)
+        if i == len(hashes) or hashes[i] != h:
+            return ids[0:0]
+        return ids[starts[i]:starts[i + 1]]
+    
+    def delete_postings(self, variant: str) -> memoryview:
+        """Get lowercase ids stored under a delete variant (may include collisions)."""
+        return self._posting_ids(variant, self.delete_hashes, self.delete_starts, self.delete_ids)
+    
+    def phonetic_postings(self, key: str) -> memoryview:
+        """Get lowercase ids stored under a phonetic key (may include collisions)."""
+        return self._posting_ids(key, self.phonetic_hashes, self.phonetic_starts, self.phonetic_ids)
+    
+    def __contains__(self, lower) -> bool:
+        return isinstance(lower, str) and self.lower_id(lower) >= 0
+    
+    def intersection(self, lowers: Iterable[str]) -> Set[str]:
+        """Return the lowercased dictionary words among lowers, checked in bulk.
+        
+        Distinct keys are hashed a chunk at a time and located in the sorted
+        hash table with one NumPy searchsorted per chunk; only hash hits are
+        then compared byte for byte. Without NumPy each key is looked up on
+        its own.
+        """
+        if np is None:
+            return {key for key in set(lowers) if self.lower_id(key) >= 0}
+        table = np.frombuffer(self.lower_hashes, dtype=np.uint32)
+        found = set()
+        if not len(table):
+            return found
+        
+        lowers = iter(lowers)
+        while True:
+            keys = list(set(islice(lowers, INTERSECTION_CHUNK)))
+            if not keys:
+                return found
+            hashes = np.fromiter(map(zlib.crc32, map(str.encode, keys)), dtype=np.uint32, count=len(keys))
+            positions = np.minimum(np.searchsorted(table, hashes), len(table) - 1)
+            for i in np.flatnonzero(table[positions] == hashes).tolist():
+                if self.lower_id(keys[i]) >= 0:
+                    found.add(keys[i])
+    
+    def __getitem__(self, lower: str) -> str:
+        lower_id = self.lower_id(lower)
+        if lower_id < 0:
+            raise KeyError(lower)
+        return self.word(self.lower_canonical[lower_id])
+    
+    def get(self, lower: str, default=None):
+        lower_id = self.lower_id(lower)
+        if lower_id < 0:
+            return default
+        return self.word(self.lower_canonical[lower_id])
+    
+    def __len__(self) -> int:
+        return self.lower_count
+    
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self.lower_count):
+            yield self.lower_word(i)
+    
+    def keys(self) -> 'MappedDictionary':
+        return self
+
+
+class CanonicalWords:
+    """Set-like view of the exact (canonical-case) words in a MappedDictionary."""
+    
+    def __init__(self, mapped: MappedDictionary):
+        self.mapped = mapped
+    
+    def __contains__(self, word) -> bool:
+        return isinstance(word, str) and self.mapped.word_id(word) >= 0
+    
+    def __len__(self) -> int:
+        return self.mapped.word_count
+    
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self.mapped.word_count):
+            yield self.mapped.word(i)
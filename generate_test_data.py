@@ -5,6 +5,7 @@ Generate Test Data for Spell Correction
 Creates:
 - reference.txt: ~5000 correct non-English words in English script
 - errors.txt: ~10000+ misspelled versions with various error types
+- optionally, a labels file: error, reference word and error type per line
 """
 
 import random
@@ -14,7 +15,12 @@ import string
 class TestDataGenerator:
     """Generate test data for spell correction."""
     
-    def __init__(self):
+    # Error generators by the type name recorded in labels files.
+    ERROR_TYPES = ('case', 'phonetic', 'typo', 'repetition', 'combined')
+    
+    def __init__(self, seed=None):
+        # A private RNG, so a seed reproduces the same files on every run.
+        self.random = random.Random(seed)
         self.base_words = [
             "Aam", "Ram", "Sita", "Krishna", "Radha", "Gita", "Bharat", "Delhi",
             "Mumbai", "Pune", "Ahmedabad", "Surat", "Vadodara", "Rajkot",
@@ -69,6 +75,7 @@ class TestDataGenerator:
             "Pivanu", "Bethanu", "Ubhanu", "Chalvu", "Aavvu", "Javvu",
             "Ghanu", "Thodu", "Motu", "Patlu", "Lambu", "Nanhu",
         ]
+        self._known = set(self.base_words)
         self._expand_word_list()
     
     def _expand_word_list(self):
@@ -88,35 +95,38 @@ class TestDataGenerator:
         ]
         
         for i in range(2000):
-            word = random.choice(syllables) + random.choice(syllables).lower()
-            if word not in self.base_words and len(word) >= 3:
+            word = self.random.choice(syllables) + self.random.choice(syllables).lower()
+            if word not in self._known and len(word) >= 3:
+                self._known.add(word)
                 self.base_words.append(word)
         
         for i in range(1500):
-            word = (random.choice(syllables) + 
-                   random.choice(syllables).lower() + 
-                   random.choice(syllables).lower())
-            if word not in self.base_words and len(word) >= 4:
+            word = (self.random.choice(syllables) + 
+                   self.random.choice(syllables).lower() + 
+                   self.random.choice(syllables).lower())
+            if word not in self._known and len(word) >= 4:
+                self._known.add(word)
                 self.base_words.append(word)
         
         for i in range(500):
-            word = (random.choice(syllables) + 
-                   random.choice(syllables).lower() + 
-                   random.choice(syllables).lower() + 
-                   random.choice(syllables).lower())
-            if word not in self.base_words and len(word) >= 5:
+            word = (self.random.choice(syllables) + 
+                   self.random.choice(syllables).lower() + 
+                   self.random.choice(syllables).lower() + 
+                   self.random.choice(syllables).lower())
+            if word not in self._known and len(word) >= 5:
+                self._known.add(word)
                 self.base_words.append(word)
     
     def generate_case_error(self, word: str) -> str:
         """Generate case-related errors."""
-        error_type = random.choice(['upper', 'lower', 'random'])
+        error_type = self.random.choice(['upper', 'lower', 'random'])
         
         if error_type == 'upper':
             return word.upper()
         elif error_type == 'lower':
             return word.lower()
         else:
-            return ''.join(c.upper() if random.random() > 0.5 else c.lower() for c in word)
+            return ''.join(c.upper() if self.random.random() > 0.5 else c.lower() for c in word)
     
     def generate_phonetic_error(self, word: str) -> str:
         """Generate phonetic errors (sound-alike substitutions)."""
@@ -150,13 +160,13 @@ class TestDataGenerator:
         if len(word_list) == 0:
             return word
         
-        num_changes = random.randint(1, min(2, len(word_list)))
-        positions = random.sample(range(len(word_list)), num_changes)
+        num_changes = self.random.randint(1, min(2, len(word_list)))
+        positions = self.random.sample(range(len(word_list)), num_changes)
         
         for pos in positions:
             char = word_list[pos]
             if char in phonetic_map:
-                word_list[pos] = random.choice(phonetic_map[char])
+                word_list[pos] = self.random.choice(phonetic_map[char])
         
         result = ''.join(word_list)
         if word[0].isupper():
@@ -165,23 +175,23 @@ class TestDataGenerator:
     
     def generate_typo_error(self, word: str) -> str:
         """Generate typing errors (missing, extra, transposed characters)."""
-        error_type = random.choice(['delete', 'insert', 'transpose', 'substitute'])
+        error_type = self.random.choice(['delete', 'insert', 'transpose', 'substitute'])
         word_list = list(word)
         
         if len(word_list) <= 1:
             return word
         
         if error_type == 'delete':
-            pos = random.randint(0, len(word_list) - 1)
+            pos = self.random.randint(0, len(word_list) - 1)
             word_list.pop(pos)
         
         elif error_type == 'insert':
-            pos = random.randint(0, len(word_list))
-            char = random.choice(string.ascii_lowercase)
+            pos = self.random.randint(0, len(word_list))
+            char = self.random.choice(string.ascii_lowercase)
             word_list.insert(pos, char)
         
         elif error_type == 'transpose':
-            pos = random.randint(0, len(word_list) - 2)
+            pos = self.random.randint(0, len(word_list) - 2)
             word_list[pos], word_list[pos + 1] = word_list[pos + 1], word_list[pos]
         
         elif error_type == 'substitute':
@@ -193,10 +203,10 @@ class TestDataGenerator:
                 'u': 'yij', 'v': 'cfgb', 'w': 'qase', 'x': 'zsdc', 'y': 'tuh',
                 'z': 'asx'
             }
-            pos = random.randint(0, len(word_list) - 1)
+            pos = self.random.randint(0, len(word_list) - 1)
             char = word_list[pos].lower()
             if char in keyboard_neighbors:
-                word_list[pos] = random.choice(keyboard_neighbors[char])
+                word_list[pos] = self.random.choice(keyboard_neighbors[char])
         
         return ''.join(word_list)
     
@@ -206,8 +216,8 @@ class TestDataGenerator:
         if len(word_list) <= 1:
             return word
         
-        if random.random() > 0.5:
-            pos = random.randint(0, len(word_list) - 1)
+        if self.random.random() > 0.5:
+            pos = self.random.randint(0, len(word_list) - 1)
             word_list.insert(pos, word_list[pos])
         else:
             for i in range(len(word_list) - 1):
@@ -219,7 +229,7 @@ class TestDataGenerator:
     
     def generate_combined_error(self, word: str) -> str:
         """Generate multiple types of errors combined."""
-        num_errors = random.randint(2, 3)
+        num_errors = self.random.randint(2, 3)
         error_functions = [
             self.generate_case_error,
             self.generate_phonetic_error,
@@ -228,7 +238,7 @@ class TestDataGenerator:
         ]
         
         result = word
-        selected_errors = random.sample(error_functions, num_errors)
+        selected_errors = self.random.sample(error_functions, num_errors)
         for error_func in selected_errors:
             result = error_func(result)
         
@@ -236,71 +246,94 @@ class TestDataGenerator:
     
     def generate_errors(self, word: str, count: int = 2) -> list:
         """Generate multiple error variations of a word."""
+        return [error for error, _ in self.generate_labelled_errors(word, count)]
+    
+    def generate_labelled_errors(self, word: str, count: int = 2) -> list:
+        """Generate multiple error variations of a word as (error, error type) pairs."""
         errors = []
-        error_generators = [
-            self.generate_case_error,
-            self.generate_phonetic_error,
-            self.generate_typo_error,
-            self.generate_repetition_error,
-            self.generate_combined_error
-        ]
+        seen = set()
         
         for _ in range(count):
-            error_func = random.choice(error_generators)
-            error_word = error_func(word)
-            if error_word != word and error_word not in errors:
-                errors.append(error_word)
+            error_type = self.random.choice(self.ERROR_TYPES)
+            error_word = getattr(self, f'generate_{error_type}_error')(word)
+            if error_word != word and error_word not in seen:
+                seen.add(error_word)
+                errors.append((error_word, error_type))
         
         return errors
     
     def generate_files(self, reference_file: str = 'reference.txt', 
                       errors_file: str = 'errors.txt',
                       num_reference_words: int = 5000,
-                      num_error_words: int = 10000):
-        """Generate reference and errors files."""
-        print(f"Generating {num_reference_words} reference words...")
+                      num_error_words: int = 10000,
+                      labels_file: str = None,
+                      verbose: bool = True):
+        """Generate reference and errors files (and a labels file if requested).
+        
+        Each labels line is tab-separated: error, reference word, error type.
+        """
+        log = print if verbose else (lambda *args, **kwargs: None)
+        log(f"Generating {num_reference_words} reference words...")
         
         while len(self.base_words) < num_reference_words:
             self._expand_word_list()
         
-        reference_words = list(set(self.base_words[:num_reference_words]))
+        # Sorted, so choices below don't depend on set iteration order.
+        reference_words = sorted(set(self.base_words[:num_reference_words]))
         
         with open(reference_file, 'w', encoding='utf-8') as f:
             for word in sorted(reference_words):
                 f.write(word + '\n')
         
-        print(f"Generated {len(reference_words)} reference words in {reference_file}")
+        log(f"Generated {len(reference_words)} reference words in {reference_file}")
         
-        print(f"Generating {num_error_words} error words...")
-        error_words = []
+        log(f"Generating {num_error_words} error words...")
+        labelled = []
         
-        while len(error_words) < num_error_words:
-            word = random.choice(reference_words)
-            errors = self.generate_errors(word, count=random.randint(1, 3))
-            error_words.extend(errors)
+        while len(labelled) < num_error_words:
+            word = self.random.choice(reference_words)
+            errors = self.generate_labelled_errors(word, count=self.random.randint(1, 3))
+            labelled.extend((error, word, error_type) for error, error_type in errors)
         
-        error_words = error_words[:num_error_words]
-        random.shuffle(error_words)
+        labelled = labelled[:num_error_words]
+        self.random.shuffle(labelled)
+        error_words = [error for error, _, _ in labelled]
         
         with open(errors_file, 'w', encoding='utf-8') as f:
             for error in error_words:
                 f.write(error + '\n')
         
-        print(f"Generated {len(error_words)} error words in {errors_file}")
-        print("\nTest data generation complete!")
-        print(f"\nExample errors generated:")
+        if labels_file:
+            with open(labels_file, 'w', encoding='utf-8') as f:
+                for error, word, error_type in labelled:
+                    f.write(f"{error}\t{word}\t{error_type}\n")
+        
+        log(f"Generated {len(error_words)} error words in {errors_file}")
+        log("\nTest data generation complete!")
+        log(f"\nExample errors generated:")
         for i in range(min(20, len(error_words))):
-            print(f"  {error_words[i]}")
+            log(f"  {error_words[i]}")
 
 
 def main():
     """Main function to generate test data."""
-    generator = TestDataGenerator()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Generate a reference dictionary and misspelled words.')
+    parser.add_argument('--seed', type=int, help='seed for reproducible output')
+    parser.add_argument('--reference-words', type=int, default=5000)
+    parser.add_argument('--error-words', type=int, default=10000)
+    parser.add_argument('--labels', metavar='FILE',
+                        help='also write error, reference word and error type per line')
+    args = parser.parse_args()
+    
+    generator = TestDataGenerator(seed=args.seed)
     generator.generate_files(
         reference_file='reference.txt',
         errors_file='errors.txt',
-        num_reference_words=5000,
-        num_error_words=10000
+        num_reference_words=args.reference_words,
+        num_error_words=args.error_words,
+        labels_file=args.labels
     )
 
 
@@ -0,0 +1,125 @@
+"""
+Zero-downtime dictionary reloads for long-running spell correction services.
+
+A ReloadingCorrector serves every call from one SpellCorrector snapshot. When
+the dictionary file changes, a complete new snapshot is built in a background
+thread and swapped in with a single reference assignment, so in-flight
+correct_word calls keep the snapshot they started with and never see a
+half-built index.
+"""
+
+import os
+import sys
+import threading
+from typing import List, Tuple, Iterable, Optional
+
+from spell_corrector import SpellCorrector
+
+
+class ReloadingCorrector:
+    """SpellCorrector front end that rebuilds and swaps its snapshot when the dictionary file changes."""
+    
+    def __init__(self, dictionary_file: str, interval: float = 2.0, **options):
+        self.dictionary_file = dictionary_file
+        self.interval = interval
+        self.options = options
+        
+        self.snapshot = SpellCorrector(dictionary_file, **options)
+        self.reloads = 0
+        self.last_error: Optional[Exception] = None
+        
+        self._signature = self._file_signature()
+        self._pending_signature = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def __getattr__(self, name):
+        # Everything else (suggest, stats, metrics, ...) comes from the live snapshot.
+        return getattr(self.snapshot, name)
+    
+    def correct_word(self, word: str, *args, **kwargs) -> str:
+        """Correct a word against the current snapshot; budgets pass through to correct_word."""
+        return self.snapshot.correct_word(word, *args, **kwargs)
+    
+    def correct_batch(self, words: Iterable[str], *args, **kwargs) -> List[str]:
+        """Correct a batch of words against one snapshot; budgets pass through to correct_batch."""
+        return self.snapshot.correct_batch(words, *args, **kwargs)
+    
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.dictionary_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def check(self) -> bool:
+        """Reload if the file changed and has stayed unchanged for one poll; return whether it did."""
+        signature = self._file_signature()
+        if signature is None or signature == self._signature:
+            self._pending_signature = None
+            return False
+        
+        # Wait until a change holds still for one interval, so a file that is
+        # still being written is not loaded half-way.
+        if signature != self._pending_signature:
+            self._pending_signature = signature
+            return False
+        
+        return self.reload()
+    
+    def reload(self) -> bool:
+        """Build a new snapshot from the dictionary file and swap it in; return whether it succeeded."""
+        with self._reload_lock:
+            signature = self._file_signature()
+            old = self.snapshot
+            
+            # The cache, stats and metrics carry over, so they are attached
+            # after the build rather than opened a second time.
+            options = dict(self.options, cache_size=0, cache_file=None, metrics=None)
+            try:
+                new = SpellCorrector(self.dictionary_file, **options)
+            except Exception as e:
+                self.last_error = e
+                print(f"Reload of {self.dictionary_file} failed, keeping the current dictionary: {e}",
+                      file=sys.stderr)
+                return False
+            
+            new.cache_size = old.cache_size
+            new.cache = old.cache
+            new.stats = old.stats
+            new.metrics = old.metrics
+            
+            self.snapshot = new
+            # Calls still running on the old snapshot keep their mapping.
+            old.unlink_shared()
+            if new.cache is not None:
+                # Calls still running on the old snapshot pass its dictionary hash
+                # and are ignored by the cache from here on.
+                new.cache.reset(new.dictionary_hash())
+            
+            self._signature = signature
+            self._pending_signature = None
+            self.reloads += 1
+            self.last_error = None
+            return True
+    
+    def start(self):
+        """Poll the dictionary file every interval seconds in a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='dictionary-reload', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the polling thread."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+    
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self.check()
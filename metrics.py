@@ -0,0 +1,299 @@
+"""
+Per-tier latency and candidate-volume metrics for the spell corrector.
+
+Observations go into sparse log-bucketed histograms, so memory stays bounded
+however many words are corrected and quantiles are accurate to a few percent.
+Snapshots export as JSON or Prometheus text format and merge across workers.
+Each thread records into its own histograms, which are folded together on read.
+"""
+
+import heapq
+import json
+import math
+import threading
+from collections import defaultdict
+from typing import List, Tuple, Dict
+
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Inputs kept for the "largest" lists (slowest words, biggest expansions).
+TOP_N = 10
+
+
+class Histogram:
+    """Sparse histogram of non-negative values in geometric buckets."""
+    
+    # Each bucket spans a factor of GROWTH, so quantiles are within ~2%.
+    GROWTH = 1.04
+    
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+    
+    def observe(self, value: float):
+        """Add one observation."""
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        
+        if value <= 0:
+            self.zeros += 1
+            return
+        key = math.floor(math.log(value, self.GROWTH))
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+    
+    def merge(self, other: 'Histogram'):
+        """Fold another histogram's observations into this one."""
+        self.count += other.count
+        self.total += other.total
+        self.zeros += other.zeros
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for key, count in list(other.buckets.items()):
+            self.buckets[key] = self.buckets.get(key, 0) + count
+    
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile (nearest rank, bucket midpoint)."""
+        if self.count == 0:
+            return 0.0
+        
+        rank = max(1, math.ceil(q * self.count))
+        seen = self.zeros
+        if seen >= rank:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen >= rank:
+                value = self.GROWTH ** (key + 0.5)
+                return min(max(value, self.min), self.max)
+        return self.max
+    
+    def to_dict(self) -> Dict[str, float]:
+        """Summarise as count, sum, min, max, mean and the QUANTILES."""
+        summary = {
+            'count': self.count,
+            'sum': self.total,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'mean': self.total / self.count if self.count else 0.0,
+        }
+        for q in QUANTILES:
+            summary[f'p{round(q * 100)}'] = self.quantile(q)
+        return summary
+
+
+class MetricsRecorder:
+    """Per-word, per-tier and selection metrics recorded by a single thread."""
+    
+    def __init__(self):
+        self.resolved: Dict[str, int] = defaultdict(int)
+        self.skipped: Dict[str, int] = defaultdict(int)
+        self.word_seconds = Histogram()
+        self.tier_seconds: Dict[str, Histogram] = defaultdict(Histogram)
+        self.tier_generated: Dict[str, Histogram] = defaultdict(Histogram)
+        self.tier_found: Dict[str, Histogram] = defaultdict(Histogram)
+        self.select_seconds = Histogram()
+        self.select_candidates = Histogram()
+        
+        # Min-heaps holding the TOP_N largest observations.
+        self.slowest_words: List[Tuple[float, str, str]] = []
+        self.largest_expansions: List[Tuple[int, str, str]] = []
+    
+    @staticmethod
+    def _keep_largest(heap: list, item: tuple):
+        if len(heap) < TOP_N:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    
+    def observe_word(self, word: str, tier: str, seconds: float):
+        """Record one corrected word, the tier that resolved it and its latency."""
+        self.resolved[tier] += 1
+        self.word_seconds.observe(seconds)
+        self._keep_largest(self.slowest_words, (seconds, word, tier))
+    
+    def observe_tier(self, word: str, tier: str, seconds: float, generated: int, found: int):
+        """Record one candidate tier probe: its latency and candidate volumes."""
+        self.tier_seconds[tier].observe(seconds)
+        self.tier_generated[tier].observe(generated)
+        self.tier_found[tier].observe(found)
+        self._keep_largest(self.largest_expansions, (generated, word, tier))
+    
+    def observe_skipped(self, tier: str):
+        """Record one tier skipped because it did not fit a word's budget."""
+        self.skipped[tier] += 1
+    
+    def observe_selection(self, seconds: float, candidates: int):
+        """Record one select_best_candidate call."""
+        self.select_seconds.observe(seconds)
+        self.select_candidates.observe(candidates)
+    
+    def snapshot(self) -> 'MetricsRecorder':
+        """Everything recorded so far in one recorder; this one already is."""
+        return self
+    
+    def merge(self, other: 'MetricsRecorder'):
+        """Fold another instance (e.g. from a pool worker) into this one."""
+        self._fold(other.snapshot())
+    
+    def _fold(self, other: 'MetricsRecorder'):
+        # The other recorder's thread may still be observing, so its dicts
+        # and heaps are copied before iterating rather than walked live.
+        for tier, count in list(other.resolved.items()):
+            self.resolved[tier] += count
+        for tier, count in list(other.skipped.items()):
+            self.skipped[tier] += count
+        self.word_seconds.merge(other.word_seconds)
+        for mine, theirs in ((self.tier_seconds, other.tier_seconds),
+                             (self.tier_generated, other.tier_generated),
+                             (self.tier_found, other.tier_found)):
+            for tier, histogram in list(theirs.items()):
+                mine[tier].merge(histogram)
+        self.select_seconds.merge(other.select_seconds)
+        self.select_candidates.merge(other.select_candidates)
+        
+        for item in list(other.slowest_words):
+            self._keep_largest(self.slowest_words, item)
+        for item in list(other.largest_expansions):
+            self._keep_largest(self.largest_expansions, item)
+    
+    def to_dict(self) -> dict:
+        """Snapshot every metric as plain JSON-serialisable data."""
+        return {
+            'resolved': dict(self.resolved),
+            'skipped': dict(self.skipped),
+            'word_seconds': self.word_seconds.to_dict(),
+            'tiers': {
+                tier: {
+                    'seconds': self.tier_seconds[tier].to_dict(),
+                    'generated': self.tier_generated[tier].to_dict(),
+                    'found': self.tier_found[tier].to_dict(),
+                }
+                for tier in self.tier_seconds
+            },
+            'select_seconds': self.select_seconds.to_dict(),
+            'select_candidates': self.select_candidates.to_dict(),
+            'slowest_words': [
+                {'word': word, 'tier': tier, 'seconds': seconds}
+                for seconds, word, tier in sorted(self.slowest_words, reverse=True)
+            ],
+            'largest_expansions': [
+                {'word': word, 'tier': tier, 'generated': generated}
+                for generated, word, tier in sorted(self.largest_expansions, reverse=True)
+            ],
+        }
+    
+    def to_json(self) -> str:
+        """Render the snapshot as indented JSON."""
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+    
+    def to_prometheus(self, prefix: str = 'spell_corrector') -> str:
+        """Render counters and quantile summaries in Prometheus text format."""
+        lines = [
+            f'# HELP {prefix}_words_total Words corrected, by the tier that resolved them.',
+            f'# TYPE {prefix}_words_total counter',
+        ]
+        for tier in sorted(self.resolved):
+            lines.append(f'{prefix}_words_total{{tier="{tier}"}} {self.resolved[tier]}')
+        
+        lines.append(f'# HELP {prefix}_tier_skipped_total Tier probes skipped to stay within a word budget.')
+        lines.append(f'# TYPE {prefix}_tier_skipped_total counter')
+        for tier in sorted(self.skipped):
+            lines.append(f'{prefix}_tier_skipped_total{{tier="{tier}"}} {self.skipped[tier]}')
+        
+        def summary(name: str, help_text: str, series: Dict[str, Histogram]):
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} summary')
+            for tier in sorted(series):
+                histogram = series[tier]
+                labels = f'tier="{tier}",' if tier else ''
+                for q in QUANTILES:
+                    lines.append(f'{prefix}_{name}{{{labels}quantile="{q}"}} {histogram.quantile(q):.9g}')
+                labels = f'{{tier="{tier}"}}' if tier else ''
+                lines.append(f'{prefix}_{name}_sum{labels} {histogram.total:.9g}')
+                lines.append(f'{prefix}_{name}_count{labels} {histogram.count}')
+        
+        summary('word_seconds', 'Per-word correction latency.', {'': self.word_seconds})
+        summary('tier_seconds', 'Time spent in each candidate tier.', self.tier_seconds)
+        summary('tier_generated_candidates', 'Candidate strings generated per tier probe.',
+                self.tier_generated)
+        summary('tier_found_candidates', 'Dictionary words found per tier probe.', self.tier_found)
+        summary('select_seconds', 'Time spent in select_best_candidate.', {'': self.select_seconds})
+        summary('select_candidates', 'Candidates scored per select_best_candidate call.',
+                {'': self.select_candidates})
+        
+        return '\n'.join(lines) + '\n'
+
+
+class CorrectionMetrics(MetricsRecorder):
+    """Aggregated per-word, per-tier and selection metrics for SpellCorrector.
+    
+    Safe to share between threads: every thread observes into its own
+    MetricsRecorder, registered on first use, so recording takes no lock and
+    no histogram is ever updated by two threads. Reads fold the per-thread
+    recorders (and anything merged in from workers) into one snapshot.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._threads = threading.local()
+        self._recorders: List[MetricsRecorder] = []
+    
+    def __getstate__(self):
+        # Pool workers send their metrics back pickled; locks and thread-locals
+        # do not pickle, so the folded snapshot travels instead.
+        return self.snapshot().__dict__
+    
+    def __setstate__(self, state):
+        self.__init__()
+        self.__dict__.update(state)
+    
+    def local(self) -> MetricsRecorder:
+        """The calling thread's recorder."""
+        recorder = getattr(self._threads, 'recorder', None)
+        if recorder is None:
+            recorder = self._threads.recorder = MetricsRecorder()
+            with self._lock:
+                self._recorders.append(recorder)
+        return recorder
+    
+    def observe_word(self, word: str, tier: str, seconds: float):
+        self.local().observe_word(word, tier, seconds)
+    
+    def observe_tier(self, word: str, tier: str, seconds: float, generated: int, found: int):
+        self.local().observe_tier(word, tier, seconds, generated, found)
+    
+    def observe_skipped(self, tier: str):
+        self.local().observe_skipped(tier)
+    
+    def observe_selection(self, seconds: float, candidates: int):
+        self.local().observe_selection(seconds, candidates)
+    
+    def merge(self, other: MetricsRecorder):
+        """Fold another instance (e.g. from a pool worker) into the calling thread's recorder."""
+        self.local()._fold(other.snapshot())
+    
+    def snapshot(self) -> MetricsRecorder:
+        """Fold every thread's recorder and the merged-in metrics into a new recorder."""
+        total = MetricsRecorder()
+        total._fold(self)
+        with self._lock:
+            recorders = list(self._recorders)
+        for recorder in recorders:
+            total._fold(recorder)
+        return total
+    
+    def to_dict(self) -> dict:
+        return self.snapshot().to_dict()
+    
+    def to_prometheus(self, prefix: str = 'spell_corrector') -> str:
+        return self.snapshot().to_prometheus(prefix)
@@ -0,0 +1,425 @@
+"""
+Language-partitioned dictionaries for the spell corrector.
+
+Each tagged word list (e.g. Hindi, Gujarati, names) gets its own SpellCorrector
+indexes. A character n-gram router ranks the partitions for every input word;
+each candidate tier probes the most likely partitions first and only falls
+back to the others when they find nothing at that tier.
+"""
+
+import copy
+import math
+import time
+from collections import defaultdict
+from typing import List, Tuple, Dict, Set, Iterable, Iterator, Optional
+
+from dictionary_index import content_hash
+from spell_corrector import (SpellCorrector, CorrectionBudget, DictionaryIndex, IndexField,
+                             ThreadCounters, pins_index)
+
+
+class LanguageRouter:
+    """Character n-gram classifier that ranks dictionary partitions for a word.
+    
+    Every partition is profiled by the boundary-marked n-grams of its words,
+    so endings such as Gujarati -vu/-nu or Hindi -na count as 'vu$', 'nu$'
+    and 'na$'. Scores are mean per-n-gram log-likelihoods with add-one
+    smoothing, which keeps short and long words on one scale.
+    """
+    
+    def __init__(self, partitions: Dict[str, Iterable[str]], n: int = 3):
+        self.n = n
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self.totals: Dict[str, int] = {}
+        self.vocabulary: Set[str] = set()
+        
+        for tag, words in partitions.items():
+            self.counts[tag] = defaultdict(int)
+            self.totals[tag] = 0
+            for word in words:
+                self.add(tag, word)
+    
+    def grams(self, word: str) -> List[str]:
+        """Split a word into its '^'/'$'-padded character n-grams."""
+        padded = '^' + word.lower() + '$'
+        if len(padded) <= self.n:
+            return [padded]
+        return [padded[i:i + self.n] for i in range(len(padded) - self.n + 1)]
+    
+    def copy(self) -> 'LanguageRouter':
+        """Copy the profiles, so edits to the copy leave this router unchanged."""
+        router = copy.copy(self)
+        router.counts = {tag: copy.copy(counts) for tag, counts in self.counts.items()}
+        router.totals = dict(self.totals)
+        router.vocabulary = set(self.vocabulary)
+        return router
+    
+    def add(self, tag: str, word: str):
+        """Count a word's n-grams towards a partition's profile."""
+        counts = self.counts[tag]
+        for gram in self.grams(word):
+            counts[gram] += 1
+            self.vocabulary.add(gram)
+        self.totals[tag] += len(self.grams(word))
+    
+    def remove(self, tag: str, word: str):
+        """Take a word's n-grams back out of a partition's profile."""
+        counts = self.counts[tag]
+        for gram in self.grams(word):
+            if counts.get(gram, 0) > 0:
+                counts[gram] -= 1
+        self.totals[tag] -= len(self.grams(word))
+    
+    def scores(self, word: str) -> Dict[str, float]:
+        """Mean log-likelihood of a word's n-grams under each partition."""
+        grams = self.grams(word)
+        vocabulary = len(self.vocabulary) + 1
+        scores = {}
+        for tag, counts in self.counts.items():
+            log_total = math.log(self.totals[tag] + vocabulary)
+            scores[tag] = sum(math.log(counts.get(gram, 0) + 1) for gram in grams) / len(grams) - log_total
+        return scores
+    
+    def best(self, word: str) -> str:
+        """The single most likely partition for a word."""
+        scores = self.scores(word)
+        return max(scores, key=scores.get)
+    
+    def route(self, word: str, margin: float) -> List[List[str]]:
+        """Group partitions into [likely, rest]; likely ones score within margin of the best."""
+        scores = self.scores(word)
+        top = max(scores.values())
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        likely = [tag for tag in ranked if scores[tag] >= top - margin]
+        rest = [tag for tag in ranked if scores[tag] < top - margin]
+        return [likely, rest] if rest else [likely]
+
+
+class UnionWords:
+    """Set-like view over several partitions' exact-word sets.
+    
+    The sets belong to one index version and never change, so the size is
+    counted once, or carried over from the previous version's view.
+    """
+    
+    def __init__(self, sets: List):
+        self.sets = sets
+        self.size: Optional[int] = None
+    
+    def __contains__(self, word) -> bool:
+        return any(word in words for words in self.sets)
+    
+    def __iter__(self) -> Iterator[str]:
+        seen = set()
+        for words in self.sets:
+            for word in words:
+                if word not in seen:
+                    seen.add(word)
+                    yield word
+    
+    def __len__(self) -> int:
+        if self.size is None:
+            self.size = sum(1 for _ in self)
+        return self.size
+    
+    def resize(self, previous: 'UnionWords', keys: Iterable[str]):
+        """Size this view from an earlier version's, given every key whose membership may differ."""
+        self.size = len(previous) + sum((key in self) - (key in previous) for key in set(keys))
+
+
+class UnionLookup(UnionWords):
+    """Lowercase -> canonical mapping over several partitions; the first partition holding a word wins."""
+    
+    def __getitem__(self, lower: str) -> str:
+        for mapping in self.sets:
+            if lower in mapping:
+                return mapping[lower]
+        raise KeyError(lower)
+    
+    def get(self, lower: str, default=None):
+        for mapping in self.sets:
+            if lower in mapping:
+                return mapping[lower]
+        return default
+    
+    def keys(self) -> 'UnionLookup':
+        return self
+
+
+class PartitionedIndex(DictionaryIndex):
+    """One version of every partition's index, with the router and union views over them.
+    
+    A version made by an edit takes its sizes from the previous one, so the
+    union is not counted again.
+    """
+    
+    def __init__(self, indexes: Dict[str, DictionaryIndex], router: LanguageRouter,
+                 previous: Optional['PartitionedIndex'] = None, edited: Iterable[str] = ()):
+        self.indexes = indexes
+        self.router = router
+        # Candidate structures live in the partitions; only the trie for
+        # suggest() is built here, over the union, on first use.
+        parts = list(indexes.values())
+        super().__init__(UnionWords([p.dictionary_set for p in parts]),
+                         UnionLookup([p.dictionary_lower for p in parts]), case_variants={})
+        if previous is not None:
+            edited = set(edited)
+            self.dictionary.resize(previous.dictionary, edited)
+            self.dictionary_lower.resize(previous.dictionary_lower, {word.lower() for word in edited})
+    
+    def dictionary_hash(self) -> str:
+        """Hash every partition's content together with its tag."""
+        if self._hash is None:
+            self._hash = content_hash(
+                f"{tag}\t{index.dictionary_hash()}" for tag, index in self.indexes.items())
+        return self._hash
+
+
+class PartitionedCorrector(SpellCorrector):
+    """SpellCorrector over several tagged dictionaries, each with its own indexes.
+    
+    ``partitions`` maps a tag to a word list or compiled index. Only the
+    partitions passed in are loaded, so a deployment can leave out the ones
+    it does not need.
+    """
+    
+    # Partitions scoring within this many nats per n-gram of the best one are
+    # probed together; the rest only when those find nothing at a tier.
+    ROUTING_MARGIN = 1.0
+    
+    router = IndexField()
+    
+    def __init__(self, partitions: Dict[str, str], margin: Optional[float] = None, **options):
+        if not partitions:
+            raise ValueError("At least one dictionary partition is required")
+        self.margin = self.ROUTING_MARGIN if margin is None else margin
+        self.route_stats = ThreadCounters(('likely', 'fallback', 'unresolved'))
+        super().__init__(dict(partitions), **options)
+    
+    def _load_indexes(self):
+        """Build one SpellCorrector per partition plus the router and union views."""
+        # In workers, shared_name maps each tag to the segment the parent built.
+        shared_names = self.shared_name or {}
+        self.partitions: Dict[str, SpellCorrector] = {
+            tag: SpellCorrector(path, engine=self.engine, fallback_distance=self.fallback_distance,
+                                qgram_distance=self.qgram_distance, compact=self.compact,
+                                shared_memory=self.shared_memory, shared_name=shared_names.get(tag),
+                                candidate_limit=self.candidate_limit)
+            for tag, path in self.dictionary_file.items()
+        }
+        parts = list(self.partitions.values())
+        if any(part.shared_name for part in parts):
+            self.shared_name = {tag: part.shared_name for tag, part in self.partitions.items()}
+        router = LanguageRouter({tag: part.dictionary_lower_set for tag, part in self.partitions.items()})
+        
+        self.mapped = None
+        self.index = PartitionedIndex({tag: part.index for tag, part in self.partitions.items()}, router)
+        self.tiers = parts[0].tiers
+    
+    def _pin_index(self, index: Optional[PartitionedIndex] = None):
+        """Pin this corrector's index version and, with it, the partition versions it was built from."""
+        super()._pin_index(index)
+        index = self._pin.index
+        for tag, part in self.partitions.items():
+            part._pin_index(index.indexes[tag])
+    
+    def _unpin_index(self):
+        for part in self.partitions.values():
+            part._unpin_index()
+        super()._unpin_index()
+    
+    def unlink_shared(self):
+        """Remove the shared-memory segments the partitions created."""
+        for part in self.partitions.values():
+            part.unlink_shared()
+    
+    def compile(self, output_path: str, max_distance: int = 2):
+        raise ValueError("Compile each partition's word list separately and pass the index files as partitions")
+    
+    def _shared_variants(self, tier: str, word_lower: str) -> Optional[Iterable[str]]:
+        """Variants a tier would generate in every partition alike, or None if it uses per-partition indexes."""
+        if tier == 'phonetic_variation':
+            return self.phonetic_variations(word_lower)
+        if self.engine == 'classic':
+            if tier == 'edit_distance_1':
+                return self.iter_edits1(word_lower)
+            if tier == 'edit_distance_2':
+                return self.iter_edits2(word_lower)
+        return None
+    
+    def _probe_shared(self, variants: Iterable[str]) -> Tuple[int, Dict[str, Set[str]]]:
+        """Probe every partition in one pass over lazily generated variants.
+        
+        Returns (variants probed, hits per partition); stops after
+        candidate_limit distinct hits across partitions when that is set.
+        """
+        lookups = [(tag, part.dictionary_lower_set) for tag, part in self.partitions.items()]
+        hits: Dict[str, Set[str]] = {tag: set() for tag in self.partitions}
+        limit = self.candidate_limit
+        found = 0
+        probed = 0
+        for probed, variant in enumerate(variants, 1):
+            for tag, lookup in lookups:
+                if variant in lookup and variant not in hits[tag]:
+                    hits[tag].add(variant)
+                    found += 1
+            if limit and found >= limit:
+                break
+        return probed, hits
+    
+    def estimate_work(self, tier: str, length: int) -> int:
+        """Predict strings probed across all partitions; shared variants count once."""
+        estimates = [part.estimate_work(tier, length) for part in self.partitions.values()]
+        if tier == 'phonetic_variation' or (self.engine == 'classic' and tier in
+                                            ('edit_distance_1', 'edit_distance_2')):
+            return estimates[0]
+        return sum(estimates)
+    
+    @pins_index
+    def resolve_candidates(self, word: str,
+                           budget: Optional[CorrectionBudget] = None) -> Tuple[str, Set[str]]:
+        """Probe each tier in the likely partitions first, then the rest."""
+        word_lower = word.lower()
+        
+        if word_lower in self.dictionary_lower_set:
+            canonical = self.dictionary_lower[word_lower]
+            return ('exact' if canonical == word else 'case'), {canonical}
+        
+        word_lower, found = self._resolve_canonical(word, word_lower)
+        if found:
+            return 'canonical', found
+        
+        groups = self.router.route(word_lower, self.margin)
+        route_stats = self.route_stats.local()
+        timed = self.metrics is not None or budget is not None
+        
+        for tier in self.tiers:
+            if budget is not None and not self._tier_allowed(budget, tier, word_lower):
+                continue
+            start = time.perf_counter() if timed else 0.0
+            generated, candidates = self._probe_routed(tier, word_lower, groups, route_stats)
+            if timed:
+                self._record_probe(word, tier, budget, time.perf_counter() - start,
+                                   generated, len(candidates))
+            if candidates:
+                return tier, candidates
+        
+        route_stats['unresolved'] += 1
+        return 'no_match', set()
+    
+    def _probe_routed(self, tier: str, word_lower: str, groups: List[List[str]],
+                      route_stats: Dict[str, int]) -> Tuple[int, Set[str]]:
+        """Run one tier over the routed partition groups in turn; return (strings generated, candidates)."""
+        variants = self._shared_variants(tier, word_lower)
+        generated, shared_hits = 0, None
+        if variants is not None:
+            generated, shared_hits = self._probe_shared(variants)
+        candidates = set()
+        
+        for rank, group in enumerate(groups):
+            for tag in group:
+                partition = self.partitions[tag]
+                if shared_hits is not None:
+                    found = shared_hits[tag]
+                else:
+                    count, found = partition.probe_tier(tier, word_lower)
+                    generated += count
+                candidates.update(partition.dictionary_lower[w] for w in found)
+            if candidates:
+                route_stats['likely' if rank == 0 else 'fallback'] += 1
+                break
+        return generated, candidates
+    
+    def _resolve_forms(self, forms: List[str]) -> Dict[str, Tuple[str, Set[str]]]:
+        """Resolve lowercased forms tier by tier, each probing its routed partitions in turn."""
+        groups = {form: self.router.route(form, self.margin) for form in forms}
+        route_stats = self.route_stats.local()
+        resolved = {}
+        for tier in self.tiers:
+            if not forms:
+                break
+            for form in forms:
+                candidates = self._probe_routed(tier, form, groups[form], route_stats)[1]
+                if candidates:
+                    resolved[form] = tier, candidates
+            forms = [form for form in forms if form not in resolved]
+        
+        for form in forms:
+            route_stats['unresolved'] += 1
+            resolved[form] = 'no_match', set()
+        return resolved
+    
+    def add_words(self, words: Iterable[str], partition: Optional[str] = None) -> int:
+        """Add words to the given partition, or to the one the router picks for each word.
+        
+        Partitions publish their new versions first; corrections keep using
+        the previous set of versions until this corrector publishes the new
+        set, router included, with one assignment.
+        """
+        if partition is not None and partition not in self.partitions:
+            raise ValueError(f"Unknown partition '{partition}', expected one of {list(self.partitions)}")
+        
+        with self._edit_lock:
+            index = self.index
+            grouped: Dict[str, List[str]] = defaultdict(list)
+            for word in words:
+                word = word.strip()
+                if word and word not in index.dictionary_set:
+                    grouped[partition or index.router.best(word)].append(word)
+            
+            added = 0
+            router = index.router.copy()
+            for tag, tag_words in grouped.items():
+                part = self.partitions[tag]
+                new_lowers = {w.lower() for w in tag_words if w.lower() not in part.index.dictionary_lower_set}
+                added += part.add_words(tag_words)
+                for lower in new_lowers:
+                    router.add(tag, lower)
+            
+            if added:
+                self._publish(router, [word for tag_words in grouped.values() for word in tag_words])
+            return added
+    
+    def remove_words(self, words: Iterable[str]) -> int:
+        """Remove exact words from every partition that holds them; return how many distinct words were found.
+        
+        Published like add_words.
+        """
+        with self._edit_lock:
+            grouped: Dict[str, List[str]] = defaultdict(list)
+            found: Set[str] = set()
+            for word in words:
+                word = word.strip()
+                for tag, part in self.partitions.items():
+                    if word in part.index.dictionary_set:
+                        grouped[tag].append(word)
+                        found.add(word)
+            
+            router = self.index.router.copy()
+            for tag, tag_words in grouped.items():
+                part = self.partitions[tag]
+                part.remove_words(tag_words)
+                for lower in {w.lower() for w in tag_words}:
+                    if lower not in part.index.dictionary_lower_set:
+                        router.remove(tag, lower)
+            
+            if found:
+                self._publish(router, found)
+            return len(found)
+    
+    def _publish(self, router: LanguageRouter, edited: Iterable[str]):
+        """Swap in an index version over the partitions' latest versions, given the words edited."""
+        self.index = PartitionedIndex({tag: part.index for tag, part in self.partitions.items()}, router,
+                                      self.index, edited)
+        self._dictionary_changed()
+
+
+def parse_partitions(specs: Iterable[str]) -> Dict[str, str]:
+    """Parse TAG=PATH command-line specs into an ordered tag -> path mapping."""
+    partitions = {}
+    for spec in specs:
+        tag, sep, path = spec.partition('=')
+        if not sep or not tag or not path:
+            raise ValueError(f"Expected TAG=PATH, got '{spec}'")
+        partitions[tag] = path
+    return partitions
@@ -0,0 +1,318 @@
+"""
+Profiling mode for the spell corrector: CPU and allocation hot spots.
+
+A batch runs under cProfile and tracemalloc. Time is reported per function
+from cProfile and as collapsed stacks for flame-graph tools. Allocations are
+attributed to pipeline stages (each candidate tier, candidate selection)
+by wrapping the corrector's stage methods: every call records its own time,
+less that of the stages it calls, and the peak traced memory it reached
+above what was live on entry.
+The same wrappers time each word: whole calls when words are corrected one
+by one, and each group's canonical probe, per-form tier searches and
+selection when correct_batch resolves them together.
+"""
+
+import os
+import io
+import time
+import heapq
+import pstats
+import cProfile
+import functools
+import tracemalloc
+import types
+from collections import defaultdict
+from typing import List, Tuple, Dict, Callable, Optional
+
+
+# Corrector methods timed and allocation-tracked as stages, with a function
+# naming the stage from the call's arguments.
+STAGES: Dict[str, Callable[..., str]] = {
+    'probe_tier': lambda tier, *args, **kwargs: tier,
+    '_probe_batch': lambda tier, *args, **kwargs: f'batch {tier}',
+    '_probe_shared': lambda *args, **kwargs: 'shared_variants',
+    'phonetic_variations': lambda *args, **kwargs: 'phonetic_variations',
+    '_select_best': lambda *args, **kwargs: 'select_best_candidate',
+}
+
+# Methods whose calls are charged to the word they serve for the slowest
+# words report, besides the stages; the corrector's own correct_batch is
+# wrapped too, to report each batch's words once it returns.
+WORD_METHODS = ('_correct_word', '_resolve_canonical', '_resolve_forms', '_probe_routed')
+
+# Collapsed-stack paths contributing less than this many microseconds are
+# dropped, which keeps deep, rarely taken call paths from exploding the file.
+MIN_STACK_MICROSECONDS = 1
+
+
+class StageStats:
+    """Calls, wall time and transient allocation peaks of one pipeline stage."""
+    
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.peak_total = 0
+        self.peak_max = 0
+    
+    def observe(self, seconds: float, peak: int):
+        self.calls += 1
+        self.seconds += seconds
+        self.peak_total += peak
+        self.peak_max = max(self.peak_max, peak)
+
+
+class CorrectionProfiler:
+    """Run a SpellCorrector under cProfile and tracemalloc and report where time and memory go.
+    
+    Meant for a single-process batch: the stage wrappers track allocation
+    peaks on one call stack at a time.
+    """
+    
+    def __init__(self, corrector, top_n: int = 20):
+        self.corrector = corrector
+        self.top_n = top_n
+        self.profile = cProfile.Profile()
+        self.stages: Dict[str, StageStats] = defaultdict(StageStats)
+        self.slowest_words: List[Tuple[float, str, str, int]] = []
+        self.words = 0
+        self._words_before = 0
+        self.elapsed = 0.0
+        
+        # [memory traced on entry, highest peak seen by finished inner calls,
+        #  seconds spent in the stages called inside]
+        self._frames: List[List[int]] = []
+        self._wrapped: List[Tuple[object, str]] = []
+        # The current batch: [seconds, peak, tier] per group's first word, and
+        # the word each searched form belongs to.
+        self._accounts: Dict[str, list] = {}
+        self._owners: Dict[str, str] = {}
+        self._started_tracemalloc = False
+        self._start = 0.0
+    
+    def start(self):
+        """Install the stage wrappers and start both profilers."""
+        targets = [self.corrector] + list(getattr(self.corrector, 'partitions', {}).values())
+        for target in targets:
+            for name, stage_name in STAGES.items():
+                if hasattr(target, name):
+                    self._wrap(target, name, stage_name)
+            for name in WORD_METHODS:
+                if hasattr(target, name):
+                    self._wrap(target, name, None)
+            if '_probe_batch' in target.__dict__:
+                self._split_batches(target)
+        self._wrap(self.corrector, 'correct_batch', None)
+        
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._words_before = self.corrector.stats['total_words']
+        self._start = time.perf_counter()
+        self.profile.enable()
+    
+    def stop(self):
+        """Stop profiling and restore the corrector's own methods."""
+        self.profile.disable()
+        self.elapsed = time.perf_counter() - self._start
+        self.words = self.corrector.stats['total_words'] - self._words_before
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        for target, name in self._wrapped:
+            del target.__dict__[name]
+        self._wrapped = []
+    
+    def __enter__(self) -> 'CorrectionProfiler':
+        self.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def _wrap(self, target, name: str, stage_name: Optional[Callable[..., str]]):
+        """Shadow a bound method with an instance attribute that measures each call."""
+        method = getattr(target, name)
+        
+        def measured(*args, **kwargs):
+            self._enter()
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                peak, own_seconds = self._exit(seconds, stage_name is not None)
+            if stage_name is not None:
+                self.stages[stage_name(*args, **kwargs)].observe(own_seconds, peak)
+            self._charge(name, args, result, seconds, peak)
+            return result
+        
+        # cProfile keys functions by code object, so every wrapper sharing one
+        # would merge all stages into a single node; give each its own, named
+        # after the method it measures.
+        code = measured.__code__.replace(co_name=name)
+        measured = functools.wraps(method)(types.FunctionType(
+            code, measured.__globals__, name, None, measured.__closure__))
+        target.__dict__[name] = measured
+        self._wrapped.append((target, name))
+    
+    def _split_batches(self, target):
+        """Make the wrapped _probe_batch search one form per call, so every form is timed on its own."""
+        probe_batch = target.__dict__['_probe_batch']
+        
+        def probe_forms(tier, forms):
+            hits = {}
+            for form in forms:
+                hits.update(probe_batch(tier, [form]))
+            return hits
+        
+        target.__dict__['_probe_batch'] = functools.wraps(probe_batch)(probe_forms)
+    
+    def _charge(self, name: str, args: tuple, result, seconds: float, peak: int):
+        """Charge one call to the word it served."""
+        if name == '_correct_word':
+            # One input word, returning (corrected, tier); the calls inside
+            # it were charged to the same word already.
+            self._observe_word(args[0], result[1], seconds, peak)
+            self._accounts.clear()
+            self._owners.clear()
+        elif name == 'correct_batch':
+            for word, (word_seconds, word_peak, tier) in self._accounts.items():
+                self._observe_word(word, tier, word_seconds, word_peak)
+            self._accounts.clear()
+            self._owners.clear()
+        elif name == '_resolve_canonical':
+            # (word, lowercase) -> (form the tiers search, canonical matches)
+            account = self._accounts.setdefault(args[0], [0.0, 0, 'no_match'])
+            self._owners.setdefault(result[0], args[0])
+            if result[1]:
+                account[2] = 'canonical'
+            self._add(account, seconds, peak)
+        elif name == '_resolve_forms':
+            for form, (tier, _) in result.items():
+                if form in self._owners:
+                    self._accounts[self._owners[form]][2] = tier
+        elif name == '_probe_batch':
+            self._add(self._accounts.get(self._owners.get(args[1][0])), seconds, peak)
+        elif name == '_probe_routed':
+            self._add(self._accounts.get(self._owners.get(args[1])), seconds, peak)
+        elif name == '_select_best':
+            self._add(self._accounts.get(args[0]), seconds, peak)
+    
+    @staticmethod
+    def _add(account: Optional[list], seconds: float, peak: int):
+        if account is not None:
+            account[0] += seconds
+            account[1] = max(account[1], peak)
+    
+    def _enter(self):
+        # reset_peak() forgets the enclosing call's peak so far, so keep it
+        # on the enclosing frame before resetting.
+        current, peak = tracemalloc.get_traced_memory()
+        if self._frames:
+            self._frames[-1][1] = max(self._frames[-1][1], peak)
+        tracemalloc.reset_peak()
+        self._frames.append([current, 0, 0.0])
+    
+    def _exit(self, seconds: float, stage: bool) -> Tuple[int, float]:
+        """Pop a call frame; return (bytes allocated above entry at peak, seconds outside nested stages)."""
+        entry, inner_peak, nested = self._frames.pop()
+        peak = max(tracemalloc.get_traced_memory()[1], inner_peak)
+        if self._frames:
+            self._frames[-1][1] = max(self._frames[-1][1], peak)
+            # A stage is nested time for the stages around it as a whole;
+            # other wrapped calls pass on the stage time inside them.
+            self._frames[-1][2] += seconds if stage else nested
+        return max(peak - entry, 0), seconds - nested
+    
+    def _observe_word(self, word: str, tier: str, seconds: float, peak: int):
+        item = (seconds, word, tier, peak)
+        if len(self.slowest_words) < self.top_n:
+            heapq.heappush(self.slowest_words, item)
+        elif item > self.slowest_words[0]:
+            heapq.heapreplace(self.slowest_words, item)
+    
+    def stats(self) -> pstats.Stats:
+        """The cProfile statistics of the run."""
+        return pstats.Stats(self.profile, stream=io.StringIO())
+    
+    def report(self) -> str:
+        """Render the stage table, the slowest words and the top functions by cumulative time."""
+        lines = [f"Profiled {self.words} words in {self.elapsed:.2f} s (cProfile and tracemalloc overhead included)",
+                 '',
+                 'Pipeline stages (time excludes nested stages, peaks include them)',
+                 '                             calls    self s   mean ms   peak KiB  mean KiB']
+        for name, stage in sorted(self.stages.items(), key=lambda item: -item[1].seconds):
+            lines.append(f"  {name:<24} {stage.calls:9d} {stage.seconds:9.3f} "
+                         f"{stage.seconds / stage.calls * 1000:9.3f} "
+                         f"{stage.peak_max / 1024:10.1f} {stage.peak_total / stage.calls / 1024:9.1f}")
+        
+        lines += ['', f'Slowest {len(self.slowest_words)} words                      ms   peak KiB  tier']
+        for seconds, word, tier, peak in sorted(self.slowest_words, reverse=True):
+            lines.append(f"  {word:<30} {seconds * 1000:9.2f} {peak / 1024:10.1f}  {tier}")
+        if not self.slowest_words:
+            lines.append('  none: no word needed a candidate search in this process')
+        
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.sort_stats('cumulative').print_stats(self.top_n)
+        lines += ['', f'Top {self.top_n} functions by cumulative time', stream.getvalue().strip()]
+        return '\n'.join(lines) + '\n'
+    
+    def write(self, prefix: str) -> List[str]:
+        """Write PREFIX.pstats, PREFIX.collapsed and PREFIX.txt; return their paths."""
+        paths = [prefix + '.pstats', prefix + '.collapsed', prefix + '.txt']
+        self.profile.dump_stats(paths[0])
+        with open(paths[1], 'w', encoding='utf-8') as f:
+            for stack, microseconds in sorted(collapsed_stacks(self.stats()).items()):
+                f.write(f"{stack} {microseconds}\n")
+        with open(paths[2], 'w', encoding='utf-8') as f:
+            f.write(self.report())
+        return paths
+
+
+def _label(function: Tuple[str, int, str]) -> str:
+    """Name a pstats function key as file:function, or the built-in's name."""
+    filename, _, name = function
+    if filename == '~':
+        return name.replace(';', ',')
+    return f"{os.path.basename(filename)}:{name}".replace(';', ',')
+
+
+def collapsed_stacks(stats: pstats.Stats) -> Dict[str, int]:
+    """Rebuild approximate call stacks from cProfile's caller/callee totals.
+    
+    cProfile keeps time per (caller, callee) edge rather than whole stacks,
+    so a function's own time is split over its callers in proportion to
+    the time each spent in it. Values are microseconds, one
+    'outer;...;inner count' line per stack, as flamegraph.pl and
+    speedscope read.
+    """
+    entries = stats.stats
+    callees: Dict[tuple, Dict[tuple, float]] = defaultdict(dict)
+    roots = []
+    for function, (_, _, _, _, callers) in entries.items():
+        known = [caller for caller in callers if caller in entries]
+        if not known:
+            roots.append(function)
+        for caller in known:
+            callees[caller][function] = callers[caller][3]
+    
+    stacks: Dict[str, int] = defaultdict(int)
+    
+    def walk(function: tuple, path: List[str], on_path: set, share: float):
+        _, _, own, cumulative, _ = entries[function]
+        path = path + [_label(function)]
+        microseconds = int(own * share * 1e6)
+        if microseconds >= MIN_STACK_MICROSECONDS:
+            stacks[';'.join(path)] += microseconds
+        for callee, edge in callees[function].items():
+            callee_cumulative = entries[callee][3]
+            if callee in on_path or not callee_cumulative:
+                continue
+            callee_share = share * edge / callee_cumulative
+            if callee_cumulative * callee_share * 1e6 >= MIN_STACK_MICROSECONDS:
+                walk(callee, path, on_path | {callee}, min(callee_share, 1.0))
+    
+    for root in roots:
+        walk(root, [], {root}, 1.0)
+    return dict(stacks)
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Asyncio HTTP Correction Service
+
+Loads the dictionary once and serves single-word and batch JSON requests
+using only the standard library. Words from concurrent requests that arrive
+within a short window are combined into one batch for an executor, and
+identical in-flight words share a single computation, so slow ED2 words
+never block the event loop.
+"""
+
+import os
+import sys
+import json
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Tuple, Dict, Callable, Optional
+from urllib.parse import urlsplit, parse_qs
+
+import spell_corrector
+from hot_reload import ReloadingCorrector
+from metrics import CorrectionMetrics
+from spell_corrector import SpellCorrector, _init_worker
+
+
+# Largest accepted request body; batch requests beyond it get 413.
+MAX_BODY_BYTES = 1 << 20
+
+STATUS_TEXT = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 500: 'Internal Server Error',
+}
+
+
+def _correct_words(words: List[str]) -> List[str]:
+    """Correct a batch with the pool worker's SpellCorrector."""
+    return spell_corrector._worker_corrector.correct_batch(words)
+
+
+class MicroBatcher:
+    """Coalesce concurrent word corrections into batches run on an executor."""
+    
+    def __init__(self, correct_batch: Callable[[List[str]], List[str]], executor: Executor,
+                 window: float = 0.002, max_batch: int = 512):
+        self.correct_batch = correct_batch
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        
+        # Word -> future shared by every request waiting on that word.
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.queue: List[str] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        
+        self.stats = {
+            'words': 0,
+            'coalesced': 0,
+            'batches': 0,
+            'batched_words': 0,
+        }
+    
+    async def correct(self, word: str) -> str:
+        """Correct one word, sharing the work with identical in-flight words."""
+        self.stats['words'] += 1
+        future = self.in_flight.get(word)
+        
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self.in_flight[word] = future
+            self.queue.append(word)
+            
+            if len(self.queue) >= self.max_batch:
+                self._flush()
+            elif self.timer is None:
+                self.timer = loop.call_later(self.window, self._flush)
+        else:
+            self.stats['coalesced'] += 1
+        
+        # A cancelled request must not cancel the result other requests share.
+        return await asyncio.shield(future)
+    
+    async def correct_many(self, words: List[str]) -> List[str]:
+        """Correct a list of words; duplicates and concurrent requests are coalesced."""
+        return list(await asyncio.gather(*(self.correct(word) for word in words)))
+    
+    def _flush(self):
+        """Send the queued words to the executor as one batch."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        
+        batch, self.queue = self.queue, []
+        if not batch:
+            return
+        
+        self.stats['batches'] += 1
+        self.stats['batched_words'] += len(batch)
+        
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(self.executor, self.correct_batch, batch)
+        task.add_done_callback(lambda done: self._resolve(batch, done))
+    
+    def _resolve(self, batch: List[str], done: asyncio.Future):
+        """Hand a finished batch's results (or its error) to the waiting futures."""
+        error = done.exception()
+        results = [None] * len(batch) if error is not None else done.result()
+        
+        for word, corrected in zip(batch, results):
+            future = self.in_flight.pop(word)
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(corrected)
+
+
+class CorrectionServer:
+    """Minimal HTTP/1.1 JSON front end for a SpellCorrector.
+    
+    Routes:
+      GET  /health               status, dictionary size and batching stats
+      GET  /correct?word=...     one word
+      POST /correct              {"word": "..."} or {"words": ["...", ...]}
+      POST /words                {"add": [...], "remove": [...]} (single process)
+      GET  /metrics              Prometheus text (needs metrics, single process)
+    """
+    
+    def __init__(self, corrector: SpellCorrector, host: str = '127.0.0.1', port: int = 8080,
+                 workers: int = 1, window: float = 0.002, max_batch: int = 512):
+        self.corrector = corrector
+        self.host = host
+        self.port = port
+        self.server: Optional[asyncio.AbstractServer] = None
+        
+        if workers > 1:
+            init_args = (corrector.dictionary_file, corrector.engine, corrector.cache_size,
+                         corrector.fallback_distance, False, corrector.compact,
+                         corrector.time_budget, corrector.work_budget, corrector.qgram_distance,
+                         corrector.shared_name, corrector.candidate_limit)
+            self.executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init_args)
+            correct_batch = _correct_words
+        else:
+            # One thread corrects the batches in turn. /words edits run on it
+            # too, off the event loop; each publishes a new index version
+            # that the batches after it read.
+            self.executor = ThreadPoolExecutor(1)
+            correct_batch = self._correct_words
+        
+        self.workers = workers
+        self.batcher = MicroBatcher(correct_batch, self.executor, window, max_batch)
+    
+    def _correct_words(self, words: List[str]) -> List[str]:
+        return self.corrector.correct_batch(words)
+    
+    async def start(self):
+        """Start listening; the bound port is in self.port (useful with port 0)."""
+        if self.workers > 1:
+            # Pool processes start lazily; load every worker's dictionary up front.
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self.executor, _correct_words, [])
+                                   for _ in range(self.workers)))
+        
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+    
+    async def serve_forever(self):
+        """Start (if needed) and serve until cancelled."""
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+    
+    async def close(self):
+        """Stop accepting connections and shut the executor down."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=True)
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one connection until it closes (keep-alive aware)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    await self._respond(writer, 400, {'error': 'Malformed request line'}, False)
+                    break
+                method, target, version = parts
+                
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                
+                try:
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'Invalid Content-Length'}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': f'Body over {MAX_BODY_BYTES} bytes'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                
+                try:
+                    status, payload = await self._dispatch(method, target, body)
+                except Exception as e:
+                    status, payload = 500, {'error': str(e)}
+                
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool):
+        """Write one response: dicts as JSON, strings as Prometheus text."""
+        if isinstance(payload, str):
+            body = payload.encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+    
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, object]:
+        """Route one request and return (status, payload)."""
+        url = urlsplit(target)
+        
+        if url.path == '/health':
+            return 200, {
+                'status': 'ok',
+                'dictionary_words': len(self.corrector.dictionary_lower),
+                'workers': self.workers,
+                'batching': dict(self.batcher.stats),
+            }
+        
+        if url.path == '/metrics':
+            if self.workers > 1:
+                return 400, {'error': 'Metrics need a single-process server'}
+            if self.corrector.metrics is None:
+                return 404, {'error': 'Metrics are not enabled'}
+            return 200, self.corrector.metrics.to_prometheus()
+        
+        if url.path == '/words':
+            return await self._edit_words(method, body)
+        
+        if url.path != '/correct':
+            return 404, {'error': f'Unknown path {url.path}'}
+        
+        if method == 'GET':
+            words = parse_qs(url.query).get('word')
+            if not words:
+                return 400, {'error': "Missing 'word' query parameter"}
+            word = words[0].strip()
+            return 200, {'error': word, 'corrected': await self.batcher.correct(word)}
+        
+        if method != 'POST':
+            return 405, {'error': f'{method} is not supported on /correct'}
+        
+        try:
+            request = json.loads(body.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            return 400, {'error': f'Invalid JSON: {e}'}
+        
+        if isinstance(request, dict) and isinstance(request.get('word'), str):
+            word = request['word'].strip()
+            return 200, {'error': word, 'corrected': await self.batcher.correct(word)}
+        
+        words = request.get('words') if isinstance(request, dict) else None
+        if not isinstance(words, list) or not all(isinstance(w, str) for w in words):
+            return 400, {'error': "Expected {\"word\": str} or {\"words\": [str, ...]}"}
+        
+        words = [w.strip() for w in words]
+        corrected = await self.batcher.correct_many(words)
+        return 200, {'corrections': [
+            {'error': error, 'corrected': correction}
+            for error, correction in zip(words, corrected)
+        ]}
+    
+    
+    async def _edit_words(self, method: str, body: bytes) -> Tuple[int, object]:
+        """Add and remove dictionary words on the executor thread, off the event loop."""
+        if method != 'POST':
+            return 405, {'error': f'{method} is not supported on /words'}
+        if self.workers > 1:
+            return 400, {'error': 'Dictionary edits need a single-process server'}
+        
+        try:
+            request = json.loads(body.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            return 400, {'error': f'Invalid JSON: {e}'}
+        
+        edits = {}
+        for key in ('add', 'remove'):
+            words = request.get(key, []) if isinstance(request, dict) else None
+            if not isinstance(words, list) or not all(isinstance(w, str) for w in words):
+                return 400, {'error': "Expected {\"add\": [str, ...], \"remove\": [str, ...]}"}
+            edits[key] = words
+        
+        def apply():
+            return (self.corrector.add_words(edits['add']),
+                    self.corrector.remove_words(edits['remove']))
+        
+        try:
+            added, removed = await asyncio.get_running_loop().run_in_executor(self.executor, apply)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        return 200, {'added': added, 'removed': removed,
+                     'dictionary_words': len(self.corrector.dictionary_lower)}
+
+
+def main():
+    """Main function to run the correction service."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Serve spell corrections over HTTP.')
+    parser.add_argument('--dictionary', default='reference.txt',
+                        help='reference word list or compiled index (default: reference.txt)')
+    parser.add_argument('--shards', type=int, default=0,
+                        help='split the dictionary over this many local shard processes')
+    parser.add_argument('--shard-server', action='append', metavar='HOST:PORT',
+                        help='use shard servers started with sharding.py, in shard order '
+                             '(repeatable; key from $SPELL_SHARD_AUTHKEY)')
+    parser.add_argument('--shard-timeout', type=float,
+                        help='seconds every shard request may take before the batch fails')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--engine', choices=SpellCorrector.ENGINES, default='symspell',
+                        help='candidate generation engine (default: symspell)')
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help='keep up to this many corrections in an in-memory LRU cache')
+    parser.add_argument('--cache-file',
+                        help='SQLite file that persists corrections between runs')
+    parser.add_argument('--fallback-distance', type=int, default=0,
+                        help='scan the whole dictionary within this distance when no tier matches (needs NumPy)')
+    parser.add_argument('--qgram-distance', type=int, default=0,
+                        help='find words within this distance (e.g. 3) through a q-gram index')
+    parser.add_argument('--candidate-limit', type=int, default=0,
+                        help='stop each edit/phonetic tier after this many dictionary hits (default 0: all)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='correct batches in this many processes')
+    parser.add_argument('--compact', action='store_true',
+                        help='hold the dictionary in compact read-only arrays (less memory per worker)')
+    parser.add_argument('--shared-memory', action='store_true',
+                        help='build the compact dictionary once in shared memory; --workers attach to it')
+    parser.add_argument('--time-budget-ms', type=float,
+                        help='per-word time budget; tiers that would overrun it are skipped')
+    parser.add_argument('--work-budget', type=int,
+                        help='per-word budget of candidate strings probed across tiers')
+    parser.add_argument('--batch-window-ms', type=float, default=2.0,
+                        help='how long to wait for more words before running a batch')
+    parser.add_argument('--max-batch', type=int, default=512,
+                        help='run a batch as soon as it holds this many distinct words')
+    parser.add_argument('--metrics', action='store_true',
+                        help='record per-tier metrics and serve them on /metrics')
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help='poll the dictionary file and hot-reload it when it changes '
+                             '(single process; replaces edits made through /words)')
+    args = parser.parse_args()
+    
+    if args.watch and args.workers > 1:
+        parser.error('--watch needs a single-process server (--workers 1)')
+    if args.metrics and args.workers > 1:
+        parser.error('--metrics needs a single-process server (--workers 1)')
+    sharded = args.shards > 0 or bool(args.shard_server)
+    if sharded and (args.watch or args.workers > 1 or args.shared_memory
+                    or args.time_budget_ms or args.work_budget):
+        parser.error('--shards/--shard-server cannot be combined with --watch, --workers, '
+                     '--shared-memory or per-word budgets')
+    
+    options = dict(engine=args.engine, cache_size=args.cache_size, cache_file=args.cache_file,
+                   fallback_distance=args.fallback_distance, qgram_distance=args.qgram_distance,
+                   candidate_limit=args.candidate_limit,
+                   compact=args.compact, shared_memory=args.shared_memory,
+                   time_budget=args.time_budget_ms / 1000 if args.time_budget_ms else None,
+                   work_budget=args.work_budget,
+                   metrics=CorrectionMetrics() if args.metrics else None)
+    if args.watch:
+        corrector = ReloadingCorrector(args.dictionary, interval=args.watch, **options)
+        corrector.start()
+    elif sharded:
+        from sharding import ShardedCorrector, AUTHKEY_ENV, parse_address
+        if args.shard_server:
+            try:
+                options['addresses'] = [parse_address(spec) for spec in args.shard_server]
+            except ValueError as e:
+                parser.error(str(e))
+            if not os.environ.get(AUTHKEY_ENV):
+                parser.error(f'--shard-server needs the shared key in ${AUTHKEY_ENV}')
+            options['authkey'] = os.environ[AUTHKEY_ENV].encode('utf-8')
+        corrector = ShardedCorrector(args.dictionary, shards=args.shards,
+                                     timeout=args.shard_timeout, **options)
+    else:
+        corrector = SpellCorrector(args.dictionary, **options)
+    server = CorrectionServer(corrector, args.host, args.port, workers=args.workers,
+                              window=args.batch_window_ms / 1000, max_batch=args.max_batch)
+    
+    async def run():
+        await server.start()
+        print(f"Serving corrections on http://{server.host}:{server.port} "
+              f"({args.workers} worker{'s' if args.workers > 1 else ''})", file=sys.stderr)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+            if corrector.cache is not None:
+                corrector.cache.close()
+            corrector.unlink_shared()
+            if sharded:
+                corrector.close()
+    
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
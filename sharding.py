@@ -0,0 +1,514 @@
+"""
+Scatter-gather spell correction over shard servers on local sockets.
+
+A lexicon too large for one process is split by a stable hash of each
+word's lowercase form. Every shard server holds one slice in its own
+SpellCorrector and answers requests over a local socket. The coordinator
+looks exact and case matches up in the one shard that owns each word, then
+walks the candidate tiers in lockstep: each tier goes to all shards at
+once, every shard returns its best few candidates per word, and the first
+tier where any shard finds something resolves the word. The final pick
+among the shards' candidates uses the usual select_best_candidate scoring.
+"""
+
+import os
+import sys
+import time
+import zlib
+import heapq
+import signal
+import threading
+import multiprocessing
+from collections import defaultdict, Counter
+from multiprocessing.connection import Listener, Client, Connection
+from typing import List, Tuple, Dict, Set, Iterable, Optional
+
+from dictionary_index import content_hash, is_compiled_index
+from spell_corrector import SpellCorrector, CorrectionBudget, DictionaryIndex
+
+
+# Environment variable holding the key shard servers and coordinators
+# authenticate each other with when shards run as separate nodes.
+AUTHKEY_ENV = 'SPELL_SHARD_AUTHKEY'
+
+
+class ShardError(RuntimeError):
+    """A shard server failed, answered with an error or missed the deadline."""
+
+
+def shard_of(word_lower: str, shards: int) -> int:
+    """Stable shard number of a lowercase word, the same in every process."""
+    return zlib.crc32(word_lower.encode('utf-8')) % shards
+
+
+class ShardCorrector(SpellCorrector):
+    """SpellCorrector over the slice of a word list that hashes to one shard."""
+    
+    def __init__(self, dictionary_file: str, shard: int, shards: int, **options):
+        if not 0 <= shard < shards:
+            raise ValueError(f"Shard {shard} is out of range for {shards} shards")
+        if is_compiled_index(dictionary_file):
+            raise ValueError("Shards load their slice from a word list, not a compiled index")
+        self.shard = shard
+        self.shards = shards
+        super().__init__(dictionary_file, **options)
+    
+    def _load_dictionary(self, filepath: str) -> Set[str]:
+        """Load only the words whose lowercase form hashes to this shard."""
+        return {word for word in super()._load_dictionary(filepath)
+                if shard_of(word.lower(), self.shards) == self.shard}
+    
+    def lookup(self, words: List[str]) -> List[Optional[str]]:
+        """Resolve exact and case matches: each word itself, its canonical spelling, or None."""
+        return [word if word in self.dictionary_set else self.dictionary_lower.get(word.lower())
+                for word in words]
+    
+    def resolve_tier(self, tier: str, queries: List[Tuple[str, str]], top_k: int) -> List[List[str]]:
+        """Run one tier for (word, search form) queries; return each word's best top_k candidates here."""
+        hits = self._probe_batch(tier, list(dict.fromkeys(form for _, form in queries)))
+        results = []
+        for word, form in queries:
+            # Built as resolve_candidates builds it, and nsmallest keeps the
+            # set's order among ties, so one shard picks what one process would.
+            found = set()
+            found.update(hits[form])
+            candidates = {self.dictionary_lower[w] for w in found}
+            results.append(heapq.nsmallest(top_k, candidates,
+                                           key=lambda candidate: self.score_candidate(word, candidate)))
+        return results
+    
+    def handle(self, command: str, *args):
+        """Run one coordinator request against this shard."""
+        if command == 'lookup':
+            return self.lookup(*args)
+        if command == 'tier':
+            return self.resolve_tier(*args)
+        if command == 'add':
+            return self.add_words(*args)
+        if command == 'remove':
+            return self.remove_words(*args)
+        if command == 'info':
+            return {'shard': self.shard, 'words': len(self.dictionary_lower),
+                    'hash': self.dictionary_hash()}
+        raise ValueError(f"Unknown shard command '{command}'")
+
+
+def _serve_connection(corrector: ShardCorrector, conn: Connection, lock: threading.Lock):
+    """Answer one coordinator's requests until it disconnects."""
+    with conn:
+        while True:
+            try:
+                command, *args = conn.recv()
+            except (EOFError, OSError):
+                return
+            
+            # Requests from several coordinators take turns.
+            try:
+                with lock:
+                    reply = ('ok', corrector.handle(command, *args))
+            except Exception as e:
+                reply = ('error', f"{type(e).__name__}: {e}")
+            try:
+                conn.send(reply)
+            except OSError:
+                return
+
+
+def _stop(signum, frame):
+    sys.exit(0)
+
+
+def _exit_with_parent(parent: int):
+    """Stop a shard its coordinator started once that coordinator is gone, however it ended."""
+    while os.getppid() == parent:
+        time.sleep(1)
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def serve_shard(dictionary_file: str, shard: int, shards: int, address, authkey: bytes,
+                options: dict, ready: Optional[Connection] = None):
+    """Load one shard and serve coordinators on address (None: a fresh local socket) until terminated."""
+    # SIGTERM unwinds through the Listener, which removes its socket file.
+    signal.signal(signal.SIGTERM, _stop)
+    corrector = ShardCorrector(dictionary_file, shard, shards, **options)
+    lock = threading.Lock()
+    
+    with Listener(address, authkey=authkey) as listener:
+        if ready is not None:
+            ready.send(listener.address)
+            ready.close()
+            threading.Thread(target=_exit_with_parent, args=(os.getppid(),), daemon=True).start()
+        while True:
+            try:
+                conn = listener.accept()
+            except multiprocessing.AuthenticationError:
+                continue
+            threading.Thread(target=_serve_connection, args=(corrector, conn, lock),
+                             daemon=True).start()
+
+
+class ShardedLexicon:
+    """Size of the lexicon held across the shards; lookups go through the coordinator."""
+    
+    def __init__(self, coordinator: 'ShardedCorrector'):
+        self.coordinator = coordinator
+    
+    def __len__(self) -> int:
+        return sum(info['words'] for info in self.coordinator.shard_info())
+
+
+class ShardedCorrector(SpellCorrector):
+    """Coordinator that corrects against a lexicon split over shard servers.
+    
+    Without ``addresses`` it starts ``shards`` local shard processes on the
+    word list, each listening on its own local socket. With ``addresses``
+    it connects to shard servers already running (``python sharding.py``),
+    which must hold shards 0..n-1 of the same split in that order.
+    ``timeout`` bounds the seconds every request waits for the slowest shard.
+    """
+    
+    # Candidates each shard returns per word and tier, best first. The best
+    # overall is always some shard's best; the rest settle near ties.
+    TOP_K = 3
+    
+    def __init__(self, dictionary_file: str, shards: int = 2, addresses: Optional[List] = None,
+                 authkey: Optional[bytes] = None, timeout: Optional[float] = None,
+                 top_k: Optional[int] = None, **options):
+        if options.get('time_budget') is not None or options.get('work_budget') is not None:
+            raise ValueError("Per-word budgets do not apply across shards; bound latency with timeout")
+        if options.get('shared_memory'):
+            raise ValueError("Each shard holds its own slice; shared memory does not apply")
+        if addresses and authkey is None:
+            raise ValueError(f"Connecting to running shard servers needs their authkey (see {AUTHKEY_ENV})")
+        
+        self.shard_count = len(addresses) if addresses else shards
+        if self.shard_count < 1:
+            raise ValueError("At least one shard is required")
+        self.addresses = list(addresses or [])
+        self.authkey = authkey if authkey is not None else os.urandom(32)
+        self.timeout = timeout
+        self.top_k = self.TOP_K if top_k is None else top_k
+        self.processes: List[multiprocessing.Process] = []
+        self._connections: List[Optional[Connection]] = []
+        # A connection carries one request at a time.
+        self._shard_lock = threading.Lock()
+        super().__init__(dictionary_file, **options)
+    
+    def _load_indexes(self):
+        """Start or connect to the shard servers; the coordinator itself holds no words."""
+        if not self.addresses:
+            self._start_shards()
+        self._connections = [None] * self.shard_count
+        try:
+            for shard in range(self.shard_count):
+                self._connection(shard)
+        except ShardError:
+            self.close()
+            raise
+        
+        self.mapped = None
+        lexicon = ShardedLexicon(self)
+        self.index = DictionaryIndex(lexicon, lexicon, lexicon, case_variants={})
+        self._dictionary_hash = None
+        optional = {'qgram': self.qgram_distance, 'fallback_scan': self.fallback_distance}
+        self.tiers = tuple(t for t in self.TIERS if optional.get(t, True))
+    
+    def _start_shards(self):
+        """Start one shard process per slice; they load in parallel."""
+        options = dict(engine=self.engine, fallback_distance=self.fallback_distance,
+                       qgram_distance=self.qgram_distance, compact=self.compact,
+                       candidate_limit=self.candidate_limit)
+        pipes = []
+        for shard in range(self.shard_count):
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=serve_shard, name=f'spell-shard-{shard}', daemon=True,
+                args=(self.dictionary_file, shard, self.shard_count, None, self.authkey,
+                      options, sender))
+            process.start()
+            sender.close()
+            self.processes.append(process)
+            pipes.append(receiver)
+        
+        for shard, receiver in enumerate(pipes):
+            try:
+                self.addresses.append(receiver.recv())
+            except EOFError:
+                self.close()
+                raise ShardError(f"Shard {shard} exited while loading {self.dictionary_file}")
+            finally:
+                receiver.close()
+    
+    def close(self):
+        """Disconnect from the shards and stop the ones this coordinator started."""
+        for conn in self._connections:
+            if conn is not None:
+                conn.close()
+        self._connections = []
+        for process in self.processes:
+            process.terminate()
+            process.join()
+        self.processes = []
+    
+    def _scatter(self, requests: Dict[int, tuple]) -> Dict[int, object]:
+        """Send requests to their shards at once and gather the replies.
+        
+        Shards work in parallel, so a request takes as long as its slowest
+        shard, never longer than timeout.
+        """
+        with self._shard_lock:
+            failures = []
+            for shard, request in list(requests.items()):
+                try:
+                    self._connection(shard).send(request)
+                except (OSError, ShardError) as e:
+                    self._drop(shard)
+                    failures.append(f"shard {shard}: {e}")
+                    del requests[shard]
+            
+            deadline = None if self.timeout is None else time.monotonic() + self.timeout
+            replies = {}
+            for shard in requests:
+                conn = self._connections[shard]
+                try:
+                    if deadline is not None and not conn.poll(max(deadline - time.monotonic(), 0.0)):
+                        # Its late reply would be read as the next one's.
+                        self._drop(shard)
+                        failures.append(f"shard {shard} did not answer within {self.timeout} s")
+                        continue
+                    status, reply = conn.recv()
+                except (EOFError, OSError) as e:
+                    self._drop(shard)
+                    failures.append(f"shard {shard}: connection lost ({e or type(e).__name__})")
+                    continue
+                if status == 'error':
+                    failures.append(f"shard {shard}: {reply}")
+                replies[shard] = reply
+            
+            if failures:
+                raise ShardError('; '.join(failures))
+            return replies
+    
+    def _connection(self, shard: int) -> Connection:
+        """The open connection to a shard, reconnecting after a failure."""
+        if self._connections[shard] is None:
+            try:
+                self._connections[shard] = Client(self.addresses[shard], authkey=self.authkey)
+            except (OSError, multiprocessing.AuthenticationError) as e:
+                raise ShardError(f"cannot reach shard {shard} at {self.addresses[shard]}: {e}")
+        return self._connections[shard]
+    
+    def _drop(self, shard: int):
+        conn, self._connections[shard] = self._connections[shard], None
+        if conn is not None:
+            conn.close()
+    
+    def _broadcast(self, *request) -> List:
+        """Send one request to every shard; return the replies in shard order."""
+        replies = self._scatter({shard: request for shard in range(self.shard_count)})
+        return [replies[shard] for shard in range(self.shard_count)]
+    
+    def shard_info(self) -> List[Dict]:
+        """Each shard's number, word count and content hash."""
+        return self._broadcast('info')
+    
+    def dictionary_hash(self) -> str:
+        """Hash every shard's content together with its number."""
+        if self._dictionary_hash is None:
+            self._dictionary_hash = content_hash(
+                f"{info['shard']}\t{info['hash']}" for info in self.shard_info())
+        return self._dictionary_hash
+    
+    def compile(self, output_path: str, max_distance: int = 2):
+        raise ValueError("A sharded lexicon is not compiled as a whole; shards load the word list")
+    
+    def suggest(self, word: str, k: int = 5, max_distance: int = 2) -> List[Tuple[str, float]]:
+        raise ValueError("suggest() searches one trie over the whole dictionary; use an unsharded corrector")
+    
+    def _lookup(self, words: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Exact/case lookups, each sent only to the shard that owns the word."""
+        by_shard: Dict[int, List[str]] = defaultdict(list)
+        for word in dict.fromkeys(words):
+            by_shard[shard_of(word.lower(), self.shard_count)].append(word)
+        replies = self._scatter({shard: ('lookup', shard_words) for shard, shard_words in by_shard.items()})
+        return {word: found for shard, shard_words in by_shard.items()
+                for word, found in zip(shard_words, replies[shard])}
+    
+    def _resolve_queries(self, queries: Dict[str, Tuple[str, str]]) -> Dict[str, Tuple[str, List[str]]]:
+        """Resolve (word, search form) queries tier by tier across all shards.
+        
+        Every tier goes to every shard at once; a query is resolved by the
+        first tier where any shard returns candidates. Candidates stay in
+        shard order, best first, so equal scores go to the lowest shard.
+        """
+        resolved = {}
+        keys = list(queries)
+        for tier in self.tiers:
+            if not keys:
+                break
+            replies = self._broadcast('tier', tier, [queries[key] for key in keys], self.top_k)
+            for i, key in enumerate(keys):
+                candidates = [candidate for reply in replies for candidate in reply[i]]
+                if candidates:
+                    resolved[key] = tier, candidates
+            keys = [key for key in keys if key not in resolved]
+        
+        for key in keys:
+            resolved[key] = 'no_match', []
+        return resolved
+    
+    def _correct_counted(self, counts: Counter) -> Dict[str, Tuple[str, str]]:
+        """Correct distinct stripped words; count each word's outcome as often as it occurs."""
+        stats = self.stats.local()
+        results: Dict[str, Tuple[str, str]] = {}
+        if '' in counts:
+            results[''] = '', 'empty'
+        words = [word for word in counts if word]
+        forms = {word: self.canonical_forms(word.lower()) for word in words}
+        found = self._lookup(words + [form for word in words for form in forms[word]])
+        
+        # Exact, case and canonical matches; the rest grouped by cache key
+        # (lowercase form plus the case of the first letter).
+        groups: Dict[str, List[str]] = defaultdict(list)
+        resolved: Dict[str, tuple] = {}
+        queries: Dict[str, Tuple[str, str]] = {}
+        for word in words:
+            canonical = found[word]
+            if canonical is not None:
+                exact = canonical == word
+                stats['exact_match' if exact else 'case_corrected'] += counts[word]
+                results[word] = canonical, 'exact' if exact else 'case'
+                continue
+            key = ('^' if word[0].isupper() else '') + word.lower()
+            groups[key].append(word)
+            if key in resolved or key in queries:
+                continue
+            
+            canonical_hits = {found[form] for form in forms[word] if found[form] is not None}
+            if self.cache is not None:
+                cached = self.cache.get(key, self.dictionary_hash())
+                if cached is not None:
+                    resolved[key] = 'cache', cached
+                    continue
+            if canonical_hits:
+                resolved[key] = 'canonical', canonical_hits
+            else:
+                queries[key] = word, (forms[word] or [word.lower()])[0]
+        
+        resolved.update(self._resolve_queries(queries))
+        
+        for key, group in groups.items():
+            tier, candidates = resolved[key]
+            if tier == 'cache':
+                corrected, category = candidates
+                for word in group:
+                    results[word] = (word if corrected is None else corrected), 'cache'
+            elif candidates:
+                corrected, edit_dist = self._select_best(group[0], candidates)
+                category = self._distance_category(edit_dist)
+                for word in group:
+                    results[word] = corrected, tier
+            else:
+                corrected, category = None, 'no_match'
+                for word in group:
+                    results[word] = word, tier
+            
+            if self.cache is not None and tier != 'cache':
+                self.cache.put(key, corrected, category, self.dictionary_hash())
+            stats[category] += sum(counts[word] for word in group)
+        return results
+    
+    def _correct_word(self, word: str, budget: Optional[CorrectionBudget] = None) -> Tuple[str, str]:
+        """Correct a single word through the shards and return it with the tier that resolved it."""
+        if budget is not None:
+            raise ValueError("Per-word budgets do not apply across shards; bound latency with timeout")
+        self.stats.local()['total_words'] += 1
+        word = word.strip()
+        return self._correct_counted(Counter([word]))[word]
+    
+    def correct_batch(self, words: Iterable[str], time_budget: Optional[float] = None,
+                      work_budget: Optional[int] = None) -> List[str]:
+        """Correct a batch in one exact/case round trip plus one per tier reached."""
+        words = list(words)
+        if self.metrics is not None or time_budget is not None or work_budget is not None:
+            return [self.correct_word(word, time_budget, work_budget) for word in words]
+        
+        self.stats.local()['total_words'] += len(words)
+        stripped = [word.strip() for word in words]
+        results = self._correct_counted(Counter(stripped))
+        return [results[word][0] for word in stripped]
+    
+    def add_words(self, words: Iterable[str]) -> int:
+        """Add words to the shards that own them."""
+        return self._edit('add', words)
+    
+    def remove_words(self, words: Iterable[str]) -> int:
+        """Remove exact words from the shards that hold them."""
+        return self._edit('remove', words)
+    
+    def _edit(self, command: str, words: Iterable[str]) -> int:
+        with self._edit_lock:
+            by_shard: Dict[int, List[str]] = defaultdict(list)
+            for word in words:
+                word = word.strip()
+                if word:
+                    by_shard[shard_of(word.lower(), self.shard_count)].append(word)
+            changed = sum(self._scatter({shard: (command, shard_words)
+                                         for shard, shard_words in by_shard.items()}).values())
+            if changed:
+                self._dictionary_hash = None
+                self._dictionary_changed()
+            return changed
+
+
+def parse_address(spec: str) -> Tuple[str, int]:
+    """Parse a HOST:PORT shard server address."""
+    host, sep, port = spec.rpartition(':')
+    if not sep or not host or not port.isdigit():
+        raise ValueError(f"Expected HOST:PORT, got '{spec}'")
+    return host, int(port)
+
+
+def main():
+    """Run one shard server node."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description=f'Serve one shard of a word list to sharded spell correctors '
+                    f'(the shared key is read from ${AUTHKEY_ENV}).')
+    parser.add_argument('--dictionary', default='reference.txt',
+                        help='the whole word list; only this shard\'s words are loaded')
+    parser.add_argument('--shard', type=int, required=True, help='this shard\'s number, from 0')
+    parser.add_argument('--shards', type=int, required=True, help='total number of shards')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--engine', choices=SpellCorrector.ENGINES, default='symspell',
+                        help='candidate generation engine (default: symspell)')
+    parser.add_argument('--fallback-distance', type=int, default=0,
+                        help='scan the shard within this distance when no tier matches (needs NumPy)')
+    parser.add_argument('--qgram-distance', type=int, default=0,
+                        help='find words within this distance (e.g. 3) through a q-gram index')
+    parser.add_argument('--candidate-limit', type=int, default=0,
+                        help='stop each edit/phonetic tier after this many dictionary hits (default 0: all)')
+    parser.add_argument('--compact', action='store_true',
+                        help='hold the shard in compact read-only arrays (less memory)')
+    args = parser.parse_args()
+    
+    authkey = os.environ.get(AUTHKEY_ENV)
+    if not authkey:
+        parser.error(f'set ${AUTHKEY_ENV} to the key shared with the coordinator')
+    if not os.path.exists(args.dictionary):
+        print(f"Error: Dictionary file '{args.dictionary}' not found!", file=sys.stderr)
+        sys.exit(1)
+    
+    options = dict(engine=args.engine, fallback_distance=args.fallback_distance,
+                   qgram_distance=args.qgram_distance, candidate_limit=args.candidate_limit,
+                   compact=args.compact)
+    print(f"Serving shard {args.shard}/{args.shards} of {args.dictionary} on {args.host}:{args.port}",
+          file=sys.stderr)
+    serve_shard(args.dictionary, args.shard, args.shards, (args.host, args.port),
+                authkey.encode('utf-8'), options)
+
+
+if __name__ == '__main__':
+    main()
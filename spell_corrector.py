@@ -1,31 +1,1250 @@
+import os
+import copy
 import re
+import sys
+import json
 import time
-from collections import defaultdict
-from typing import List, Tuple, Dict, Set
+import heapq
+import mmap
+import sqlite3
+import threading
+import multiprocessing
+from array import array
+from collections import defaultdict, Counter, OrderedDict
+from collections.abc import Mapping, KeysView
+from functools import lru_cache, wraps
+from itertools import islice
+from typing import List, Tuple, Dict, Set, Iterable, Iterator, Callable, Optional
 import unicodedata
 
+from bitparallel import NUMPY_AVAILABLE, LengthBuckets, batch_levenshtein
+from dictionary_index import (INTERSECTION_CHUNK, MappedDictionary, build_index, format_hash,
+                              is_compiled_index, share_index, word_digest)
+from metrics import CorrectionMetrics
+
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+# Word tokens in free text: runs of letters that do not touch digits,
+# underscores or other word characters, so numerals, identifiers like
+# 'abc123' and everything between tokens pass through unchanged.
+TOKEN_RE = re.compile(r'(?<!\w)[^\W\d_]+(?!\w)')
+
+
+@lru_cache(maxsize=65536)
+def strip_accents(word: str) -> str:
+    """Drop combining marks after NFD decomposition; cached, as unicodedata is slow per call."""
+    return ''.join(c for c in unicodedata.normalize('NFD', word) if unicodedata.category(c) != 'Mn')
+
+
+class DeleteIndex:
+    """Symmetric-delete (SymSpell-style) neighbourhood index over dictionary words."""
+    
+    def __init__(self, words: Iterable[str], edits1: Callable[[str], Set[str]],
+                 max_distance: int = 2):
+        self.max_distance = max_distance
+        self.edits1 = edits1
+        self.deletes: Dict[str, List[str]] = defaultdict(list)
+        self.letter_words: Set[str] = set()
+        
+        for word in words:
+            for variant in self.delete_variants(word, max_distance):
+                self.deletes[variant].append(word)
+            if all(c in LETTERS for c in word):
+                self.letter_words.add(word)
+        
+        self.deletes = dict(self.deletes)
+    
+    @staticmethod
+    def delete_variants(word: str, depth: int) -> Set[str]:
+        """Generate all strings reachable from word by up to depth deletions."""
+        variants = {word}
+        frontier = {word}
+        
+        for _ in range(depth):
+            frontier = {w[:i] + w[i+1:] for w in frontier for i in range(len(w))}
+            variants |= frontier
+        
+        return variants
+    
+    def postings(self, variant: str) -> Iterable[str]:
+        """Get the dictionary words stored under a delete variant."""
+        return self.deletes.get(variant, ())
+    
+    def copy(self) -> 'DeleteIndex':
+        """Copy for editing; posting lists are shared, as add and remove replace them."""
+        index = copy.copy(self)
+        index.deletes = dict(self.deletes)
+        index.letter_words = set(self.letter_words)
+        return index
+    
+    def add(self, word: str):
+        """Index one more dictionary word."""
+        for variant in self.delete_variants(word, self.max_distance):
+            self.deletes[variant] = self.deletes.get(variant, []) + [word]
+        if all(c in LETTERS for c in word):
+            self.letter_words.add(word)
+    
+    def remove(self, word: str):
+        """Drop a dictionary word from the index."""
+        for variant in self.delete_variants(word, self.max_distance):
+            postings = self.deletes.get(variant)
+            if postings and word in postings:
+                postings = [w for w in postings if w != word]
+                if postings:
+                    self.deletes[variant] = postings
+                else:
+                    del self.deletes[variant]
+        self.letter_words.discard(word)
+    
+    def is_letter_word(self, word: str) -> bool:
+        """Check whether a dictionary word is made only of a-z."""
+        return word in self.letter_words
+    
+    def lookup(self, word: str, max_distance: int) -> Set[str]:
+        """Return dictionary words within max_distance edits (same set as ED1/ED2 probing)."""
+        return self.probe(word, max_distance)[1]
+    
+    def probe(self, word: str, max_distance: int, limit: int = 0) -> Tuple[int, Set[str]]:
+        """Like lookup, but also return how many delete variants were probed.
+        
+        With a limit, stop once that many matches are found.
+        """
+        if max_distance > self.max_distance:
+            raise ValueError(
+                f"Index was built for distance {self.max_distance}, not {max_distance}"
+            )
+        
+        word_len = len(word)
+        matches = set()
+        rejected = set()
+        neighbourhood = None
+        variants = self.delete_variants(word, max_distance)
+        probed = 0
+        
+        for variant in variants:
+            if limit and len(matches) >= limit:
+                break
+            probed += 1
+            for candidate in self.postings(variant):
+                if candidate in matches or candidate in rejected:
+                    continue
+                
+                # Deleting from both sides down to a shared variant is an
+                # insert/delete path; it is exact whenever the inserted
+                # characters are ones edit_distance_1 can produce.
+                depth = (word_len - len(variant)) + (len(candidate) - len(variant))
+                if self.is_letter_word(candidate):
+                    found = (depth <= max_distance
+                             or self.within_edits(word, candidate, max_distance))
+                else:
+                    # Rare non-letter entries: fall back to the exact expansion.
+                    if neighbourhood is None:
+                        neighbourhood = self.edits1(word)
+                        for _ in range(max_distance - 1):
+                            neighbourhood = {e2 for e1 in neighbourhood for e2 in self.edits1(e1)}
+                    found = candidate in neighbourhood
+                
+                if found:
+                    matches.add(candidate)
+                else:
+                    rejected.add(candidate)
+        
+        return probed, matches
+    
+    @staticmethod
+    def within_edits(source: str, target: str, limit: int, transpositions: bool = True) -> bool:
+        """Check whether target is within limit chained edit_distance_1 steps of source.
+        
+        Without transpositions, swapping two letters costs two edits (plain
+        Levenshtein distance).
+        """
+        # Lowrance-Wagner (unrestricted Damerau-Levenshtein) recurrence. Like
+        # edit_distance_1, only lowercase ASCII letters can be inserted or
+        # replaced in; exact for targets made of those letters.
+        n, m = len(source), len(target)
+        if abs(n - m) > limit:
+            return False
+        
+        big = limit + 1
+        insert_cost = [1 if c in LETTERS else big for c in target]
+        insert_prefix = [0]
+        for cost in insert_cost:
+            insert_prefix.append(insert_prefix[-1] + cost)
+        
+        rows = [[big] * (m + 2)]
+        rows.append([big] + insert_prefix)
+        last_row = {}
+        
+        for i in range(1, n + 1):
+            row = [big, i] + [0] * m
+            s_char = source[i - 1]
+            last_col = 0
+            
+            for j in range(1, m + 1):
+                t_char = target[j - 1]
+                i1 = last_row.get(t_char, 0)
+                j1 = last_col
+                
+                if s_char == t_char:
+                    replace = rows[i][j]
+                    last_col = j
+                else:
+                    replace = rows[i][j] + insert_cost[j - 1]
+                
+                best = min(
+                    replace,
+                    row[j] + insert_cost[j - 1],
+                    rows[i][j + 1] + 1,
+                )
+                if transpositions and i1 and j1:
+                    transpose = (
+                        rows[i1][j1] + (i - i1 - 1) + 1
+                        + insert_prefix[j - 1] - insert_prefix[j1]
+                    )
+                    if transpose < best:
+                        best = transpose
+                row[j + 1] = best
+            
+            rows.append(row)
+            last_row[s_char] = i
+        
+        return rows[n + 1][m + 1] <= limit
+
+
+class MappedDeleteIndex(DeleteIndex):
+    """DeleteIndex that reads its postings from a compiled MappedDictionary."""
+    
+    def __init__(self, mapped: MappedDictionary, edits1: Callable[[str], Set[str]]):
+        self.mapped = mapped
+        self.edits1 = edits1
+        self.max_distance = mapped.max_distance
+        self.letter_words = None
+    
+    def postings(self, variant: str) -> Iterable[str]:
+        """Decode the lowercased words stored under a delete variant."""
+        words = []
+        for i in self.mapped.delete_postings(variant):
+            word = self.mapped.lower_word(i)
+            # Postings are grouped by variant hash; keep only true supersequences.
+            if len(word) - len(variant) <= self.max_distance and self._contains_subsequence(word, variant):
+                words.append(word)
+        return words
+    
+    @staticmethod
+    def _contains_subsequence(word: str, variant: str) -> bool:
+        chars = iter(word)
+        return all(c in chars for c in variant)
+    
+    def is_letter_word(self, word: str) -> bool:
+        """Check whether a dictionary word is made only of a-z."""
+        return self.mapped.is_letter_word(self.mapped.lower_id(word))
+
+
+class QGramIndex:
+    """Positional q-gram inverted index that shortlists words for larger edit distances.
+    
+    Postings are kept per (q-gram, word length, position), so a probe only
+    reads the lists for lengths and positions within the edit bound. A word
+    within k edits of the query shares at least max(n, m) + q - 1 - k*q of its
+    padded q-grams at positions no more than k apart; words below that count
+    are never verified. The bound holds for insertions, deletions and
+    replacements, each of which breaks at most q grams, so candidates are
+    verified with plain Levenshtein distance (a swap of two letters breaks
+    q + 1 grams and counts as two edits here). Lengths too short for the
+    bound to prune anything are scanned directly.
+    """
+    
+    def __init__(self, words: Iterable[str], max_distance: int = 3, q: int = 2):
+        self.q = q
+        self.max_distance = max_distance
+        self.words: List[Optional[str]] = []
+        self.ids: Dict[str, int] = {}
+        self.postings: Dict[Tuple[str, int, int], array] = {}
+        self.by_length: Dict[int, array] = {}
+        self.entries = 0
+        
+        for word in words:
+            self._add(word, in_place=True)
+    
+    def copy(self) -> 'QGramIndex':
+        """Copy for editing; posting arrays are shared, as add and remove replace them."""
+        index = copy.copy(self)
+        index.words = list(self.words)
+        index.ids = dict(self.ids)
+        index.postings = dict(self.postings)
+        index.by_length = dict(self.by_length)
+        return index
+    
+    def grams(self, word: str) -> List[str]:
+        """Get a word's q-grams, padded at both ends, in position order."""
+        pad = self.q - 1
+        padded = '^' * pad + word + '$' * pad
+        return [padded[i:i + self.q] for i in range(len(word) + pad)]
+    
+    def add(self, word: str):
+        """Index one more dictionary word."""
+        self._add(word, in_place=False)
+    
+    def _add(self, word: str, in_place: bool):
+        # Arrays that a copy shares with the index it came from are replaced
+        # rather than appended to; only the constructor owns all of its own.
+        if word in self.ids:
+            return
+        word_id = len(self.words)
+        self.words.append(word)
+        self.ids[word] = word_id
+        keys = [(gram, len(word), position) for position, gram in enumerate(self.grams(word))]
+        for table, key in [(self.by_length, len(word))] + [(self.postings, key) for key in keys]:
+            ids = table.get(key)
+            if ids is None:
+                table[key] = array('I', (word_id,))
+            elif in_place:
+                ids.append(word_id)
+            else:
+                table[key] = ids + array('I', (word_id,))
+        self.entries += len(keys)
+    
+    def remove(self, word: str):
+        """Drop a dictionary word from the index."""
+        word_id = self.ids.pop(word, None)
+        if word_id is None:
+            return
+        self.words[word_id] = None
+        self.by_length[len(word)] = array('I', (i for i in self.by_length[len(word)] if i != word_id))
+        for position, gram in enumerate(self.grams(word)):
+            key = (gram, len(word), position)
+            postings = array('I', (i for i in self.postings[key] if i != word_id))
+            self.entries -= 1
+            if postings:
+                self.postings[key] = postings
+            else:
+                del self.postings[key]
+    
+    def threshold(self, length: int, other_length: int, max_distance: int) -> int:
+        """Minimum shared q-grams for two lengths to be within max_distance edits."""
+        return max(length, other_length) + self.q - 1 - max_distance * self.q
+    
+    def estimate(self, length: int, max_distance: int) -> int:
+        """Predict the posting entries a probe reads for a word of this length, from the average list size."""
+        average = self.entries / max(len(self.postings), 1)
+        window = 2 * max_distance + 1
+        estimate = 0.0
+        for other in range(max(1, length - max_distance), length + max_distance + 1):
+            if self.threshold(length, other, max_distance) <= 0:
+                estimate += len(self.by_length.get(other, ()))
+            else:
+                estimate += (length + self.q - 1) * window * average
+        return int(estimate)
+    
+    def probe(self, word: str, max_distance: int) -> Tuple[int, Set[str]]:
+        """Return (posting entries read, dictionary words within max_distance edits)."""
+        grams = self.grams(word)
+        n = len(word)
+        postings = self.postings
+        scanned = 0
+        matches = set()
+        
+        for length in range(max(1, n - max_distance), n + max_distance + 1):
+            threshold = self.threshold(n, length, max_distance)
+            if threshold <= 0:
+                # Too short for the count filter to prune anything: verify
+                # every word of this length.
+                ids = self.by_length.get(length, ())
+                scanned += len(ids)
+                for word_id in ids:
+                    candidate = self.words[word_id]
+                    if DeleteIndex.within_edits(word, candidate, max_distance, transpositions=False):
+                        matches.add(candidate)
+                continue
+            
+            # Counter.update counts whole posting arrays in C. A word holding a
+            # gram at two positions in the window is counted twice, which only
+            # lets extra words through to verification.
+            counts = Counter()
+            last = length + self.q - 2
+            for position, gram in enumerate(grams):
+                for other in range(max(0, position - max_distance), min(last, position + max_distance) + 1):
+                    ids = postings.get((gram, length, other))
+                    if ids:
+                        scanned += len(ids)
+                        counts.update(ids)
+            
+            for word_id, count in counts.items():
+                if count >= threshold:
+                    candidate = self.words[word_id]
+                    if DeleteIndex.within_edits(word, candidate, max_distance, transpositions=False):
+                        matches.add(candidate)
+        
+        return scanned, matches
+
+
+class Trie:
+    """Character trie over dictionary words with bounded best-first fuzzy search."""
+    
+    # Children are keyed by single characters, so an empty key marks a word end.
+    END = ''
+    
+    def __init__(self, words: Iterable[str] = ()):
+        self.root: Dict[str, dict] = {}
+        self.size = 0
+        # Nodes this trie may change in place, by id; None when it owns them
+        # all. A copy owns none until it copies the paths it edits.
+        self.owned: Optional[Dict[int, dict]] = None
+        for word in words:
+            self.insert(word)
+    
+    def copy(self) -> 'Trie':
+        """Copy for editing; nodes are shared until an edit copies its path."""
+        trie = Trie()
+        trie.root = self.root
+        trie.size = self.size
+        trie.owned = {}
+        return trie
+    
+    def _own(self, parent: Optional[dict], char: str) -> dict:
+        """Get a child node (the root if parent is None) that this trie may change."""
+        node = self.root if parent is None else parent[char]
+        if self.owned is None or id(node) in self.owned:
+            return node
+        node = dict(node)
+        self.owned[id(node)] = node
+        if parent is None:
+            self.root = node
+        else:
+            parent[char] = node
+        return node
+    
+    def insert(self, word: str):
+        """Insert a word into the trie."""
+        node = self._own(None, '')
+        for char in word:
+            if char in node:
+                node = self._own(node, char)
+            else:
+                node[char] = {}
+                node = node[char]
+                if self.owned is not None:
+                    self.owned[id(node)] = node
+        if self.END not in node:
+            node[self.END] = word
+            self.size += 1
+    
+    def remove(self, word: str):
+        """Remove a word from the trie, pruning branches left empty."""
+        node = self.root
+        for char in word:
+            node = node.get(char)
+            if node is None:
+                return
+        if self.END not in node:
+            return
+        
+        path = [self._own(None, '')]
+        for char in word:
+            path.append(self._own(path[-1], char))
+        del path[-1][self.END]
+        self.size -= 1
+        
+        for i in range(len(word), 0, -1):
+            if path[i]:
+                break
+            del path[i - 1][word[i - 1]]
+    
+    def search(self, word: str, k: int, max_distance: int) -> List[Tuple[str, int]]:
+        """Find the closest words within max_distance edits, nearest first.
+        
+        Returns the k nearest (word, distance) pairs plus every word tied with
+        the k-th distance, so callers can re-rank the last level. Distance
+        counts inserts, deletes, replaces and adjacent transpositions.
+        """
+        results: List[Tuple[str, int]] = []
+        if k <= 0:
+            return results
+        
+        # Query positions j (1-based) that a transposition can land on, keyed by
+        # the (word[j-2], word[j-1]) pair and by word[j-1] alone.
+        transpose_cols: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        transpose_after: Dict[str, List[int]] = defaultdict(list)
+        for j in range(2, len(word) + 1):
+            transpose_cols[(word[j - 2], word[j - 1])].append(j)
+            transpose_after[word[j - 1]].append(j)
+        
+        # Node entries are (lower bound, counter, node, row, previous row, char);
+        # finished words are (distance, counter, None, word).
+        heap = [(0, 0, self.root, list(range(len(word) + 1)), None, '')]
+        counter = 1
+        
+        while heap:
+            entry = heapq.heappop(heap)
+            bound = entry[0]
+            
+            if bound > max_distance:
+                break
+            if len(results) >= k and bound > results[k - 1][1]:
+                break
+            
+            if entry[2] is None:
+                results.append((entry[3], bound))
+                continue
+            
+            _, _, node, row, prev_row, char = entry
+            
+            if self.END in node and row[-1] <= max_distance:
+                heapq.heappush(heap, (row[-1], counter, None, node[self.END]))
+                counter += 1
+            
+            for child_char, child in node.items():
+                if child_char == self.END:
+                    continue
+                
+                swaps = transpose_cols.get((child_char, char)) if prev_row else None
+                left = row[0] + 1
+                child_row = [left]
+                j = 0
+                for w_char, up, diag in zip(word, row[1:], row):
+                    j += 1
+                    value = diag if w_char == child_char else diag + 1
+                    if up < value:
+                        value = up + 1
+                    if left < value:
+                        value = left + 1
+                    if swaps and j in swaps and prev_row[j - 2] + 1 < value:
+                        value = prev_row[j - 2] + 1
+                    child_row.append(value)
+                    left = value
+                
+                # Grandchildren can still reach back to this row through a
+                # transposition, so those cells bound the subtree too.
+                child_bound = min(child_row)
+                for j in transpose_after.get(child_char, ()):
+                    if row[j - 2] + 1 < child_bound:
+                        child_bound = row[j - 2] + 1
+                
+                if child_bound <= max_distance:
+                    heapq.heappush(heap, (child_bound, counter, child, child_row, row, child_char))
+                    counter += 1
+        
+        return results
+
+
+class PhoneticIndex:
+    """Index of dictionary words by a collapsed Roman-script phonetic key."""
+    
+    # Applied in order, before the per-character classes.
+    PATTERNS = [
+        ('chh', 'ch'), ('kh', 'k'), ('gh', 'g'), ('jh', 'j'), ('th', 't'),
+        ('dh', 'd'), ('ph', 'f'), ('bh', 'b'), ('sh', 's'),
+        ('aa', 'a'), ('ee', 'i'), ('oo', 'u'),
+    ]
+    
+    def __init__(self, words: Iterable[str], phonetic_map: Dict[str, str]):
+        self._init_key(phonetic_map)
+        
+        self.keys: Dict[str, List[str]] = defaultdict(list)
+        for word in words:
+            self.keys[self.key(word)].append(word)
+        self.keys = dict(self.keys)
+    
+    def _init_key(self, phonetic_map: Dict[str, str]):
+        """Compile the patterns and translation table used by key()."""
+        self.pattern_re = re.compile('|'.join(re.escape(src) for src, _ in self.PATTERNS))
+        self.pattern_map = dict(self.PATTERNS)
+        self.translation = str.maketrans(self._build_classes(phonetic_map))
+        self.double_re = re.compile(r'(.)\1+')
+    
+    @staticmethod
+    def _build_classes(phonetic_map: Dict[str, str]) -> Dict[str, str]:
+        """Collapse mutually similar characters into one representative each."""
+        parent = {c: c for similar in phonetic_map.values() for c in similar}
+        
+        def find(c):
+            while parent[c] != c:
+                c = parent[c]
+            return c
+        
+        for char, similar in phonetic_map.items():
+            for other in similar:
+                # Characters without their own entry (like 'y') join their group.
+                if other not in phonetic_map or char in phonetic_map[other]:
+                    a, b = find(char), find(other)
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+        
+        return {c: find(c) for c in parent if find(c) != c}
+    
+    def key(self, word: str) -> str:
+        """Reduce a word to its phonetic key."""
+        word = self.pattern_re.sub(lambda m: self.pattern_map[m.group(0)], word.lower())
+        word = word.translate(self.translation)
+        return self.double_re.sub(r'\1', word)
+    
+    def lookup(self, word: str) -> List[str]:
+        """Get lowercased dictionary words sharing the word's phonetic key."""
+        return self.keys.get(self.key(word), [])
+    
+    def copy(self) -> 'PhoneticIndex':
+        """Copy for editing; key lists are shared, as add and remove replace them."""
+        index = copy.copy(self)
+        index.keys = dict(self.keys)
+        return index
+    
+    def add(self, word: str):
+        """Index one more lowercased dictionary word."""
+        key = self.key(word)
+        self.keys[key] = self.keys.get(key, []) + [word]
+    
+    def remove(self, word: str):
+        """Drop a lowercased dictionary word from the index."""
+        key = self.key(word)
+        words = self.keys.get(key)
+        if words and word in words:
+            words = [w for w in words if w != word]
+            if words:
+                self.keys[key] = words
+            else:
+                del self.keys[key]
+
+
+class MappedPhoneticIndex(PhoneticIndex):
+    """PhoneticIndex that reads its key postings from a compiled MappedDictionary."""
+    
+    def __init__(self, mapped: MappedDictionary, phonetic_map: Dict[str, str]):
+        self._init_key(phonetic_map)
+        self.mapped = mapped
+    
+    def lookup(self, word: str) -> List[str]:
+        """Get lowercased dictionary words sharing the word's phonetic key."""
+        key = self.key(word)
+        words = (self.mapped.lower_word(i) for i in self.mapped.phonetic_postings(key))
+        # Postings are grouped by key hash, so drop any colliding keys.
+        return [w for w in words if self.key(w) == key]
+
+
+class CorrectionCache:
+    """Bounded LRU cache of corrections, optionally backed by a SQLite file."""
+    
+    FORMAT_VERSION = '1'
+    
+    def __init__(self, max_size: int, path: Optional[str] = None,
+                 dictionary_hash: str = '', flush_every: int = 1000):
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()
+        self.pending: List[Tuple[str, Optional[str], str]] = []
+        self.flush_every = flush_every
+        self.dictionary_hash = dictionary_hash
+        self.lock = threading.Lock()
+        
+        self.stats = {
+            'cache_hits': 0,
+            'cache_disk_hits': 0,
+            'cache_misses': 0,
+            'cache_evictions': 0
+        }
+        
+        self.db = None
+        if path:
+            # Callers may hand the corrector to a worker thread; access stays serialised.
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self._open_store(dictionary_hash)
+    
+    def _open_store(self, dictionary_hash: str):
+        """Create the on-disk tables and drop entries from another dictionary."""
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS corrections '
+            '(word TEXT PRIMARY KEY, corrected TEXT, category TEXT)'
+        )
+        
+        stamp = f"{self.FORMAT_VERSION}:{dictionary_hash}"
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'dictionary'").fetchone()
+        if row is None or row[0] != stamp:
+            self.db.execute('DELETE FROM corrections')
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('dictionary', ?)", (stamp,))
+        self.db.commit()
+    
+    def reset(self, dictionary_hash: str):
+        """Forget every correction because the dictionary changed."""
+        with self.lock:
+            self.dictionary_hash = dictionary_hash
+            self.entries.clear()
+            self.pending = []
+            if self.db is not None:
+                self._open_store(dictionary_hash)
+    
+    def get(self, key: str, dictionary_hash: Optional[str] = None) -> Optional[Tuple[Optional[str], str]]:
+        """Get a cached (corrected, category) pair, or None on a miss.
+        
+        Callers that pass their dictionary_hash never read entries cached
+        for a different dictionary (e.g. while a reload swaps snapshots).
+        """
+        with self.lock:
+            if dictionary_hash is not None and dictionary_hash != self.dictionary_hash:
+                return None
+            return self._get(key)
+    
+    def _get(self, key: str) -> Optional[Tuple[Optional[str], str]]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.stats['cache_hits'] += 1
+            return entry
+        
+        if self.db is not None:
+            row = self.db.execute(
+                'SELECT corrected, category FROM corrections WHERE word = ?', (key,)
+            ).fetchone()
+            if row is not None:
+                self.stats['cache_disk_hits'] += 1
+                self._remember(key, (row[0], row[1]))
+                return row[0], row[1]
+        
+        self.stats['cache_misses'] += 1
+        return None
+    
+    def put(self, key: str, corrected: Optional[str], category: str,
+            dictionary_hash: Optional[str] = None):
+        """Cache a resolved correction, writing it through to disk if enabled."""
+        with self.lock:
+            if dictionary_hash is not None and dictionary_hash != self.dictionary_hash:
+                return
+            self._remember(key, (corrected, category))
+            
+            if self.db is not None:
+                self.pending.append((key, corrected, category))
+                if len(self.pending) >= self.flush_every:
+                    self._flush()
+    
+    def _remember(self, key: str, entry: Tuple[Optional[str], str]):
+        """Insert into the in-memory LRU, evicting the oldest entries."""
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.stats['cache_evictions'] += 1
+    
+    def flush(self):
+        """Write pending corrections to the on-disk store."""
+        with self.lock:
+            self._flush()
+    
+    def _flush(self):
+        if self.db is None or not self.pending:
+            return
+        self.db.executemany('INSERT OR REPLACE INTO corrections VALUES (?, ?, ?)', self.pending)
+        self.db.commit()
+        self.pending = []
+    
+    def close(self):
+        """Flush and close the on-disk store."""
+        with self.lock:
+            self._flush()
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+
+class CorrectionBudget:
+    """Time and work allowance for correcting one word.
+    
+    Work is counted in strings probed, the unit of the metrics' generated
+    candidates. A tier is refused up front when its predicted work, or that
+    work at the tier's measured cost per string, does not fit what is left.
+    """
+    
+    def __init__(self, seconds: Optional[float] = None, work: Optional[int] = None):
+        self.seconds = seconds
+        self.work = work
+        self.start = time.perf_counter()
+        self.spent = 0
+        self.skipped: List[str] = []
+    
+    def allows(self, predicted_work: int, unit_seconds: float) -> bool:
+        """Check whether a tier predicted to probe predicted_work strings still fits."""
+        if self.work is not None and self.spent + predicted_work > self.work:
+            return False
+        if self.seconds is not None:
+            remaining = self.seconds - (time.perf_counter() - self.start)
+            if remaining <= 0:
+                return False
+            if predicted_work * unit_seconds > remaining:
+                return False
+        return True
+    
+    def charge(self, generated: int):
+        """Count the strings a tier actually probed."""
+        self.spent += generated
+
+
+class ThreadCounters(Mapping):
+    """Named counters that each thread increments in its own dict, summed when read.
+    
+    No dict is written by two threads, so increments need no lock and are
+    never lost, with or without the GIL; the lock only guards registering a
+    thread's dict. Read like a dict of totals.
+    """
+    
+    def __init__(self, names: Iterable[str]):
+        self.names = tuple(names)
+        self._lock = threading.Lock()
+        self._threads = threading.local()
+        self._shards: List[Dict[str, int]] = []
+    
+    def local(self) -> Dict[str, int]:
+        """The calling thread's counters, to increment directly."""
+        counts = getattr(self._threads, 'counts', None)
+        if counts is None:
+            counts = self._threads.counts = dict.fromkeys(self.names, 0)
+            with self._lock:
+                self._shards.append(counts)
+        return counts
+    
+    def add(self, counts: Dict[str, int]):
+        """Add a batch of counts, e.g. a pool worker's, to the calling thread's counters."""
+        local = self.local()
+        for name, count in counts.items():
+            local[name] += count
+    
+    def reset(self):
+        """Zero every thread's counters; meant for when no thread is counting."""
+        with self._lock:
+            for counts in self._shards:
+                for name in counts:
+                    counts[name] = 0
+    
+    def __getitem__(self, name: str) -> int:
+        if name not in self.names:
+            raise KeyError(name)
+        with self._lock:
+            shards = list(self._shards)
+        return sum(counts[name] for counts in shards)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+    
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class DictionaryIndex:
+    """One version of a dictionary and the structures its candidate tiers probe.
+    
+    A version is not changed once a corrector publishes it: each correction
+    pins the version it started on, and add_words/remove_words edit a copy()
+    and publish it with one assignment. A copy duplicates only the top-level
+    tables; posting lists stay shared, as edits replace them instead of
+    changing them.
+    """
+    
+    def __init__(self, dictionary: Set[str], dictionary_lower: Mapping[str, str],
+                 dictionary_lower_set=None, case_variants: Optional[Dict[str, Set[str]]] = None,
+                 phonetic_index: Optional[PhoneticIndex] = None,
+                 delete_index: Optional[DeleteIndex] = None,
+                 length_buckets: Optional[LengthBuckets] = None,
+                 qgram_index: Optional[QGramIndex] = None,
+                 dictionary_hash: Optional[str] = None):
+        self.dictionary = dictionary
+        self.dictionary_set = dictionary
+        self.dictionary_lower = dictionary_lower
+        # A view onto the same objects rather than a copy.
+        self.dictionary_lower_set = (dictionary_lower.keys() if dictionary_lower_set is None
+                                     else dictionary_lower_set)
+        # Found on first use unless given (see case_variants).
+        self._case_variants = case_variants
+        self.phonetic_index = phonetic_index
+        self.delete_index = delete_index
+        self.length_buckets = length_buckets
+        self.qgram_index = qgram_index
+        # Built by suggest() on first use.
+        self.trie: Optional[Trie] = None
+        # Computed on first use unless given, then kept current by copies.
+        self.hash_sum: Optional[int] = None
+        self._hash = dictionary_hash
+    
+    @property
+    def case_variants(self) -> Dict[str, Set[str]]:
+        """Lowercase forms shared by several exact words, so removing one can fall back to another.
+        
+        Only edits need them, so a dictionary is scanned for them on first
+        use rather than at load time; read-only stores never are.
+        """
+        if self._case_variants is None:
+            variants: Dict[str, Set[str]] = {}
+            if len(self.dictionary_lower) < len(self.dictionary):
+                for word in self.dictionary:
+                    canonical = self.dictionary_lower[word.lower()]
+                    if canonical != word:
+                        variants.setdefault(word.lower(), {canonical}).add(word)
+            self._case_variants = variants
+        return self._case_variants
+    
+    def dictionary_hash(self) -> str:
+        """Hash the dictionary content, independent of file order."""
+        if self._hash is None:
+            self.hash_sum = sum(word_digest(word) for word in self.dictionary)
+            self._hash = format_hash(self.hash_sum)
+        return self._hash
+    
+    def copy(self) -> 'DictionaryIndex':
+        """Copy a text dictionary's version for add() and remove() to edit before it is published."""
+        index = copy.copy(self)
+        index.dictionary = index.dictionary_set = set(self.dictionary)
+        index.dictionary_lower = dict(self.dictionary_lower)
+        index.dictionary_lower_set = index.dictionary_lower.keys()
+        index._case_variants = dict(self.case_variants)
+        for name in ('phonetic_index', 'delete_index', 'length_buckets', 'qgram_index', 'trie'):
+            structure = getattr(self, name)
+            if structure is not None:
+                setattr(index, name, structure.copy())
+        return index
+    
+    def add(self, words: Iterable[str]) -> int:
+        """Add words to every structure; return how many were new."""
+        added = 0
+        new_lowers = []
+        
+        for word in words:
+            word = word.strip()
+            if not word or word in self.dictionary_set:
+                continue
+            
+            self.dictionary.add(word)
+            if self.hash_sum is not None:
+                self.hash_sum += word_digest(word)
+            added += 1
+            
+            word_lower = word.lower()
+            if word_lower in self.dictionary_lower:
+                # Another case form is already indexed under this lowercase word.
+                variants = self.case_variants.get(word_lower, {self.dictionary_lower[word_lower]})
+                self.case_variants[word_lower] = variants | {word}
+                continue
+            
+            self.dictionary_lower[word_lower] = word
+            self.phonetic_index.add(word_lower)
+            if self.delete_index is not None:
+                self.delete_index.add(word_lower)
+            if self.trie is not None:
+                self.trie.insert(word_lower)
+            new_lowers.append(word_lower)
+            if self.qgram_index is not None:
+                self.qgram_index.add(word_lower)
+        
+        if self.length_buckets is not None and new_lowers:
+            # One pass per length bucket rather than one per word.
+            self.length_buckets.update(added=new_lowers)
+        self._rehash()
+        return added
+    
+    def remove(self, words: Iterable[str]) -> int:
+        """Remove exact words from every structure; return how many were found."""
+        removed = 0
+        gone_lowers = []
+        
+        for word in words:
+            word = word.strip()
+            if word not in self.dictionary_set:
+                continue
+            
+            self.dictionary.discard(word)
+            if self.hash_sum is not None:
+                self.hash_sum -= word_digest(word)
+            removed += 1
+            
+            word_lower = word.lower()
+            variants = self.case_variants.get(word_lower)
+            if variants:
+                # Other case forms remain, so the lowercase entry stays indexed.
+                variants = variants - {word}
+                if self.dictionary_lower[word_lower] == word:
+                    self.dictionary_lower[word_lower] = min(variants)
+                if len(variants) == 1:
+                    del self.case_variants[word_lower]
+                else:
+                    self.case_variants[word_lower] = variants
+                continue
+            
+            del self.dictionary_lower[word_lower]
+            self.phonetic_index.remove(word_lower)
+            if self.delete_index is not None:
+                self.delete_index.remove(word_lower)
+            if self.trie is not None:
+                self.trie.remove(word_lower)
+            gone_lowers.append(word_lower)
+            if self.qgram_index is not None:
+                self.qgram_index.remove(word_lower)
+        
+        if self.length_buckets is not None and gone_lowers:
+            self.length_buckets.update(removed=gone_lowers)
+        self._rehash()
+        return removed
+    
+    def _rehash(self):
+        self._hash = None if self.hash_sum is None else format_hash(self.hash_sum)
+
+
+class _IndexPin(threading.local):
+    """The index version a thread's current correction reads, and how deeply its calls nest."""
+    index = None
+    depth = 0
+
+
+class IndexField:
+    """Corrector attribute read from the index version the calling thread pinned, else the latest."""
+    
+    def __set_name__(self, owner, name: str):
+        self.name = name
+    
+    def __get__(self, corrector, owner=None):
+        if corrector is None:
+            return self
+        return getattr(corrector._pin.index or corrector.index, self.name)
+    
+    def __set__(self, corrector, value):
+        raise AttributeError(f"'{self.name}' belongs to the dictionary index; "
+                             f"change it with add_words/remove_words")
+
+
+def pins_index(method: Callable) -> Callable:
+    """Run a corrector method, and everything it calls, against one index version."""
+    @wraps(method)
+    def pinned(self, *args, **kwargs):
+        self._pin_index()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._unpin_index()
+    return pinned
+
 
 class SpellCorrector:
     """Advanced spell corrector for non-English words in English script."""
     
-    def __init__(self, dictionary_file: str):
-        self.dictionary = self._load_dictionary(dictionary_file)
-        self.dictionary_lower = {word.lower(): word for word in self.dictionary}
-        self.dictionary_set = set(self.dictionary)
-        self.dictionary_lower_set = set(self.dictionary_lower.keys())
+    ENGINES = ('classic', 'symspell')
+    
+    # Candidate tiers in the order get_candidates tries them; the first tier
+    # that finds dictionary words resolves the word. The q-gram tier stays
+    # after the phonetic-key tiers: on the seeded medium benchmark (110k
+    # errors, distance 3) running it first changes accuracy by +0.04% (small:
+    # -0.05%) while taking 2.5 times as long, as most words it would claim
+    # already have a phonetic-key match.
+    TIERS = ('edit_distance_1', 'phonetic_variation', 'edit_distance_2',
+             'phonetic_key', 'phonetic_key_delete', 'qgram', 'fallback_scan')
+    
+    # Candidate sets at least this large are scored with the NumPy kernel.
+    VECTOR_SCORING_MIN = 64
+    
+    # Seconds per probed string assumed for a tier until it has been timed,
+    # and the weight of each new probe in the running estimate.
+    UNIT_COST_PRIOR = 1e-6
+    UNIT_COST_SMOOTHING = 0.05
+    
+    # Per-word outcome counters kept in stats.
+    STATS = ('total_words', 'exact_match', 'case_corrected', 'edit_distance_1',
+             'edit_distance_2', 'phonetic_match', 'no_match', 'budget_limited')
+    
+    # Read from the current DictionaryIndex version (see current_index).
+    dictionary = IndexField()
+    dictionary_set = IndexField()
+    dictionary_lower = IndexField()
+    dictionary_lower_set = IndexField()
+    case_variants = IndexField()
+    phonetic_index = IndexField()
+    delete_index = IndexField()
+    length_buckets = IndexField()
+    qgram_index = IndexField()
+    trie = IndexField()
+    
+    def __init__(self, dictionary_file: str, engine: str = 'classic',
+                 cache_size: int = 0, cache_file: Optional[str] = None,
+                 fallback_distance: int = 0, metrics: Optional[CorrectionMetrics] = None,
+                 compact: bool = False, time_budget: Optional[float] = None,
+                 work_budget: Optional[int] = None, qgram_distance: int = 0,
+                 shared_memory: bool = False, shared_name: Optional[str] = None,
+                 candidate_limit: int = 0):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {self.ENGINES}")
         
+        self.dictionary_file = dictionary_file
+        self.cache_size = cache_size
+        self.engine = engine
+        self.fallback_distance = fallback_distance
+        self.qgram_distance = qgram_distance
+        # Stop an edit or phonetic tier after this many dictionary hits (0: find all).
+        self.candidate_limit = candidate_limit
+        self.compact = compact
+        # Build the compact layout into a shared-memory segment (owned, unlinked
+        # by unlink_shared), or attach to one another process built.
+        self.shared_memory = shared_memory
+        self.shared_name = shared_name
+        self.segment = None
+        # Default per-word budgets (seconds, strings probed); None is unlimited.
+        self.time_budget = time_budget
+        self.work_budget = work_budget
+        # Shared by all threads; a racing update only nudges an estimate.
+        self._unit_seconds: Dict[str, float] = {}
         self.phonetic_map = self._build_phonetic_map()
         self.char_similarity = self._build_char_similarity_map()
+        self.canonical_tables = self._build_canonical_tables()
         
-        self.stats = {
-            'total_words': 0,
-            'exact_match': 0,
-            'case_corrected': 0,
-            'edit_distance_1': 0,
-            'edit_distance_2': 0,
-            'phonetic_match': 0,
-            'no_match': 0
-        }
+        # Corrections read the index version they started on, so any number
+        # of threads can call correct_word while another thread edits.
+        self._pin = _IndexPin()
+        self._load_indexes()
+        
+        # Edits build the next index version one at a time.
+        self._edit_lock = threading.Lock()
+        self._trie_lock = threading.Lock()
+        
+        # Counted per thread, so one instance can serve a thread pool.
+        self.stats = ThreadCounters(self.STATS)
+        
+        # Per-tier latency and candidate volumes; None keeps the hot path untimed.
+        self.metrics = metrics
+        
+        self.cache = None
+        if cache_size > 0 or cache_file:
+            self.cache = CorrectionCache(
+                max_size=cache_size if cache_size > 0 else 10000,
+                path=cache_file,
+                dictionary_hash=self.dictionary_hash(),
+            )
+    
+    def _load_indexes(self):
+        """Load the dictionary file and build the structures candidate tiers probe."""
+        dictionary_file = self.dictionary_file
+        
+        # A compiled index is memory-mapped and read in place instead of rebuilt;
+        # processes mapping the same file already share its pages.
+        self.mapped = None
+        if self.shared_name is not None:
+            self.mapped = MappedDictionary.attach(self.shared_name)
+        elif is_compiled_index(dictionary_file):
+            self.mapped = MappedDictionary.open(dictionary_file)
+        elif self.compact or self.shared_memory:
+            # Same layout built in memory: UTF-8 blobs with offset and hash
+            # arrays in place of per-word str objects, sets and dicts.
+            data = build_index(
+                self._load_dictionary(dictionary_file), DeleteIndex.delete_variants,
+                PhoneticIndex((), self.phonetic_map).key,
+                2 if self.engine == 'symspell' else 0)
+            if self.shared_memory:
+                self.segment = share_index(data)
+                self.shared_name = self.segment.name
+                self.mapped = MappedDictionary(self.segment.buf, owner=self.segment)
+            else:
+                self.mapped = MappedDictionary(data)
+        
+        if self.mapped is not None:
+            index = DictionaryIndex(self.mapped.canonical, self.mapped, self.mapped,
+                                    phonetic_index=MappedPhoneticIndex(self.mapped, self.phonetic_map),
+                                    dictionary_hash=self.mapped.dictionary_hash)
+        else:
+            dictionary = self._load_dictionary(dictionary_file)
+            index = DictionaryIndex(dictionary, {word.lower(): word for word in dictionary})
+            index.phonetic_index = PhoneticIndex(index.dictionary_lower_set, self.phonetic_map)
+        
+        # Optional last tier: scan the whole dictionary with the bit-parallel kernel.
+        if self.fallback_distance > 0:
+            index.length_buckets = LengthBuckets(index.dictionary_lower_set)
+        
+        # Optional tier for edit distance 3+: q-gram shortlist, then verification.
+        if self.qgram_distance > 0:
+            index.qgram_index = QGramIndex(index.dictionary_lower_set, self.qgram_distance)
+        
+        optional = {'qgram': index.qgram_index, 'fallback_scan': index.length_buckets}
+        self.tiers = tuple(t for t in self.TIERS if optional.get(t, True) is not None)
+        
+        if self.engine == 'symspell':
+            if self.mapped is not None:
+                index.delete_index = MappedDeleteIndex(self.mapped, self.edit_distance_1)
+            else:
+                index.delete_index = DeleteIndex(index.dictionary_lower_set, self.edit_distance_1)
+        
+        self.index = index
+    
+    def current_index(self) -> DictionaryIndex:
+        """The index version the calling thread's correction pinned, else the latest one."""
+        return self._pin.index or self.index
+    
+    def _pin_index(self, index: Optional[DictionaryIndex] = None):
+        """Make the calling thread read one index version (default: the latest) until _unpin_index.
+        
+        Pins nest: a call made while pinned keeps the outer call's version.
+        """
+        pin = self._pin
+        if pin.depth == 0:
+            pin.index = self.index if index is None else index
+        pin.depth += 1
+    
+    def _unpin_index(self):
+        pin = self._pin
+        pin.depth -= 1
+        if pin.depth == 0:
+            pin.index = None
+    
+    def dictionary_hash(self) -> str:
+        """Hash the dictionary content, independent of file order."""
+        return self.current_index().dictionary_hash()
+    
+    def add_words(self, words: Iterable[str]) -> int:
+        """Add words to the dictionary and every derived index; return how many were new.
+        
+        The edit goes into a copy of the current index version, published
+        with one assignment once complete: corrections already running
+        finish on the version they started with, later ones see every word.
+        The copy duplicates the top-level tables once per call, so add words
+        in batches. Cached corrections are dropped, since any of them may
+        now change.
+        """
+        self._require_mutable()
+        with self._edit_lock:
+            index = self.index.copy()
+            added = index.add(words)
+            if added:
+                self.index = index
+                self._dictionary_changed()
+            return added
+    
+    def remove_words(self, words: Iterable[str]) -> int:
+        """Remove exact words from the dictionary and every derived index; return how many were found.
+        
+        Published as a new index version, like add_words.
+        """
+        self._require_mutable()
+        with self._edit_lock:
+            index = self.index.copy()
+            removed = index.remove(words)
+            if removed:
+                self.index = index
+                self._dictionary_changed()
+            return removed
+    
+    def unlink_shared(self):
+        """Remove the shared-memory segment this corrector created, if any.
+        
+        Processes still attached (including this one) keep reading their
+        mapping until they exit; the memory is freed after the last one.
+        """
+        if self.segment is not None:
+            self.segment.unlink()
+            self.segment = None
+    
+    def _require_mutable(self):
+        if self.mapped is not None:
+            raise ValueError("A compiled or compact dictionary is read-only; edit the word list and reload it")
+    
+    def _dictionary_changed(self):
+        """Drop cached corrections after an edit."""
+        if self.cache is not None:
+            self.cache.reset(self.dictionary_hash())
+    
+    def compile(self, output_path: str, max_distance: int = 2):
+        """Write the dictionary and its derived indexes as a compiled index file."""
+        data = build_index(self.dictionary, DeleteIndex.delete_variants,
+                           self.phonetic_index.key, max_distance)
+        with open(output_path, 'wb') as f:
+            f.write(data)
     
     def _load_dictionary(self, filepath: str) -> Set[str]:
         """Load dictionary from file."""
@@ -75,32 +1294,111 @@ class SpellCorrector:
             'b': '8',
         }
     
+    def _build_canonical_tables(self) -> List[Dict[int, str]]:
+        """Build translate() tables mapping look-alike digits to letters, one per alternative."""
+        digits = {
+            char: [c for c in similar if c.isalpha()]
+            for char, similar in self.char_similarity.items() if char.isdigit()
+        }
+        width = max((len(letters) for letters in digits.values()), default=0)
+        return [
+            str.maketrans({digit: letters[min(i, len(letters) - 1)] for digit, letters in digits.items()})
+            for i in range(width)
+        ]
+    
     def normalize_word(self, word: str) -> str:
         """Normalize word by removing accents and special characters."""
-        word = ''.join(
-            c for c in unicodedata.normalize('NFD', word)
-            if unicodedata.category(c) != 'Mn'
-        )
-        return word
+        return strip_accents(word)
     
-    def edit_distance_1(self, word: str) -> Set[str]:
-        """Generate all words at edit distance 1 from the input word."""
-        letters = 'abcdefghijklmnopqrstuvwxyz'
-        splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    def canonical_forms(self, word_lower: str) -> List[str]:
+        """Spellings of a lowercased word with accents stripped and look-alike digits read as letters."""
+        if word_lower.isascii() and word_lower.isalpha():
+            return []
         
-        deletes = [L + R[1:] for L, R in splits if R]
-        transposes = [L + R[1] + R[0] + R[2:] for L, R in splits if len(R) > 1]
-        replaces = [L + c + R[1:] for L, R in splits if R for c in letters]
-        inserts = [L + c + R for L, R in splits for c in letters]
+        form = word_lower if word_lower.isascii() else strip_accents(word_lower)
+        forms = []
+        for table in self.canonical_tables:
+            variant = form.translate(table)
+            if variant != word_lower and variant not in forms:
+                forms.append(variant)
+        return forms
+    
+    def _resolve_canonical(self, word: str, word_lower: str) -> Tuple[str, Set[str]]:
+        """Probe a word's canonical forms; return (form the tiers should search, dictionary words found)."""
+        forms = self.canonical_forms(word_lower)
+        if not forms:
+            return word_lower, set()
         
-        return set(deletes + transposes + replaces + inserts)
+        start = time.perf_counter() if self.metrics is not None else 0.0
+        found = {self.dictionary_lower[form] for form in forms if form in self.dictionary_lower_set}
+        if self.metrics is not None:
+            self.metrics.observe_tier(word, 'canonical', time.perf_counter() - start,
+                                      len(forms), len(found))
+        return forms[0], found
+    
+    @staticmethod
+    def iter_edits1(word: str) -> Iterator[str]:
+        """Yield the deletes, transposes, replaces and inserts of a word one at a time.
+        
+        Nothing is collected, so a few strings may repeat (e.g. replacing a
+        letter with itself gives the word back).
+        """
+        for i in range(len(word) + 1):
+            left, right = word[:i], word[i:]
+            if right:
+                tail = right[1:]
+                yield left + tail
+                if tail:
+                    yield left + tail[0] + right[0] + tail[1:]
+                for c in LETTERS:
+                    yield left + c + tail
+            for c in LETTERS:
+                yield left + c + right
+    
+    def iter_edits2(self, word: str) -> Iterator[str]:
+        """Yield the edit distance 2 variants of a word one at a time.
+        
+        Each distinct ED1 variant is expanded once; only that set of about
+        54 strings per letter is kept. The far larger ED2 level is never
+        stored, so its repeats are simply probed again.
+        """
+        for e1 in set(self.iter_edits1(word)):
+            yield from self.iter_edits1(e1)
+    
+    def edit_distance_1(self, word: str) -> Set[str]:
+        """Generate all words at edit distance 1 from the input word."""
+        return set(self.iter_edits1(word))
     
     def edit_distance_2(self, word: str) -> Set[str]:
         """Generate all words at edit distance 2 from the input word."""
-        return set(
-            e2 for e1 in self.edit_distance_1(word)
-            for e2 in self.edit_distance_1(e1)
-        )
+        return set(self.iter_edits2(word))
+    
+    def probe_variants(self, variants: Iterable[str]) -> Tuple[int, Set[str]]:
+        """Probe variants against the dictionary as they are produced; return (probed, hits).
+        
+        Stops after candidate_limit distinct hits when that is set.
+        """
+        lookup = self.dictionary_lower_set
+        limit = self.candidate_limit
+        hits = set()
+        probed = 0
+        if not limit and isinstance(lookup, MappedDictionary):
+            # A compiled index checks a chunk of variants per call instead
+            # of a CRC32 and bisect each.
+            variants = iter(variants)
+            while True:
+                chunk = list(islice(variants, INTERSECTION_CHUNK))
+                if not chunk:
+                    return probed, hits
+                probed += len(chunk)
+                hits |= lookup.intersection(chunk)
+        
+        for probed, variant in enumerate(variants, 1):
+            if variant in lookup:
+                hits.add(variant)
+                if limit and len(hits) >= limit:
+                    break
+        return probed, hits
     
     def phonetic_variations(self, word: str) -> Set[str]:
         """Generate phonetic variations of a word."""
@@ -117,41 +1415,198 @@ class SpellCorrector:
         
         return variations
     
-    def get_candidates(self, word: str) -> Set[str]:
-        """Get all candidate corrections for a word."""
-        word_lower = word.lower()
+    @pins_index
+    def dictionary_neighbours(self, word: str, distance: int) -> Set[str]:
+        """Get lowercased dictionary words within edit distance 1 or 2 of a word."""
+        return self._probe_neighbours(word, distance)[1]
+    
+    def _probe_neighbours(self, word: str, distance: int) -> Tuple[int, Set[str]]:
+        """Get (strings probed, dictionary neighbours) for edit distance 1 or 2."""
+        if self.delete_index is not None:
+            return self.delete_index.probe(word, distance, self.candidate_limit)
         
-        if word_lower in self.dictionary_lower_set:
-            return {self.dictionary_lower[word_lower]}
+        if distance == 1:
+            return self.probe_variants(self.iter_edits1(word))
+        return self.probe_variants(self.iter_edits2(word))
+    
+    def probe_tier(self, tier: str, word_lower: str) -> Tuple[int, Set[str]]:
+        """Run one candidate tier; return (strings generated, lowercased dictionary hits)."""
+        if tier == 'edit_distance_1':
+            return self._probe_neighbours(word_lower, 1)
+        
+        if tier == 'phonetic_variation':
+            return self.probe_variants(self.phonetic_variations(word_lower))
+        
+        if tier == 'edit_distance_2':
+            return self._probe_neighbours(word_lower, 2)
         
-        candidates = set()
+        # Single-character phonetic variations are a subset of ED1/ED2, so
+        # probe the precomputed phonetic keys instead of expanding them again.
+        if tier == 'phonetic_key':
+            return 1, set(self.phonetic_index.lookup(word_lower))
         
-        ed1 = self.edit_distance_1(word_lower)
-        candidates.update(w for w in ed1 if w in self.dictionary_lower_set)
+        if tier == 'phonetic_key_delete':
+            found = set()
+            for i in range(len(word_lower)):
+                found.update(self.phonetic_index.lookup(word_lower[:i] + word_lower[i+1:]))
+            return len(word_lower), found
         
-        if candidates:
-            return {self.dictionary_lower[w] for w in candidates}
+        if tier == 'qgram':
+            return self.qgram_index.probe(word_lower, self.qgram_distance)
         
-        phonetic = self.phonetic_variations(word_lower)
-        candidates.update(w for w in phonetic if w in self.dictionary_lower_set)
+        if tier == 'fallback_scan':
+            matches = self.length_buckets.within(word_lower, self.fallback_distance)
+            scanned = self.length_buckets.scan_size(len(word_lower), self.fallback_distance)
+            return scanned, {w for w, _ in matches}
+        
+        raise ValueError(f"Unknown candidate tier '{tier}', expected one of {self.TIERS}")
+    
+    def _batch_variants(self, tier: str) -> Optional[Callable[[str], Iterable[str]]]:
+        """Variant generator a tier probes the plain dictionary with, or None if it uses an index."""
+        if self.candidate_limit:
+            return None
+        if tier == 'phonetic_variation':
+            return self.phonetic_variations
+        if self.delete_index is None:
+            if tier == 'edit_distance_1':
+                return self.iter_edits1
+            if tier == 'edit_distance_2':
+                return self.iter_edits2
+        return None
+    
+    def _probe_batch(self, tier: str, forms: List[str]) -> Dict[str, Set[str]]:
+        """Run one tier for many lowercased forms; return each form's dictionary hits."""
+        variants = self._batch_variants(tier)
+        if variants is None:
+            return {form: self.probe_tier(tier, form)[1] for form in forms}
         
-        if candidates:
-            return {self.dictionary_lower[w] for w in candidates}
+        lookup = self.dictionary_lower_set
+        if isinstance(lookup, KeysView):
+            # The keys view intersects in C, consuming the generator without
+            # a Python-level loop per variant.
+            return {form: lookup & variants(form) for form in forms}
+        # A compiled index: hashing every variant and matching the sorted
+        # table at once beats a CRC32 and bisect per variant.
+        return {form: lookup.intersection(variants(form)) for form in forms}
+    
+    def _resolve_forms(self, forms: List[str]) -> Dict[str, Tuple[str, Set[str]]]:
+        """Resolve lowercased forms tier by tier: each tier runs over every form still unresolved."""
+        resolved = {}
+        for tier in self.tiers:
+            if not forms:
+                break
+            hits = self._probe_batch(tier, forms)
+            for form in forms:
+                found = hits[form]
+                if found:
+                    # Copy into a fresh set first so tie order matches resolve_candidates.
+                    candidates = set()
+                    candidates.update(found)
+                    resolved[form] = tier, {self.dictionary_lower[w] for w in candidates}
+            forms = [form for form in forms if form not in resolved]
+        
+        for form in forms:
+            resolved[form] = 'no_match', set()
+        return resolved
+    
+    @pins_index
+    def get_candidates(self, word: str) -> Set[str]:
+        """Get all candidate corrections for a word."""
+        return self.resolve_candidates(word)[1]
+    
+    def estimate_work(self, tier: str, length: int) -> int:
+        """Predict how many strings a tier probes for a word of the given length."""
+        # Deletes, transposes and 26 replaces and inserts per position.
+        edits1 = 54 * length + 25
+        if tier == 'edit_distance_1':
+            return length + 1 if self.delete_index is not None else edits1
+        if tier == 'edit_distance_2':
+            if self.delete_index is not None:
+                return 1 + length + length * (length - 1) // 2
+            # Every ED1 variant is expanded and probed, repeats included.
+            return edits1 * edits1
+        if tier == 'phonetic_variation':
+            return 2 * length + 3
+        if tier == 'phonetic_key':
+            return 1
+        if tier == 'phonetic_key_delete':
+            return length
+        if tier == 'qgram':
+            return self.qgram_index.estimate(length, self.qgram_distance)
+        if tier == 'fallback_scan':
+            return self.length_buckets.scan_size(length, self.fallback_distance)
+        raise ValueError(f"Unknown candidate tier '{tier}', expected one of {self.TIERS}")
+    
+    def _make_budget(self, time_budget: Optional[float] = None,
+                     work_budget: Optional[int] = None) -> Optional[CorrectionBudget]:
+        """Build a word's budget from explicit limits or the corrector's defaults."""
+        seconds = self.time_budget if time_budget is None else time_budget
+        work = self.work_budget if work_budget is None else work_budget
+        if seconds is None and work is None:
+            return None
+        return CorrectionBudget(seconds, work)
+    
+    def _tier_allowed(self, budget: CorrectionBudget, tier: str, word_lower: str) -> bool:
+        """Check a tier against the budget, recording it as skipped when it does not fit."""
+        work = self.estimate_work(tier, len(word_lower))
+        if budget.allows(work, self._unit_seconds.get(tier, self.UNIT_COST_PRIOR)):
+            return True
+        budget.skipped.append(tier)
+        if self.metrics is not None:
+            self.metrics.observe_skipped(tier)
+        return False
+    
+    def _record_probe(self, word: str, tier: str, budget: Optional[CorrectionBudget],
+                      seconds: float, generated: int, found: int):
+        """Feed one tier probe to the metrics, the budget and the per-tier cost estimate."""
+        if self.metrics is not None:
+            self.metrics.observe_tier(word, tier, seconds, generated, found)
+        if budget is not None:
+            budget.charge(generated)
+            cost = seconds / max(generated, 1)
+            previous = self._unit_seconds.get(tier)
+            self._unit_seconds[tier] = cost if previous is None else \
+                previous + self.UNIT_COST_SMOOTHING * (cost - previous)
+    
+    @pins_index
+    def resolve_candidates(self, word: str,
+                           budget: Optional[CorrectionBudget] = None) -> Tuple[str, Set[str]]:
+        """Get candidate corrections and the name of the tier that found them.
         
-        ed2 = self.edit_distance_2(word_lower)
-        candidates.update(w for w in ed2 if w in self.dictionary_lower_set)
+        With a budget, tiers that do not fit are skipped (and listed in
+        budget.skipped) while cheaper later tiers still run.
+        """
+        word_lower = word.lower()
         
-        if candidates:
-            return {self.dictionary_lower[w] for w in candidates}
+        if word_lower in self.dictionary_lower_set:
+            canonical = self.dictionary_lower[word_lower]
+            return ('exact' if canonical == word else 'case'), {canonical}
         
-        for phon_var in phonetic:
-            ed1_phon = self.edit_distance_1(phon_var)
-            candidates.update(w for w in ed1_phon if w in self.dictionary_lower_set)
+        # Digit-substituted and accented input usually resolves here, in O(1);
+        # otherwise the tiers search from the canonical spelling.
+        word_lower, found = self._resolve_canonical(word, word_lower)
+        if found:
+            return 'canonical', found
         
-        if candidates:
-            return {self.dictionary_lower[w] for w in candidates}
+        timed = self.metrics is not None or budget is not None
+        for tier in self.tiers:
+            if not timed:
+                found = self.probe_tier(tier, word_lower)[1]
+            else:
+                if budget is not None and not self._tier_allowed(budget, tier, word_lower):
+                    continue
+                start = time.perf_counter()
+                generated, found = self.probe_tier(tier, word_lower)
+                self._record_probe(word, tier, budget, time.perf_counter() - start,
+                                   generated, len(found))
+            
+            if found:
+                # Copy into a fresh set first so tie order matches a plain update().
+                candidates = set()
+                candidates.update(found)
+                return tier, {self.dictionary_lower[w] for w in candidates}
         
-        return candidates
+        return 'no_match', set()
     
     def levenshtein_distance(self, s1: str, s2: str) -> int:
         """Calculate Levenshtein distance between two strings."""
@@ -193,145 +1648,805 @@ class SpellCorrector:
         
         return base_distance + phonetic_penalty
     
+    def score_candidate(self, word: str, candidate: str) -> float:
+        """Score a candidate correction for a word (lower is better)."""
+        return self.weighted_distance(word, candidate)[0]
+    
+    def _score_terms(self, word: str, candidate: str) -> Tuple[float, int, float]:
+        """Get the (phonetic penalty, length difference, case bonus) score terms."""
+        penalty = 0
+        for c1, c2 in zip(word.lower(), candidate.lower()):
+            if c1 != c2 and c1 in self.phonetic_map and c2 in self.phonetic_map[c1]:
+                penalty -= 0.5
+        
+        len_diff = abs(len(word) - len(candidate))
+        case_bonus = 0
+        if word[0].isupper() == candidate[0].isupper():
+            case_bonus = -0.5
+        
+        return penalty, len_diff, case_bonus
+    
+    @staticmethod
+    def _combine_score(dist: int, penalty: float, len_diff: int, case_bonus: float) -> float:
+        """Combine an edit distance with the other terms into the final score."""
+        return dist + (dist + penalty) * 0.7 + len_diff * 0.3 + case_bonus
+    
+    def weighted_distance(self, word: str, candidate: str,
+                          best: float = float('inf')) -> Tuple[float, int]:
+        """Compute (score, edit distance) for a candidate in one banded DP pass.
+        
+        Gives the same score as levenshtein_distance plus phonetic_distance.
+        Returns (inf, -1) as soon as the score can no longer beat best.
+        """
+        s1, s2 = word.lower(), candidate.lower()
+        n, m = len(s1), len(s2)
+        terms = self._score_terms(word, candidate)
+        
+        def score_at(dist):
+            return self._combine_score(dist, *terms)
+        
+        # Largest distance that could still beat best; the DP is banded to it.
+        limit = max(n, m)
+        while limit >= 0 and score_at(limit) >= best:
+            limit -= 1
+        if limit < abs(n - m):
+            return float('inf'), -1
+        
+        if n == 0 or m == 0:
+            return score_at(n + m), n + m
+        
+        big = limit + 1
+        prev = [j if j <= limit else big for j in range(m + 1)]
+        for i in range(1, n + 1):
+            c1 = s1[i - 1]
+            cur = [big] * (m + 1)
+            if i <= limit:
+                cur[0] = i
+            row_min = cur[0]
+            
+            for j in range(max(1, i - limit), min(m, i + limit) + 1):
+                value = prev[j - 1] + (c1 != s2[j - 1])
+                if prev[j] + 1 < value:
+                    value = prev[j] + 1
+                if cur[j - 1] + 1 < value:
+                    value = cur[j - 1] + 1
+                if value > big:
+                    value = big
+                cur[j] = value
+                if value < row_min:
+                    row_min = value
+            
+            if row_min > limit:
+                return float('inf'), -1
+            prev = cur
+        
+        dist = prev[m]
+        if dist > limit:
+            return float('inf'), -1
+        return score_at(dist), dist
+    
     def select_best_candidate(self, word: str, candidates: Set[str]) -> str:
         """Select the best candidate from multiple options."""
         if not candidates:
             return word
         
+        return self._select_best(word, candidates)[0]
+    
+    def _select_best(self, word: str, candidates: Set[str]) -> Tuple[str, int]:
+        """Select the best candidate and return it with its edit distance."""
         if len(candidates) == 1:
-            return list(candidates)[0]
+            candidate = next(iter(candidates))
+            return candidate, self.weighted_distance(word, candidate)[1]
         
-        scored_candidates = []
-        word_lower = word.lower()
+        best_score = float('inf')
+        best_candidate, best_dist = None, -1
+        
+        if NUMPY_AVAILABLE and len(candidates) >= self.VECTOR_SCORING_MIN:
+            # Large sets: one lane-parallel pass for every edit distance.
+            candidates = list(candidates)
+            distances = batch_levenshtein(word.lower(), [c.lower() for c in candidates])
+            for candidate, dist in zip(candidates, distances):
+                score = self._combine_score(dist, *self._score_terms(word, candidate))
+                if score < best_score:
+                    best_score, best_candidate, best_dist = score, candidate, dist
+            return best_candidate, best_dist
         
+        # Only a strictly lower score replaces the leader, so ties keep the
+        # first candidate exactly like a stable sort would.
         for candidate in candidates:
-            candidate_lower = candidate.lower()
-            
-            edit_dist = self.levenshtein_distance(word_lower, candidate_lower)
-            phon_dist = self.phonetic_distance(word_lower, candidate_lower)
-            
-            len_diff = abs(len(word) - len(candidate))
-            
-            case_bonus = 0
-            if word[0].isupper() == candidate[0].isupper():
-                case_bonus = -0.5
-            
-            score = edit_dist + phon_dist * 0.7 + len_diff * 0.3 + case_bonus
-            
-            scored_candidates.append((score, candidate))
+            score, dist = self.weighted_distance(word, candidate, best_score)
+            if score < best_score:
+                best_score, best_candidate, best_dist = score, candidate, dist
+        
+        return best_candidate, best_dist
+    
+    @pins_index
+    def suggest(self, word: str, k: int = 5, max_distance: int = 2) -> List[Tuple[str, float]]:
+        """Return the top-k (candidate, score) suggestions for a word.
+        
+        Suggestions are ranked by edit distance, with ties broken by the
+        select_best_candidate score. The trie is built on first use.
+        """
+        word = word.strip()
+        if not word:
+            return []
+        
+        index = self.current_index()
+        if index.trie is None:
+            with self._trie_lock:
+                if index.trie is None:
+                    index.trie = Trie(index.dictionary_lower_set)
+        
+        ranked = []
+        for candidate_lower, distance in index.trie.search(word.lower(), k, max_distance):
+            candidate = index.dictionary_lower[candidate_lower]
+            ranked.append((distance, self.score_candidate(word, candidate), candidate))
+        
+        ranked.sort(key=lambda x: (x[0], x[1]))
+        return [(candidate, score) for _, score, candidate in ranked[:k]]
+    
+    @pins_index
+    def correct_word(self, word: str, time_budget: Optional[float] = None,
+                     work_budget: Optional[int] = None) -> str:
+        """Correct a single word, within a time (seconds) or work (strings probed) budget if given."""
+        budget = self._make_budget(time_budget, work_budget)
+        if self.metrics is None:
+            return self._correct_word(word, budget)[0]
         
-        scored_candidates.sort(key=lambda x: x[0])
-        return scored_candidates[0][1]
+        start = time.perf_counter()
+        corrected, tier = self._correct_word(word, budget)
+        self.metrics.observe_word(word, tier, time.perf_counter() - start)
+        return corrected
+    
+    @pins_index
+    def correct_word_within(self, word: str, time_budget: Optional[float] = None,
+                            work_budget: Optional[int] = None) -> Tuple[str, str, List[str]]:
+        """Correct a word under a budget; return (corrected, resolving tier, tiers skipped)."""
+        budget = self._make_budget(time_budget, work_budget) or CorrectionBudget()
+        start = time.perf_counter()
+        corrected, tier = self._correct_word(word, budget)
+        if self.metrics is not None:
+            self.metrics.observe_word(word, tier, time.perf_counter() - start)
+        return corrected, tier, budget.skipped
     
-    def correct_word(self, word: str) -> str:
-        """Correct a single word."""
-        self.stats['total_words'] += 1
+    def _correct_word(self, word: str, budget: Optional[CorrectionBudget] = None) -> Tuple[str, str]:
+        """Correct a single word and return it with the tier that resolved it."""
+        stats = self.stats.local()
+        stats['total_words'] += 1
         
         word = word.strip()
         
         if not word:
-            return word
+            return word, 'empty'
         
-        if word in self.dictionary_set:
-            self.stats['exact_match'] += 1
-            return word
+        index = self.current_index()
+        if word in index.dictionary_set:
+            stats['exact_match'] += 1
+            return word, 'exact'
         
         word_lower = word.lower()
-        if word_lower in self.dictionary_lower_set:
-            self.stats['case_corrected'] += 1
-            return self.dictionary_lower[word_lower]
+        if word_lower in index.dictionary_lower_set:
+            stats['case_corrected'] += 1
+            return index.dictionary_lower[word_lower], 'case'
+        
+        # Scoring only looks at the case of the first letter, so that is the
+        # one bit of case the cache key has to keep.
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ('^' if word[0].isupper() else '') + word_lower
+            cached = self.cache.get(cache_key, self.dictionary_hash())
+            if cached is not None:
+                corrected, category = cached
+                stats[category] += 1
+                return (word if corrected is None else corrected), 'cache'
         
-        candidates = self.get_candidates(word)
+        corrected, category, tier = self._correct_uncached(word, budget)
+        
+        limited = budget is not None and bool(budget.skipped)
+        if limited:
+            stats['budget_limited'] += 1
+        
+        # A budget-limited answer is not the full one, so it is not cached.
+        if cache_key is not None and not limited:
+            self.cache.put(cache_key, None if category == 'no_match' else corrected, category,
+                           self.dictionary_hash())
+        
+        stats[category] += 1
+        return corrected, tier
+    
+    def _correct_uncached(self, word: str,
+                          budget: Optional[CorrectionBudget] = None) -> Tuple[str, str, str]:
+        """Run the candidate tiers for a word; return (corrected, stats category, tier)."""
+        tier, candidates = self.resolve_candidates(word, budget)
         
         if not candidates:
-            self.stats['no_match'] += 1
-            return word
+            return word, 'no_match', tier
         
-        corrected = self.select_best_candidate(word, candidates)
+        if self.metrics is None:
+            corrected, edit_dist = self._select_best(word, candidates)
+        else:
+            start = time.perf_counter()
+            corrected, edit_dist = self._select_best(word, candidates)
+            self.metrics.observe_selection(time.perf_counter() - start, len(candidates))
         
-        edit_dist = self.levenshtein_distance(word_lower, corrected.lower())
+        return corrected, self._distance_category(edit_dist), tier
+    
+    @staticmethod
+    def _distance_category(edit_dist: int) -> str:
+        """Stats category of a correction at the given edit distance."""
         if edit_dist == 1:
-            self.stats['edit_distance_1'] += 1
+            return 'edit_distance_1'
         elif edit_dist == 2:
-            self.stats['edit_distance_2'] += 1
-        else:
-            self.stats['phonetic_match'] += 1
-        
-        return corrected
+            return 'edit_distance_2'
+        return 'phonetic_match'
     
-    def correct_file(self, input_file: str, output_file: str):
-        """Correct all words in a file and write results."""
-        start_time = time.time()
+    @pins_index
+    def correct_batch(self, words: Iterable[str], time_budget: Optional[float] = None,
+                      work_budget: Optional[int] = None) -> List[str]:
+        """Correct many words at once, tier by tier; return the corrections in input order.
         
-        print(f"Loading errors from {input_file}...")
-        with open(input_file, 'r', encoding='utf-8') as f:
-            errors = [line.strip() for line in f if line.strip()]
+        Words are stripped and de-duplicated, and spellings that differ only
+        in case after the first letter share one candidate search and one
+        selection. The exact/case pass, the cache and then every candidate
+        tier each run over all words still unresolved before the next starts.
+        Budgets and metrics are per word, so with either one the words are
+        corrected one by one as correct_word does.
+        """
+        words = list(words)
+        if self.metrics is not None or self._make_budget(time_budget, work_budget) is not None:
+            return [self.correct_word(word, time_budget, work_budget) for word in words]
         
-        print(f"Correcting {len(errors)} words...")
-        results = []
+        stats = self.stats.local()
+        stats['total_words'] += len(words)
+        counts = Counter(word.strip() for word in words)
+        corrections: Dict[str, str] = {}
         
-        for i, error_word in enumerate(errors):
-            if (i + 1) % 1000 == 0:
-                print(f"Progress: {i + 1}/{len(errors)} words processed...")
+        # Exact and case pass; the rest grouped by cache key (lowercase form
+        # plus the case of the first letter, all that scoring looks at).
+        groups: Dict[str, List[str]] = defaultdict(list)
+        index = self.current_index()
+        for word, count in counts.items():
+            if not word or word in index.dictionary_set:
+                if word:
+                    stats['exact_match'] += count
+                corrections[word] = word
+                continue
+            word_lower = word.lower()
+            if word_lower in index.dictionary_lower_set:
+                stats['case_corrected'] += count
+                corrections[word] = index.dictionary_lower[word_lower]
+            else:
+                groups[('^' if word[0].isupper() else '') + word_lower].append(word)
+        
+        dictionary_hash = self.dictionary_hash() if self.cache is not None else None
+        resolved: Dict[str, Tuple[str, Set[str]]] = {}
+        searches: Dict[str, str] = {}
+        for key, group in list(groups.items()):
+            if self.cache is not None:
+                cached = self.cache.get(key, dictionary_hash)
+                if cached is not None:
+                    corrected, category = cached
+                    for word in group:
+                        corrections[word] = word if corrected is None else corrected
+                        stats[category] += counts[word]
+                    del groups[key]
+                    continue
             
-            corrected_word = self.correct_word(error_word)
-            results.append((error_word, corrected_word))
+            form, found = self._resolve_canonical(group[0], group[0].lower())
+            if found:
+                resolved[key] = 'canonical', found
+            else:
+                searches[key] = form
+        
+        by_form = self._resolve_forms(list(dict.fromkeys(searches.values())))
+        for key, form in searches.items():
+            resolved[key] = by_form[form]
         
-        print(f"Writing results to {output_file}...")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(f"{'Error':<30} {'Corrected':<30}\n")
-            f.write("=" * 60 + "\n")
+        for key, group in groups.items():
+            candidates = resolved[key][1]
+            if candidates:
+                corrected, edit_dist = self._select_best(group[0], candidates)
+                category = self._distance_category(edit_dist)
+                for word in group:
+                    corrections[word] = corrected
+            else:
+                corrected, category = None, 'no_match'
+                for word in group:
+                    corrections[word] = word
             
-            for error, corrected in results:
-                f.write(f"{error:<30} {corrected:<30}\n")
+            if self.cache is not None:
+                self.cache.put(key, corrected, category, dictionary_hash)
+            stats[category] += sum(counts[word] for word in group)
+        
+        return [corrections[word.strip()] for word in words]
+    
+    def correct_file(self, input_file: str, output_file: str, workers: int = 1,
+                     output_format: str = 'table', batch_size: int = 1000, text: bool = False):
+        """Correct all words in a file and write results.
+        
+        Either path may be '-' for stdin/stdout; progress and statistics then
+        go to stderr so the output stays machine-readable. With text, every
+        line is free text rather than one word, and is written back corrected.
+        """
+        start_time = time.time()
+        log = sys.stderr if output_file == '-' else sys.stdout
+        
+        if text:
+            if workers > 1:
+                raise ValueError("Text correction runs in a single process")
+            self._correct_text_serial(input_file, output_file, output_format, batch_size, log)
+        elif workers > 1:
+            if input_file == '-':
+                raise ValueError("Parallel correction needs a seekable input file, not stdin")
+            self._correct_file_parallel(input_file, output_file, workers, output_format, log)
+        else:
+            self._correct_file_serial(input_file, output_file, output_format, batch_size, log)
+        
+        if self.cache is not None:
+            self.cache.flush()
         
         end_time = time.time()
         elapsed_time = end_time - start_time
         
-        self.print_statistics(elapsed_time)
+        self.print_statistics(elapsed_time, file=log)
+    
+    def correct_stream(self, words: Iterable[str], batch_size: int = 1000,
+                       time_budget: Optional[float] = None,
+                       work_budget: Optional[int] = None) -> Iterator[List[Tuple[str, str]]]:
+        """Lazily correct words, yielding (error, corrected) pairs in batches; budgets are per word."""
+        words = iter(words)
+        while True:
+            batch = list(islice(words, batch_size))
+            if not batch:
+                return
+            yield list(zip(batch, self.correct_batch(batch, time_budget, work_budget)))
+    
+    def token_corrections(self, texts: Iterable[str], keep_case: bool = True,
+                          time_budget: Optional[float] = None,
+                          work_budget: Optional[int] = None) -> Dict[str, str]:
+        """Map every distinct word token in texts to its replacement, correcting each only once.
+        
+        With keep_case, case-only fixes are skipped and corrections follow the
+        token's casing (lower, UPPER or Title), as suits running text.
+        """
+        tokens = list(dict.fromkeys(token for text in texts for token in TOKEN_RE.findall(text)))
+        corrections = {}
+        for token, corrected in zip(tokens, self.correct_batch(tokens, time_budget, work_budget)):
+            if keep_case:
+                corrected = token if corrected.lower() == token.lower() else match_case(token, corrected)
+            corrections[token] = corrected
+        return corrections
+    
+    def correct_texts(self, texts: Iterable[str], keep_case: bool = True,
+                      time_budget: Optional[float] = None,
+                      work_budget: Optional[int] = None) -> List[str]:
+        """Correct a batch of documents, leaving whitespace, punctuation and numerals as they are."""
+        texts = list(texts)
+        corrections = self.token_corrections(texts, keep_case, time_budget, work_budget)
+        replace = lambda match: corrections[match.group()]
+        return [TOKEN_RE.sub(replace, text) for text in texts]
+    
+    def correct_text(self, text: str, keep_case: bool = True) -> str:
+        """Correct the word tokens in one document."""
+        return self.correct_texts([text], keep_case)[0]
+    
+    def _correct_text_serial(self, input_file: str, output_file: str,
+                             output_format: str, batch_size: int, log):
+        """Correct a file of free text line by line, one token lookup per distinct token per batch."""
+        print(f"Correcting text from {input_file} into {output_file}...", file=log)
+        
+        with open_text(input_file, 'r') as f_in, open_text(output_file, 'w') as f_out:
+            processed = 0
+            
+            while True:
+                lines = [line.rstrip('\n') for line in islice(f_in, batch_size)]
+                if not lines:
+                    break
+                corrections = self.token_corrections(lines)
+                f_out.write(format_text_results(lines, corrections, output_format))
+                if output_file == '-':
+                    f_out.flush()
+                
+                previous, processed = processed, processed + len(lines)
+                if processed // 1000 > previous // 1000:
+                    print(f"Progress: {processed} lines processed...", file=log)
     
-    def print_statistics(self, elapsed_time: float):
+    def _correct_file_serial(self, input_file: str, output_file: str,
+                             output_format: str, batch_size: int, log):
+        """Stream a file through the corrector in bounded batches."""
+        print(f"Correcting words from {input_file} into {output_file}...", file=log)
+        
+        with open_text(input_file, 'r') as f_in, open_text(output_file, 'w') as f_out:
+            f_out.write(format_header(output_format))
+            processed = 0
+            
+            for results in self.correct_stream(iter_words(f_in), batch_size):
+                f_out.write(format_results(results, output_format))
+                if output_file == '-':
+                    f_out.flush()
+                
+                previous, processed = processed, processed + len(results)
+                if processed // 1000 > previous // 1000:
+                    print(f"Progress: {processed} words processed...", file=log)
+    
+    def _correct_file_parallel(self, input_file: str, output_file: str, workers: int,
+                               output_format: str, log):
+        """Correct newline-aligned byte ranges of a file in a process pool."""
+        ranges = split_byte_ranges(input_file, workers * 4)
+        print(f"Correcting {input_file} in {len(ranges)} chunks on {workers} workers...", file=log)
+        
+        init_args = (self.dictionary_file, self.engine, self.cache_size, self.fallback_distance,
+                     self.metrics is not None, self.compact, self.time_budget, self.work_budget,
+                     self.qgram_distance, self.shared_name, self.candidate_limit)
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=init_args) as pool, \
+                open_text(output_file, 'w') as f:
+            f.write(format_header(output_format))
+            
+            tasks = [(input_file, start, end) for start, end in ranges]
+            # imap yields chunks in submission order, so output keeps input order.
+            for i, (results, stats, cache_stats, metrics) in enumerate(pool.imap(_correct_range, tasks)):
+                f.write(format_results(results, output_format))
+                
+                self.stats.add(stats)
+                if self.cache is not None:
+                    for key, value in cache_stats.items():
+                        self.cache.stats[key] += value
+                if self.metrics is not None:
+                    self.metrics.merge(metrics)
+                
+                print(f"Progress: {i + 1}/{len(ranges)} chunks processed...", file=log)
+    
+    def print_statistics(self, elapsed_time: float, file=None):
         """Print correction statistics."""
-        print("\n" + "=" * 60)
-        print("SPELL CORRECTION STATISTICS")
-        print("=" * 60)
-        print(f"Total words processed: {self.stats['total_words']}")
-        print(f"Time taken: {elapsed_time:.2f} seconds")
-        print(f"Words per second: {self.stats['total_words'] / elapsed_time:.2f}")
-        print("\nCorrection Breakdown:")
-        print(f"  Exact matches: {self.stats['exact_match']} ({self.stats['exact_match'] / self.stats['total_words'] * 100:.1f}%)")
-        print(f"  Case corrected: {self.stats['case_corrected']} ({self.stats['case_corrected'] / self.stats['total_words'] * 100:.1f}%)")
-        print(f"  Edit distance 1: {self.stats['edit_distance_1']} ({self.stats['edit_distance_1'] / self.stats['total_words'] * 100:.1f}%)")
-        print(f"  Edit distance 2: {self.stats['edit_distance_2']} ({self.stats['edit_distance_2'] / self.stats['total_words'] * 100:.1f}%)")
-        print(f"  Phonetic match: {self.stats['phonetic_match']} ({self.stats['phonetic_match'] / self.stats['total_words'] * 100:.1f}%)")
-        print(f"  No match found: {self.stats['no_match']} ({self.stats['no_match'] / self.stats['total_words'] * 100:.1f}%)")
+        file = file or sys.stdout
+        if self.stats['total_words'] == 0:
+            print("\nNo words processed.", file=file)
+            return
+        
+        print("\n" + "=" * 60, file=file)
+        print("SPELL CORRECTION STATISTICS", file=file)
+        print("=" * 60, file=file)
+        print(f"Total words processed: {self.stats['total_words']}", file=file)
+        print(f"Time taken: {elapsed_time:.2f} seconds", file=file)
+        print(f"Words per second: {self.stats['total_words'] / elapsed_time:.2f}", file=file)
+        print("\nCorrection Breakdown:", file=file)
+        print(f"  Exact matches: {self.stats['exact_match']} ({self.stats['exact_match'] / self.stats['total_words'] * 100:.1f}%)", file=file)
+        print(f"  Case corrected: {self.stats['case_corrected']} ({self.stats['case_corrected'] / self.stats['total_words'] * 100:.1f}%)", file=file)
+        print(f"  Edit distance 1: {self.stats['edit_distance_1']} ({self.stats['edit_distance_1'] / self.stats['total_words'] * 100:.1f}%)", file=file)
+        print(f"  Edit distance 2: {self.stats['edit_distance_2']} ({self.stats['edit_distance_2'] / self.stats['total_words'] * 100:.1f}%)", file=file)
+        print(f"  Phonetic match: {self.stats['phonetic_match']} ({self.stats['phonetic_match'] / self.stats['total_words'] * 100:.1f}%)", file=file)
+        print(f"  No match found: {self.stats['no_match']} ({self.stats['no_match'] / self.stats['total_words'] * 100:.1f}%)", file=file)
+        if self.stats['budget_limited']:
+            print(f"  Budget-limited (tiers skipped): {self.stats['budget_limited']}", file=file)
+        
+        if self.cache is not None:
+            cache_stats = self.cache.stats
+            print("\nCache:", file=file)
+            print(f"  Memory hits: {cache_stats['cache_hits']}", file=file)
+            print(f"  Disk hits: {cache_stats['cache_disk_hits']}", file=file)
+            print(f"  Misses: {cache_stats['cache_misses']}", file=file)
+            print(f"  Evictions: {cache_stats['cache_evictions']}", file=file)
+        
+        if self.metrics is not None:
+            metrics = self.metrics.snapshot()
+            print("\nLatency (ms)            p50      p95      p99  generated p95", file=file)
+            rows = [('word', metrics.word_seconds, None)]
+            rows += [(tier, metrics.tier_seconds[tier], metrics.tier_generated[tier])
+                     for tier in ('canonical',) + self.TIERS if tier in metrics.tier_seconds]
+            rows.append(('select_best', metrics.select_seconds, metrics.select_candidates))
+            for name, seconds, volume in rows:
+                p50, p95, p99 = (seconds.quantile(q) * 1000 for q in (0.5, 0.95, 0.99))
+                generated = f"{volume.quantile(0.95):14.0f}" if volume is not None else ''
+                print(f"  {name:<20} {p50:8.3f} {p95:8.3f} {p99:8.3f} {generated}", file=file)
         
         accuracy = (self.stats['total_words'] - self.stats['no_match']) / self.stats['total_words'] * 100
-        print(f"\nAccuracy: {accuracy:.2f}%")
-        print("=" * 60)
+        print(f"\nAccuracy: {accuracy:.2f}%", file=file)
+        print("=" * 60, file=file)
+
+
+OUTPUT_FORMATS = ('table', 'jsonl', 'tsv')
+
+
+def open_text(path: str, mode: str):
+    """Open a UTF-8 text file, or wrap stdin/stdout when path is '-'."""
+    if path == '-':
+        stream = sys.stdin if 'r' in mode else sys.stdout
+        return open(stream.fileno(), mode, encoding='utf-8', closefd=False)
+    return open(path, mode, encoding='utf-8')
+
+
+def iter_words(lines: Iterable[str]) -> Iterator[str]:
+    """Yield stripped, non-empty words from an iterable of lines."""
+    for line in lines:
+        word = line.strip()
+        if word:
+            yield word
+
+
+def format_header(output_format: str) -> str:
+    """Return the header written before any results."""
+    if output_format == 'table':
+        return f"{'Error':<30} {'Corrected':<30}\n" + "=" * 60 + "\n"
+    return ''
+
+
+def format_results(results: List[Tuple[str, str]], output_format: str) -> str:
+    """Render a batch of (error, corrected) pairs as one string."""
+    if output_format == 'jsonl':
+        return ''.join(
+            json.dumps({'error': error, 'corrected': corrected}, ensure_ascii=False) + '\n'
+            for error, corrected in results
+        )
+    if output_format == 'tsv':
+        return ''.join(f"{error}\t{corrected}\n" for error, corrected in results)
+    if output_format == 'table':
+        return ''.join(f"{error:<30} {corrected:<30}\n" for error, corrected in results)
+    raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+
+
+def match_case(token: str, word: str) -> str:
+    """Give word the casing pattern of token: lower, UPPER or Title; otherwise leave it."""
+    if token.islower():
+        return word.lower()
+    if token.isupper() and len(token) > 1:
+        return word.upper()
+    if token.istitle():
+        return word[:1].upper() + word[1:].lower()
+    return word
+
+
+def format_text_results(lines: List[str], corrections: Dict[str, str], output_format: str) -> str:
+    """Render corrected lines of text; jsonl adds each change with its offsets in the original line."""
+    replace = lambda match: corrections[match.group()]
+    if output_format != 'jsonl':
+        return ''.join(TOKEN_RE.sub(replace, line) + '\n' for line in lines)
+    
+    records = []
+    for line in lines:
+        changes = [
+            {'start': m.start(), 'end': m.end(), 'error': m.group(), 'corrected': corrections[m.group()]}
+            for m in TOKEN_RE.finditer(line) if corrections[m.group()] != m.group()
+        ]
+        record = {'text': line, 'corrected': TOKEN_RE.sub(replace, line), 'changes': changes}
+        records.append(json.dumps(record, ensure_ascii=False) + '\n')
+    return ''.join(records)
+
+
+def split_byte_ranges(path: str, parts: int) -> List[Tuple[int, int]]:
+    """Split a file into up to parts byte ranges that end on line boundaries."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            ranges = []
+            start = 0
+            for i in range(1, parts + 1):
+                end = size if i == parts else max(start, size * i // parts)
+                if end < size:
+                    newline = data.find(b'\n', end)
+                    end = size if newline == -1 else newline + 1
+                if end > start:
+                    ranges.append((start, end))
+                    start = end
+                if start >= size:
+                    break
+            return ranges
+
+
+_worker_corrector = None
+
+
+def _init_worker(dictionary_file: str, engine: str, cache_size: int, fallback_distance: int,
+                 collect_metrics: bool, compact: bool = False,
+                 time_budget: Optional[float] = None, work_budget: Optional[int] = None,
+                 qgram_distance: int = 0, shared_name=None, candidate_limit: int = 0):
+    """Build one SpellCorrector per pool worker, attached to the parent's shared index if it has one."""
+    global _worker_corrector
+    corrector_class = SpellCorrector
+    if isinstance(dictionary_file, dict):
+        from partitions import PartitionedCorrector
+        corrector_class = PartitionedCorrector
+    _worker_corrector = corrector_class(dictionary_file, engine=engine, cache_size=cache_size,
+                                        fallback_distance=fallback_distance,
+                                        metrics=CorrectionMetrics() if collect_metrics else None,
+                                        compact=compact, time_budget=time_budget,
+                                        work_budget=work_budget, qgram_distance=qgram_distance,
+                                        shared_name=shared_name, candidate_limit=candidate_limit)
+
+
+def _correct_range(task: Tuple[str, int, int]):
+    """Correct the words in one byte range and return results with stats deltas."""
+    path, start, end = task
+    corrector = _worker_corrector
+    
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            text = data[start:end].decode('utf-8')
+    
+    words = list(iter_words(text.splitlines()))
+    results = list(zip(words, corrector.correct_batch(words)))
+    
+    stats = dict(corrector.stats)
+    corrector.stats.reset()
+    
+    cache_stats = {}
+    if corrector.cache is not None:
+        cache_stats = dict(corrector.cache.stats)
+        for key in corrector.cache.stats:
+            corrector.cache.stats[key] = 0
+    
+    metrics = corrector.metrics
+    if metrics is not None:
+        corrector.metrics = CorrectionMetrics()
+    
+    return results, stats, cache_stats, metrics
 
 
 def main():
     """Main function to run spell correction."""
-    import sys
+    import argparse
     
-    dictionary_file = 'reference.txt'
-    errors_file = 'errors.txt'
-    output_file = 'corrected_output.txt'
+    parser = argparse.ArgumentParser(description='Correct misspelled words, one per line.')
+    parser.add_argument('--dictionary', default='reference.txt',
+                        help='reference word list (default: reference.txt)')
+    parser.add_argument('--partition', action='append', metavar='TAG=PATH',
+                        help='load a tagged dictionary partition instead of --dictionary (repeatable)')
+    parser.add_argument('--shards', type=int, default=0,
+                        help='split the dictionary over this many local shard processes and '
+                             'scatter each batch to them over local sockets')
+    parser.add_argument('--shard-server', action='append', metavar='HOST:PORT',
+                        help='use shard servers started with sharding.py, in shard order '
+                             '(repeatable; key from $SPELL_SHARD_AUTHKEY)')
+    parser.add_argument('--shard-timeout', type=float,
+                        help='seconds every shard request may take before it fails')
+    parser.add_argument('--input', default='errors.txt',
+                        help="words to correct, or '-' for stdin (default: errors.txt)")
+    parser.add_argument('--output', default='corrected_output.txt',
+                        help="where to write results, or '-' for stdout (default: corrected_output.txt)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='table',
+                        help='output format (default: fixed-width table)')
+    parser.add_argument('--text', action='store_true',
+                        help='treat each input line as free text and write it back corrected '
+                             '(--format jsonl adds the changed spans)')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='words corrected per streamed batch')
+    parser.add_argument('--engine', choices=SpellCorrector.ENGINES, default='classic',
+                        help='candidate generation engine (symspell precomputes a delete index)')
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help='keep up to this many corrections in an in-memory LRU cache')
+    parser.add_argument('--cache-file',
+                        help='SQLite file that persists corrections between runs')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='correct the file in this many processes')
+    parser.add_argument('--fallback-distance', type=int, default=0,
+                        help='scan the whole dictionary within this distance when no tier matches (needs NumPy)')
+    parser.add_argument('--qgram-distance', type=int, default=0,
+                        help='after the ED1/ED2 and phonetic tiers, find words within this distance '
+                             '(e.g. 3) through a q-gram index')
+    parser.add_argument('--candidate-limit', type=int, default=0,
+                        help='stop each edit/phonetic tier after this many dictionary hits '
+                             '(faster on long words; default 0 finds them all)')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='record per-tier latency and candidate volumes and write them to FILE')
+    parser.add_argument('--metrics-format', choices=('json', 'prometheus'), default='json',
+                        help='format of the --metrics file (default: json)')
+    parser.add_argument('--compact', action='store_true',
+                        help='hold the dictionary in compact read-only arrays instead of Python sets (less memory)')
+    parser.add_argument('--shared-memory', action='store_true',
+                        help='build the compact dictionary once in shared memory and have --workers '
+                             'attach to it instead of loading their own copies')
+    parser.add_argument('--time-budget-ms', type=float,
+                        help='per-word time budget; tiers that would overrun it are skipped')
+    parser.add_argument('--work-budget', type=int,
+                        help='per-word budget of candidate strings probed across tiers')
+    parser.add_argument('--profile', metavar='PREFIX',
+                        help='run under cProfile and tracemalloc; write PREFIX.pstats, PREFIX.collapsed '
+                             '(flame graphs) and PREFIX.txt (stages, slowest words, top functions)')
+    parser.add_argument('--profile-top', type=int, default=20,
+                        help='words and functions listed in the --profile report (default: 20)')
+    parser.add_argument('--compile', metavar='INDEX',
+                        help='compile the dictionary into a memory-mappable index file and exit')
+    args = parser.parse_args()
     
-    import os
-    if not os.path.exists(dictionary_file):
-        print(f"Error: Dictionary file '{dictionary_file}' not found!")
-        sys.exit(1)
+    if args.text and args.workers > 1:
+        parser.error('--text runs in a single process (--workers 1)')
+    if args.profile and args.workers > 1:
+        parser.error('--profile runs in a single process (--workers 1)')
+    sharded = args.shards > 0 or bool(args.shard_server)
+    if sharded and (args.partition or args.compile or args.workers > 1 or args.shared_memory):
+        parser.error('--shards/--shard-server cannot be combined with --partition, --compile, '
+                     '--workers or --shared-memory')
+    if sharded and (args.time_budget_ms or args.work_budget):
+        parser.error('per-word budgets do not apply across shards; use --shard-timeout')
+    
+    dictionary_file = args.dictionary
+    errors_file = args.input
+    output_file = args.output
+    log = sys.stderr if output_file == '-' else sys.stdout
+    
+    if args.partition:
+        from partitions import parse_partitions
+        try:
+            dictionary_file = parse_partitions(args.partition)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.compile:
+            parser.error('--compile takes a single --dictionary, not partitions')
+    
+    for path in (dictionary_file.values() if args.partition else [dictionary_file]):
+        if not os.path.exists(path):
+            print(f"Error: Dictionary file '{path}' not found!", file=log)
+            sys.exit(1)
     
-    if not os.path.exists(errors_file):
-        print(f"Error: Errors file '{errors_file}' not found!")
+    if not args.compile and errors_file != '-' and not os.path.exists(errors_file):
+        print(f"Error: Errors file '{errors_file}' not found!", file=log)
         sys.exit(1)
     
-    corrector = SpellCorrector(dictionary_file)
-    corrector.correct_file(errors_file, output_file)
+    if args.compile:
+        start_time = time.time()
+        SpellCorrector(dictionary_file).compile(args.compile)
+        print(f"Compiled {dictionary_file} into {args.compile} in {time.time() - start_time:.2f} seconds")
+        return
+    
+    corrector_class = SpellCorrector
+    shard_options = {}
+    if args.partition:
+        from partitions import PartitionedCorrector
+        corrector_class = PartitionedCorrector
+    elif sharded:
+        from sharding import ShardedCorrector, AUTHKEY_ENV, parse_address
+        corrector_class = ShardedCorrector
+        shard_options = dict(shards=args.shards, timeout=args.shard_timeout)
+        if args.shard_server:
+            try:
+                shard_options['addresses'] = [parse_address(spec) for spec in args.shard_server]
+            except ValueError as e:
+                parser.error(str(e))
+            if not os.environ.get(AUTHKEY_ENV):
+                parser.error(f'--shard-server needs the shared key in ${AUTHKEY_ENV}')
+            shard_options['authkey'] = os.environ[AUTHKEY_ENV].encode('utf-8')
+    corrector = corrector_class(dictionary_file, engine=args.engine,
+                                cache_size=args.cache_size, cache_file=args.cache_file,
+                                fallback_distance=args.fallback_distance,
+                                qgram_distance=args.qgram_distance,
+                                metrics=CorrectionMetrics() if args.metrics else None,
+                                compact=args.compact, work_budget=args.work_budget,
+                                time_budget=args.time_budget_ms / 1000 if args.time_budget_ms else None,
+                                shared_memory=args.shared_memory, candidate_limit=args.candidate_limit,
+                                **shard_options)
+    profiler = None
+    if args.profile:
+        from profiling import CorrectionProfiler
+        profiler = CorrectionProfiler(corrector, top_n=args.profile_top)
+        profiler.start()
+    try:
+        corrector.correct_file(errors_file, output_file, workers=args.workers,
+                               output_format=args.format, batch_size=args.batch_size, text=args.text)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        corrector.unlink_shared()
+        if sharded:
+            corrector.close()
+    
+    if profiler is not None:
+        for path in profiler.write(args.profile):
+            print(f"Profile written to {path}", file=log)
+    
+    if corrector.metrics is not None:
+        with open(args.metrics, 'w', encoding='utf-8') as f:
+            if args.metrics_format == 'prometheus':
+                f.write(corrector.metrics.to_prometheus())
+            else:
+                f.write(corrector.metrics.to_json() + '\n')
+        print(f"Metrics written to {args.metrics}", file=log)
+    
+    if corrector.cache is not None:
+        corrector.cache.close()
     
-    print(f"\nCorrection complete! Results saved to {output_file}")
+    print(f"\nCorrection complete! Results saved to {output_file}", file=log)
 
 
 if __name__ == '__main__':
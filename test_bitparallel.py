@@ -0,0 +1,64 @@
+"""Property tests for the bit-parallel kernels against the scalar edit distance."""
+
+import random
+import unittest
+
+from bitparallel import (MAX_QUERY_LENGTH, NUMPY_AVAILABLE, LengthBuckets, _scalar_levenshtein,
+                         batch_levenshtein)
+
+
+def random_word(rng: random.Random, alphabet: str, length: int) -> str:
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, 'NumPy is not installed')
+class BitParallelTest(unittest.TestCase):
+    """Every lane must agree with the scalar DP, whatever the word lengths and characters."""
+    
+    # A small alphabet makes near matches common; the accented and CJK
+    # letters push code points past the ASCII range of the match table.
+    ALPHABET = 'abcdeé中'
+    
+    def setUp(self):
+        rng = random.Random(5)
+        self.words = sorted({random_word(rng, self.ALPHABET, rng.randint(0, 12)) for _ in range(800)})
+        self.queries = [random_word(rng, self.ALPHABET, rng.randint(0, 12)) for _ in range(60)]
+        # Queries at and beyond the one-machine-word limit.
+        self.queries += [random_word(rng, 'ab', MAX_QUERY_LENGTH), random_word(rng, 'ab', MAX_QUERY_LENGTH + 1)]
+        self.words += [self.queries[-2][:-1], self.queries[-1][1:]]
+    
+    def brute_force(self, query, words, max_distance):
+        return sorted((word, dist) for word, dist in ((w, _scalar_levenshtein(query, w)) for w in words)
+                      if dist <= max_distance)
+    
+    def test_batch_matches_scalar(self):
+        for query in self.queries:
+            self.assertEqual(batch_levenshtein(query, self.words),
+                             [_scalar_levenshtein(query, word) for word in self.words], query)
+    
+    def test_within_matches_scalar(self):
+        buckets = LengthBuckets(self.words)
+        for query in self.queries:
+            distances = [(word, _scalar_levenshtein(query, word)) for word in self.words]
+            for max_distance in (0, 1, 2, 3):
+                self.assertEqual(sorted(buckets.within(query, max_distance)),
+                                 sorted(pair for pair in distances if pair[1] <= max_distance), query)
+    
+    def test_within_after_update(self):
+        rng = random.Random(6)
+        buckets = LengthBuckets(self.words)
+        removed = set(rng.sample(self.words, 200))
+        added = {random_word(rng, self.ALPHABET + 'ﬀ', rng.randint(1, 14)) for _ in range(200)}
+        edited = buckets.copy()
+        edited.update(added=added, removed=removed)
+        
+        words = sorted((set(self.words) - removed) | added)
+        for query in self.queries:
+            self.assertEqual(sorted(edited.within(query, 2)), self.brute_force(query, words, 2), query)
+            # The copy's edits leave the original untouched.
+            self.assertEqual(sorted(buckets.within(query, 2)), self.brute_force(query, self.words, 2), query)
+        self.assertEqual(edited.scan_size(5, 2), sum(1 for word in words if abs(len(word) - 5) <= 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
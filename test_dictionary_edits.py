@@ -0,0 +1,148 @@
+"""Incremental dictionary edits and reload swaps against freshly built correctors."""
+
+import os
+import random
+import tempfile
+import unittest
+
+from bitparallel import NUMPY_AVAILABLE
+from hot_reload import ReloadingCorrector
+from metrics import CorrectionMetrics
+from spell_corrector import SpellCorrector
+
+
+def random_words(rng: random.Random, count: int):
+    """Distinct random words, about a third of them capitalised."""
+    words = set()
+    while len(words) < count:
+        word = ''.join(rng.choice('abdehiklmnorstu') for _ in range(rng.randint(3, 8)))
+        words.add(word.capitalize() if rng.random() < 0.3 else word)
+    return words
+
+
+def write_words(words) -> str:
+    """Write a word list to a temporary file and return its path."""
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.txt', delete=False) as f:
+        f.write('\n'.join(sorted(words)) + '\n')
+    return f.name
+
+
+def ranking(suggestions):
+    """Suggestion scores, and the words ranked strictly above the last one (ties may swap)."""
+    scores = [score for _, score in suggestions]
+    return scores, {word for word, score in suggestions if score < scores[-1]}
+
+
+class DictionaryEditTest(unittest.TestCase):
+    """add_words/remove_words must leave a corrector equal to one built from the final list."""
+    
+    OPTIONS = [
+        dict(engine='symspell', qgram_distance=3, fallback_distance=2 if NUMPY_AVAILABLE else 0),
+        dict(engine='classic'),
+    ]
+    
+    def setUp(self):
+        rng = random.Random(11)
+        words = random_words(rng, 500)
+        # No lowercase form is shared, so a rebuild has one canonical spelling per word.
+        self.words = set({word.lower(): word for word in words}.values())
+        self.removed = set(rng.sample(sorted(self.words), 80))
+        lowers = {word.lower() for word in self.words}
+        self.added = {word for word in random_words(rng, 120) if word.lower() not in lowers}
+        self.queries = [''.join(rng.choice('abdehiklmnorstuy') for _ in range(rng.randint(3, 9)))
+                        for _ in range(25)]
+        self.queries += [word[:-1] + 'y' for word in sorted(self.added)[:10]]
+        self.queries += [word + 'a' for word in sorted(self.removed)[:10]]
+        self.paths = []
+    
+    def tearDown(self):
+        for path in self.paths:
+            os.unlink(path)
+    
+    def corrector(self, words, **options) -> SpellCorrector:
+        self.paths.append(write_words(words))
+        return SpellCorrector(self.paths[-1], **options)
+    
+    def test_edits_match_rebuild(self):
+        final = (self.words | self.added) - self.removed
+        for options in self.OPTIONS:
+            with self.subTest(**options):
+                edited = self.corrector(self.words, **options)
+                # Build the trie first, so suggest() checks its edits too.
+                edited.suggest('abc')
+                self.assertEqual(edited.add_words(sorted(self.added)), len(self.added))
+                self.assertEqual(edited.remove_words(sorted(self.removed)), len(self.removed))
+                fresh = self.corrector(final, **options)
+                
+                self.assertEqual(set(edited.dictionary), final)
+                self.assertEqual(edited.dictionary_hash(), fresh.dictionary_hash())
+                for query in self.queries:
+                    self.assertEqual(edited.resolve_candidates(query), fresh.resolve_candidates(query), query)
+                    self.assertEqual(ranking(edited.suggest(query, 5, 2)),
+                                     ranking(fresh.suggest(query, 5, 2)), query)
+                self.assertEqual(edited.correct_batch(self.queries), fresh.correct_batch(self.queries))
+    
+    def test_removing_a_case_variant_falls_back_to_another(self):
+        corrector = self.corrector(self.words | {'Surat', 'SURAT'})
+        self.assertEqual(corrector.remove_words(['Surat']), 1)
+        self.assertEqual(corrector.correct_word('surat'), 'SURAT')
+        self.assertEqual(corrector.dictionary_hash(),
+                         self.corrector(self.words | {'SURAT'}).dictionary_hash())
+        
+        self.assertEqual(corrector.add_words(['Surat']), 1)
+        self.assertEqual(corrector.remove_words(['SURAT']), 1)
+        self.assertEqual(corrector.correct_word('surat'), 'Surat')
+        self.assertEqual(corrector.remove_words(['Surat']), 1)
+        self.assertNotIn('surat', corrector.dictionary_lower)
+    
+    def test_edit_leaves_earlier_version_unchanged(self):
+        corrector = self.corrector(self.words, engine='symspell', qgram_distance=3)
+        before = corrector.index
+        word = sorted(self.words)[0]
+        corrector.remove_words([word])
+        corrector.add_words(['zzyzx'])
+        self.assertIsNot(corrector.index, before)
+        self.assertIn(word, before.dictionary)
+        self.assertNotIn('zzyzx', before.dictionary_lower)
+        self.assertEqual(before.qgram_index.probe(word.lower(), 0)[1], {word.lower()})
+        self.assertIn(word.lower(), before.delete_index.lookup(word.lower(), 1))
+
+
+class ReloadTest(unittest.TestCase):
+    """A reload swaps the dictionary but keeps what the service accumulated."""
+    
+    def setUp(self):
+        self.path = write_words(['Gujarat', 'Surat', 'Rajkot'])
+    
+    def tearDown(self):
+        os.unlink(self.path)
+    
+    def test_swap_keeps_cache_stats_and_metrics(self):
+        corrector = ReloadingCorrector(self.path, cache_size=100, metrics=CorrectionMetrics())
+        old = corrector.snapshot
+        self.assertEqual(corrector.correct_word('Surrat'), 'Surat')
+        
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('Vadodara\n')
+        self.assertTrue(corrector.reload())
+        
+        new = corrector.snapshot
+        self.assertIsNot(new, old)
+        self.assertIs(new.cache, old.cache)
+        self.assertIs(new.stats, old.stats)
+        self.assertIs(new.metrics, old.metrics)
+        self.assertEqual(new.cache.dictionary_hash, new.dictionary_hash())
+        
+        self.assertEqual(corrector.correct_word('Vadodra'), 'Vadodara')
+        self.assertEqual(corrector.stats['total_words'], 2)
+        self.assertEqual(corrector.metrics.to_dict()['word_seconds']['count'], 2)
+    
+    def test_budgets_reach_the_snapshot(self):
+        corrector = ReloadingCorrector(self.path)
+        self.assertEqual(corrector.correct_word('Sbrat', work_budget=1), 'Sbrat')
+        self.assertEqual(corrector.correct_batch(['Sbrat'], time_budget=10.0), ['Surat'])
+        self.assertEqual(corrector.stats['budget_limited'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
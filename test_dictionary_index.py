@@ -0,0 +1,78 @@
+"""Property tests for the compiled index's CRC32 tables against plain sets and dicts."""
+
+import random
+import unittest
+import zlib
+
+from dictionary_index import MappedDictionary, build_index, content_hash
+from spell_corrector import DeleteIndex, MappedDeleteIndex, MappedPhoneticIndex, PhoneticIndex
+
+
+# Distinct strings with equal CRC32s, so they share hash table slots.
+COLLISIONS = [('qjfhehex', 'qjeabaaax'), ('qjfhehfx', 'qjeabaabx')]
+
+PHONETIC_MAP = {'a': 'aeiou', 'e': 'aeiou', 'i': 'eiyu', 'o': 'aou', 'u': 'aou', 'k': 'kq', 's': 'sz'}
+
+
+class MappedDictionaryTest(unittest.TestCase):
+    """Every lookup through the hash tables must match the in-memory structures."""
+    
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(3)
+        words = {''.join(rng.choice('abdeiklmnorstu') for _ in range(rng.randint(1, 9)))
+                 for _ in range(1500)}
+        words |= {word.capitalize() for word in rng.sample(sorted(words), 200)}
+        words |= {'Ahmedābād', 'naïve', 'NAÏVE'}
+        # One word of the first pair is left out, so its twin must not match it.
+        (cls.absent, present), (first, second) = COLLISIONS
+        words |= {present, first, second}
+        cls.words = words
+        
+        key = PhoneticIndex((), PHONETIC_MAP).key
+        cls.mapped = MappedDictionary(build_index(words, DeleteIndex.delete_variants, key, 2))
+        
+        # The canonical spelling of a lowercase form is the last one in sorted order.
+        cls.lower = {word.lower(): word for word in sorted(words)}
+        rng = random.Random(4)
+        cls.queries = sorted(cls.lower) + [cls.absent, '', 'zzz']
+        cls.queries += [''.join(rng.choice('abdeiklmnorstu') for _ in range(rng.randint(1, 9)))
+                        for _ in range(1500)]
+    
+    def test_collisions_share_a_hash(self):
+        for first, second in COLLISIONS:
+            self.assertEqual(zlib.crc32(first.encode('utf-8')), zlib.crc32(second.encode('utf-8')))
+    
+    def test_lookups_match_dict(self):
+        mapped = self.mapped
+        self.assertEqual(len(mapped), len(self.lower))
+        self.assertEqual(set(mapped), set(self.lower))
+        self.assertEqual(set(mapped.canonical), self.words)
+        self.assertEqual(mapped.dictionary_hash, content_hash(self.words))
+        for query in self.queries:
+            self.assertEqual(query in mapped, query in self.lower, query)
+            self.assertEqual(mapped.get(query), self.lower.get(query), query)
+        for word in sorted(self.words) + [self.absent, self.absent.upper()]:
+            self.assertEqual(word in mapped.canonical, word in self.words, word)
+    
+    def test_intersection_matches_set(self):
+        rng = random.Random(8)
+        for size in (0, 1, 50, 5000):
+            keys = [rng.choice(self.queries) for _ in range(size)]
+            self.assertEqual(self.mapped.intersection(keys), set(keys) & set(self.lower))
+    
+    def test_postings_match_in_memory_indexes(self):
+        lowers = sorted(self.lower)
+        deletes = DeleteIndex(lowers, None)
+        mapped_deletes = MappedDeleteIndex(self.mapped, None)
+        phonetic = PhoneticIndex(lowers, PHONETIC_MAP)
+        mapped_phonetic = MappedPhoneticIndex(self.mapped, PHONETIC_MAP)
+        for query in self.queries[::7]:
+            for variant in DeleteIndex.delete_variants(query, 2):
+                self.assertEqual(sorted(mapped_deletes.postings(variant)),
+                                 sorted(deletes.postings(variant)), variant)
+            self.assertEqual(sorted(mapped_phonetic.lookup(query)), sorted(phonetic.lookup(query)), query)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""Edits on a partitioned corrector against its union views."""
+
+import os
+import tempfile
+import unittest
+
+from partitions import PartitionedCorrector
+
+
+class PartitionedEditTest(unittest.TestCase):
+    """Counts and sizes must describe distinct words across partitions."""
+    
+    PARTITIONS = {
+        'hindi': ['Ghar', 'Paani', 'Kitaab', 'Surat'],
+        'guj': ['Gharvu', 'Paanivu', 'Surat', 'SURAT'],
+    }
+    
+    def setUp(self):
+        self.paths = {}
+        for tag, words in self.PARTITIONS.items():
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.txt', delete=False) as f:
+                f.write('\n'.join(words) + '\n')
+            self.paths[tag] = f.name
+        self.corrector = PartitionedCorrector(self.paths)
+    
+    def tearDown(self):
+        for path in self.paths.values():
+            os.unlink(path)
+    
+    def union(self):
+        words = set().union(*(part.dictionary for part in self.corrector.partitions.values()))
+        return words, {word.lower() for word in words}
+    
+    def check_sizes(self):
+        words, lowers = self.union()
+        self.assertEqual(len(self.corrector.dictionary), len(words))
+        self.assertEqual(len(self.corrector.dictionary_lower), len(lowers))
+    
+    def test_word_in_two_partitions_counts_once(self):
+        self.check_sizes()
+        self.assertEqual(self.corrector.remove_words(['Surat', 'Surat', 'Ghar', 'Nahin']), 2)
+        self.assertNotIn('Surat', self.corrector.dictionary)
+        self.assertEqual(self.corrector.correct_word('surat'), 'SURAT')
+        self.check_sizes()
+    
+    def test_sizes_follow_edits(self):
+        self.check_sizes()
+        self.assertEqual(self.corrector.add_words(['Nadi', 'NADI', 'Ghar'], partition='guj'), 2)
+        # Carried over from the previous version rather than counted again.
+        self.assertIsNotNone(self.corrector.dictionary.size)
+        self.assertIsNotNone(self.corrector.dictionary_lower.size)
+        self.check_sizes()
+        self.assertEqual(self.corrector.remove_words(['SURAT', 'Nadi']), 2)
+        self.check_sizes()
+        self.assertEqual(self.corrector.add_words(['Kitaab', 'Sagar']), 1)
+        self.check_sizes()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""Regression tests for the q-gram index tier against a brute-force scan."""
+
+import random
+import unittest
+
+from spell_corrector import QGramIndex
+
+
+def levenshtein(source: str, target: str) -> int:
+    """Plain edit distance with insertions, deletions and replacements."""
+    previous = list(range(len(target) + 1))
+    for i, a in enumerate(source, 1):
+        current = [i]
+        for j, b in enumerate(target, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a != b)))
+        previous = current
+    return previous[-1]
+
+
+class QGramIndexTest(unittest.TestCase):
+    """Every probe must return exactly the words a full scan finds."""
+    
+    def setUp(self):
+        rng = random.Random(7)
+        self.words = {''.join(rng.choice('abcde') for _ in range(rng.randint(1, 10)))
+                      for _ in range(1500)}
+        self.queries = [''.join(rng.choice('abcde') for _ in range(rng.randint(1, 10)))
+                        for _ in range(80)]
+    
+    def check(self, index, words, max_distance):
+        for query in self.queries:
+            expected = {word for word in words if levenshtein(query, word) <= max_distance}
+            _, matches = index.probe(query, max_distance)
+            self.assertEqual(matches, expected, query)
+    
+    def test_probe_matches_brute_force(self):
+        for max_distance in (1, 2, 3):
+            self.check(QGramIndex(self.words, max_distance), self.words, max_distance)
+    
+    def test_transposition_counts_as_two_edits(self):
+        index = QGramIndex({'abcdefgh'}, 1)
+        self.assertEqual(index.probe('abcdefhg', 1)[1], set())
+        self.assertEqual(index.probe('abcdefhg', 2)[1], {'abcdefgh'})
+    
+    def test_probe_after_edits(self):
+        index = QGramIndex(self.words, 3)
+        removed = set(sorted(self.words)[::3])
+        for word in removed:
+            index.remove(word)
+        added = {'ab', 'eeeeeeeeee', 'abcdeabcde'}
+        for word in added:
+            index.add(word)
+        self.check(index, (self.words - removed) | added, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
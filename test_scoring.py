@@ -0,0 +1,73 @@
+"""Property tests for the banded candidate scorer against the unbanded scoring it replaced."""
+
+import os
+import random
+import tempfile
+import unittest
+
+from spell_corrector import SpellCorrector
+
+
+class WeightedDistanceTest(unittest.TestCase):
+    """weighted_distance must give the full-matrix score, and bounding it must only cut losers."""
+    
+    @classmethod
+    def setUpClass(cls):
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.txt', delete=False) as f:
+            f.write('Surat\n')
+        cls.corrector = SpellCorrector(f.name)
+        os.unlink(f.name)
+        
+        rng = random.Random(12)
+        alphabet = 'aeioubdgkptvyAEBDKé'
+        
+        def word():
+            return ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 10)))
+        
+        cls.pairs = [(word(), word()) for _ in range(3000)]
+        cls.pairs += [(w, w[:i] + w[i + 1:]) for w, _ in cls.pairs[:200] for i in range(len(w)) if len(w) > 1]
+        cls.candidate_sets = [(word(), sorted({word() for _ in range(size)}))
+                              for size in (2, 5, 30, 63, 64, 200) for _ in range(20)]
+    
+    def baseline(self, word, candidate):
+        """The score_candidate formula before the fused kernel."""
+        corrector = self.corrector
+        edit_dist = corrector.levenshtein_distance(word.lower(), candidate.lower())
+        phon_dist = corrector.phonetic_distance(word.lower(), candidate.lower())
+        case_bonus = -0.5 if word[0].isupper() == candidate[0].isupper() else 0
+        score = edit_dist + phon_dist * 0.7 + abs(len(word) - len(candidate)) * 0.3 + case_bonus
+        return score, edit_dist
+    
+    def test_matches_unbanded_score(self):
+        for word, candidate in self.pairs:
+            score, dist = self.corrector.weighted_distance(word, candidate)
+            expected_score, expected_dist = self.baseline(word, candidate)
+            self.assertEqual(dist, expected_dist, (word, candidate))
+            self.assertAlmostEqual(score, expected_score, msg=(word, candidate))
+    
+    def test_bound_only_rejects_scores_that_cannot_win(self):
+        rng = random.Random(13)
+        for word, candidate in self.pairs:
+            expected_score, expected_dist = self.baseline(word, candidate)
+            best = expected_score + rng.choice((-2.0, -0.35, 0.0, 0.35, 2.0))
+            score, dist = self.corrector.weighted_distance(word, candidate, best)
+            if expected_score < best - 1e-9:
+                self.assertEqual(dist, expected_dist, (word, candidate, best))
+                self.assertAlmostEqual(score, expected_score, msg=(word, candidate, best))
+            elif expected_score > best + 1e-9:
+                self.assertEqual((score, dist), (float('inf'), -1), (word, candidate, best))
+    
+    def test_selection_finds_the_best_score(self):
+        # Both the scalar loop and the vectorised path (VECTOR_SCORING_MIN and up);
+        # scores are compared, as float rounding may break exact ties differently.
+        for word, candidates in self.candidate_sets:
+            candidates = set(candidates)
+            expected = min(candidates, key=lambda c: self.baseline(word, c)[0])
+            best, dist = self.corrector._select_best(word, candidates)
+            self.assertAlmostEqual(self.baseline(word, best)[0], self.baseline(word, expected)[0],
+                                   msg=(word, best, expected))
+            self.assertEqual(dist, self.baseline(word, best)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()